@@ -25,6 +25,89 @@ ESI_ALWAYS_CREATE_TOKEN = getattr(settings, 'ESI_ALWAYS_CREATE_TOKEN', False)
 ESI_CACHE_RESPONSE = getattr(settings, 'ESI_CACHE_RESPONSE', True)
 """Disable to stop caching endpoint responses."""
 
+ESI_CACHE_ETAG_RETENTION = int(getattr(settings, 'ESI_CACHE_ETAG_RETENTION', 3600))
+"""Seconds to keep cached responses with an ETag after they expired.
+
+Expired responses are revalidated with a conditional request
+and reused as long as ESI reports them as not modified.
+Set to 0 to drop responses from the cache once they expire.
+"""
+
+ESI_CACHE_STALE_WHILE_REVALIDATE = getattr(
+    settings, 'ESI_CACHE_STALE_WHILE_REVALIDATE', False
+)
+"""Enable to return recently expired cached responses right away.
+
+The expired response is refreshed in the background.
+Can be overwritten per request by passing ``stale_while_revalidate``
+with ``result()``.
+"""
+
+ESI_CACHE_STALE_GRACE_PERIOD = int(
+    getattr(settings, 'ESI_CACHE_STALE_GRACE_PERIOD', 300)
+)
+"""Max seconds since a cached response expired for it to be served stale."""
+
+ESI_CACHE_SINGLE_FLIGHT = getattr(settings, 'ESI_CACHE_SINGLE_FLIGHT', True)
+"""Enable to coalesce concurrent requests for the same uncached response.
+
+Only one thread or process fetches the response from ESI,
+while all others wait for it to appear in the cache.
+"""
+
+ESI_CACHE_SINGLE_FLIGHT_TIMEOUT = int(
+    getattr(settings, 'ESI_CACHE_SINGLE_FLIGHT_TIMEOUT', 30)
+)
+"""Max seconds to wait for a response fetched by another process."""
+
+ESI_CACHE_LOCAL_MAX_BYTES = int(getattr(settings, 'ESI_CACHE_LOCAL_MAX_BYTES', 0))
+"""Max size in bytes of the in-process cache in front of the Django cache.
+
+Each process keeps the most recently used responses in memory until they expire,
+which avoids a round trip to the cache backend for frequently used responses.
+Set to 0 to disable the in-process cache.
+"""
+
+ESI_CACHE_COMPRESSION_THRESHOLD = int(
+    getattr(settings, 'ESI_CACHE_COMPRESSION_THRESHOLD', 1024)
+)
+"""Minimum size in bytes for the body of a cached response to be compressed.
+
+Set to 0 to disable compression of cached responses.
+"""
+
+ESI_CACHE_CLOCK_SKEW_CORRECTION = getattr(
+    settings, 'ESI_CACHE_CLOCK_SKEW_CORRECTION', True
+)
+"""Enable to correct expiry times of cached responses for a drifting local clock.
+
+The offset between the local clock and ESI is learned
+from the ``Date`` header of responses.
+"""
+
+ESI_CACHE_CLOCK_SKEW_SHARED = getattr(settings, 'ESI_CACHE_CLOCK_SKEW_SHARED', False)
+"""Enable to share the learned clock offset with other processes on the same host.
+
+The offset is shared through the cache.
+"""
+
+ESI_CACHE_ERRORS = getattr(settings, 'ESI_CACHE_ERRORS', {})
+"""Seconds to cache error responses by HTTP status code, e.g. ``{404: 300}``.
+
+Cached errors are raised again without a request to ESI.
+When ESI sends an ``Expires`` header with the error, the response is cached
+until then instead. Error limited responses (420) are cached until the error
+limit resets according to the ``X-Esi-Error-Limit-Reset`` header.
+Errors are not cached by default.
+"""
+
+ESI_CACHE_ERRORS_BY_OPERATION = getattr(settings, 'ESI_CACHE_ERRORS_BY_OPERATION', {})
+"""Overrides for ``ESI_CACHE_ERRORS`` by operation ID.
+
+For example ``{'get_universe_structures_structure_id': {403: 3600}}``.
+Set the seconds for a status code to 0 to not cache it for an operation.
+"""
+
 ESI_INFO_LOGGING_ENABLED = getattr(settings, 'ESI_INFO_LOGGING_ENABLED', False)
 """Enable/disable verbose info logging."""
 
@@ -41,10 +124,18 @@ This will be included in the User-Agent header of every request.
 ESI_CONNECTION_POOL_MAXSIZE = getattr(settings, 'ESI_CONNECTION_POOL_MAXSIZE', 10)
 """Max size of the connection pool.
 
+The connection pool is shared by all ESI clients of a process.
 Increase this setting if you hav more parallel
 threads connected to ESI at the same time.
 """
 
+ESI_PARALLEL_PAGES = getattr(settings, 'ESI_PARALLEL_PAGES', False)
+"""Enable to fetch the pages of paginated routes concurrently with ``results()``.
+
+The number of concurrent requests is limited by ``ESI_CONNECTION_POOL_MAXSIZE``.
+Can be overwritten per request by passing ``parallel_pages`` with ``results()``.
+"""
+
 ESI_CONNECTION_ERROR_MAX_RETRIES = getattr(
     settings, 'ESI_CONNECTION_ERROR_MAX_RETRIES', 3
 )
@@ -87,6 +178,34 @@ ESI_TOKEN_JWK_SET_URL = "https://login.eveonline.com/oauth/jwks"
 
 ESI_TOKEN_VALID_DURATION = int(getattr(settings, 'ESI_TOKEN_VALID_DURATION', 1170))
 ESI_SPEC_CACHE_DURATION = int(getattr(settings, 'ESI_SPEC_CACHE_DURATION', 3600))
+"""Duration in seconds after which a cached swagger spec is checked for changes.
+
+The check is a conditional request in the background, while the cached spec
+is still used. Built specs are shared by all clients of a process and are only
+rebuilt after this duration when the spec changed.
+"""
+
+ESI_SPEC_SNAPSHOT_DIR = getattr(settings, 'ESI_SPEC_SNAPSHOT_DIR', None)
+"""Directory for spec snapshots written by the ``esi_spec_snapshot`` command.
+
+When set, clients are built from the snapshot of a spec version if available
+instead of downloading the spec.
+"""
+
+ESI_SPEC_SNAPSHOT_MAX_AGE = int(
+    getattr(settings, 'ESI_SPEC_SNAPSHOT_MAX_AGE', 86400 * 7)
+)
+"""Max age in seconds for using a spec snapshot.
+
+Older snapshots are only used when the spec can not be downloaded.
+"""
+
+ESI_CLIENT_LAZY_RESOURCES = getattr(settings, 'ESI_CLIENT_LAZY_RESOURCES', False)
+"""Enable to build the resources and operations of clients on first access.
+
+Reduces the time and memory needed for building clients,
+when a process only uses some of the resources.
+"""
 
 # Audience claim for JWTs
 ESI_TOKEN_JWT_AUDIENCE = str(getattr(settings, "ESI_TOKEN_JWT_AUDIENCE", "EVE Online"))
@@ -1,21 +1,53 @@
-from datetime import datetime
+import asyncio
+import calendar
+from collections import Counter, OrderedDict, defaultdict, deque
+from collections.abc import MutableMapping
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+import contextvars
+import copy
+from email.utils import formatdate, mktime_tz, parsedate_tz
+from functools import lru_cache, partial
+from itertools import islice
 from hashlib import md5
+from http.cookiejar import DefaultCookiePolicy
 import json
 import logging
-from time import sleep
+import os
+import re
+import socket
+import threading
+from time import monotonic, sleep, time
 from urllib import parse as urlparse
-from typing import Any, Union, Tuple
+from typing import Any, Iterator, Optional, Union, Tuple
+from uuid import uuid4
+import weakref
+import zlib
 
-from bravado.client import SwaggerClient
-from bravado import requests_client
+from bravado.client import CallableOperation, SwaggerClient
+from bravado import client as bravado_client, requests_client
 from bravado.exception import (
-    HTTPBadGateway, HTTPGatewayTimeout, HTTPServiceUnavailable
+    HTTPBadGateway,
+    HTTPError,
+    HTTPGatewayTimeout,
+    HTTPNotModified,
+    HTTPServiceUnavailable,
+    make_http_exception,
 )
-from bravado_core.response import IncomingResponse
+from bravado_core.model import model_discovery
+from bravado_core.operation import Operation
+from bravado_core.resource import Resource, convert_path_to_resource
+from bravado_core.response import IncomingResponse, get_response_spec
+from bravado_core.unmarshal import unmarshal_schema_object
 from bravado.swagger_model import Loader
-from bravado.http_future import HttpFuture
-from bravado_core.spec import Spec, CONFIG_DEFAULTS
+from bravado.http_future import HttpFuture, unmarshal_response_inner
+from bravado_core.spec import Spec, CONFIG_DEFAULTS, build_api_serving_url
+from bravado_core.util import sanitize_name
+from jose import jwt
+from jose.exceptions import JWTError
+import requests
 from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
 
 from django.core.cache import cache
 
@@ -32,8 +64,641 @@ logging.getLogger('urllib3').setLevel(_LIBRARIES_LOG_LEVEL)
 logging.getLogger('bravado').setLevel(_LIBRARIES_LOG_LEVEL)
 
 SPEC_CONFIG = {'use_models': False}
+SPEC_REF_SECTIONS = ('definitions', 'parameters', 'responses')
 RETRY_SLEEP_SECS = 1
 
+STALE_REFRESH_MAX_WORKERS = 4
+SINGLE_FLIGHT_POLL_SECS = 0.1
+PAGES_CACHE_BATCH_SIZE = 100
+SPEC_REFRESH_RETRY_SECS = 60
+CACHE_GENERATIONS_LOCAL_TTL = 1
+CACHE_GENERATIONS_LOCAL_MAX_ENTRIES = 10000
+
+CLOCK_SKEW_SHARE_INTERVAL_SECS = 60
+
+CACHE_ENVELOPE_VERSION = 2
+CACHED_RESPONSE_HEADERS = (
+    'Content-Type', 'Date', 'ETag', 'Expires', 'Last-Modified', 'X-Pages'
+)
+
+
+class CachedResponse(IncomingResponse):
+    """Response restored from the cache.
+
+    Only the status code, a few headers and the raw body of a response
+    are cached. The body is decompressed and decoded on first access.
+    The cache generations current when the response was cached are kept with it.
+    """
+
+    reason = ''
+
+    def __init__(
+        self,
+        status_code: int,
+        headers: dict,
+        body: bytes,
+        compressed=False,
+        generations=(),
+    ):
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers)
+        self._body = body
+        self._compressed = compressed
+        self.generations = tuple(generations)
+
+    @classmethod
+    def from_response(cls, response: IncomingResponse) -> 'CachedResponse':
+        """Create from an incoming response, compressing large bodies."""
+        body = response.raw_bytes or b''
+        compressed = (
+            0 < app_settings.ESI_CACHE_COMPRESSION_THRESHOLD <= len(body)
+        )
+        if compressed:
+            body = zlib.compress(body)
+        headers = {
+            name: response.headers[name]
+            for name in CACHED_RESPONSE_HEADERS
+            if name in response.headers
+        }
+        return cls(response.status_code, headers, body, compressed)
+
+    @classmethod
+    def from_envelope(cls, envelope) -> Optional['CachedResponse']:
+        """Create from a cache envelope.
+
+        Returns ``None`` for envelopes of unknown format or version.
+        """
+        if (
+            not isinstance(envelope, tuple)
+            or len(envelope) != 6
+            or envelope[0] != CACHE_ENVELOPE_VERSION
+        ):
+            return None
+        _, status_code, headers, body, compressed, generations = envelope
+        return cls(status_code, headers, body, compressed, generations)
+
+    def to_envelope(self) -> tuple:
+        """Convert into a compact and versioned tuple for caching."""
+        return (
+            CACHE_ENVELOPE_VERSION,
+            self.status_code,
+            dict(self.headers),
+            self._body,
+            self._compressed,
+            self.generations,
+        )
+
+    @property
+    def raw_bytes(self) -> bytes:
+        if self._compressed:
+            self._body = zlib.decompress(self._body)
+            self._compressed = False
+        return self._body
+
+    @property
+    def text(self) -> str:
+        return self.raw_bytes.decode('utf-8')
+
+    def json(self, **kwargs):
+        return json.loads(self.raw_bytes, **kwargs)
+
+
+class LocalResponseCache:
+    """Bounded in-process LRU cache for cache envelopes of ESI responses.
+
+    Sits in front of the Django cache and avoids a round trip to the cache
+    backend for hot responses. Entries are evicted when they expire or when
+    the total size exceeds ``ESI_CACHE_LOCAL_MAX_BYTES``.
+    """
+
+    ENTRY_OVERHEAD_BYTES = 200
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def is_enabled(self) -> bool:
+        return app_settings.ESI_CACHE_LOCAL_MAX_BYTES > 0
+
+    def get(self, key: str) -> Optional[tuple]:
+        """Return the envelope for a key or ``None`` if it is not cached."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] <= monotonic():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key: str, envelope: tuple, timeout: float) -> None:
+        """Store an envelope for ``timeout`` seconds."""
+        max_bytes = app_settings.ESI_CACHE_LOCAL_MAX_BYTES
+        size = self._envelope_size(envelope)
+        with self._lock:
+            self._remove(key)
+            if timeout <= 0 or size > max_bytes:
+                return
+            self._entries[key] = (envelope, monotonic() + timeout, size)
+            self.size += size
+            while self.size > max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._remove(key)
+
+    def delete_matching(self, pattern: re.Pattern) -> None:
+        """Delete all entries with keys matching a pattern."""
+        with self._lock:
+            for key in [key for key in self._entries if pattern.match(key)]:
+                self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self) -> dict:
+        """Return counters for monitoring the cache."""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'size': self.size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[2]
+
+    @classmethod
+    def _envelope_size(cls, envelope: tuple) -> int:
+        headers, body = envelope[2], envelope[3]
+        return (
+            len(body)
+            + sum(len(k) + len(str(v)) for k, v in headers.items())
+            + cls.ENTRY_OVERHEAD_BYTES
+        )
+
+
+local_response_cache = LocalResponseCache()
+
+_HTTP_DATE_MONTHS = {
+    name: num
+    for num, name in enumerate(
+        (
+            'Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
+            'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'
+        ),
+        start=1,
+    )
+}
+
+
+@lru_cache(maxsize=1024)
+def _parse_http_date(value: str) -> Optional[float]:
+    """Parse a HTTP date into a POSIX timestamp.
+
+    Dates in the RFC 7231 format used by ESI, e.g. ``Sun, 06 Nov 1994 08:49:37 GMT``,
+    are parsed directly and independent of the locale.
+    Other formats are parsed with the slower parser from the email package.
+
+    Returns:
+        timestamp or ``None`` if the date is invalid
+    """
+    if len(value) == 29 and value.endswith(' GMT'):
+        try:
+            return float(
+                calendar.timegm((
+                    int(value[12:16]),
+                    _HTTP_DATE_MONTHS[value[8:11]],
+                    int(value[5:7]),
+                    int(value[17:19]),
+                    int(value[20:22]),
+                    int(value[23:25]),
+                ))
+            )
+        except (KeyError, ValueError):
+            pass
+
+    parsed = parsedate_tz(value)
+    if parsed is None:
+        return None
+    try:
+        return float(mktime_tz(parsed))
+    except (OverflowError, ValueError):
+        return None
+
+
+class ServerClock:
+    """Clock of the ESI servers.
+
+    The offset of the local clock to the clock of the ESI servers is learned
+    from the ``Date`` header of responses, so that expiry times sent by ESI
+    can be compared with the current time on hosts with a drifting clock.
+    The offset can be shared with other processes on the same host
+    through the cache.
+    """
+
+    SMOOTHING = 0.2
+
+    def __init__(self):
+        self.skew = 0.0
+        self._samples = 0
+        self._synced_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def cache_key(self) -> str:
+        return f'esi_clock_skew_{socket.gethostname()}'
+
+    def now(self) -> float:
+        """Return the current time of the ESI servers as POSIX timestamp."""
+        if not app_settings.ESI_CACHE_CLOCK_SKEW_CORRECTION:
+            return time()
+        if app_settings.ESI_CACHE_CLOCK_SKEW_SHARED and not self._samples:
+            self._load_shared()
+        return time() - self.skew
+
+    def update(self, date: str) -> None:
+        """Learn the offset from the ``Date`` header of a response received now."""
+        if not app_settings.ESI_CACHE_CLOCK_SKEW_CORRECTION or not date:
+            return
+        server_time = _parse_http_date(str(date))
+        if server_time is None:
+            return
+
+        # the Date header is truncated to full seconds
+        sample = time() - server_time - 0.5
+        with self._lock:
+            if self._samples:
+                self.skew += self.SMOOTHING * (sample - self.skew)
+            else:
+                self.skew = sample
+            self._samples += 1
+            is_sharing = app_settings.ESI_CACHE_CLOCK_SKEW_SHARED and (
+                self._synced_at is None
+                or monotonic() - self._synced_at >= CLOCK_SKEW_SHARE_INTERVAL_SECS
+            )
+            if is_sharing:
+                self._synced_at = monotonic()
+            skew = self.skew
+
+        if is_sharing:
+            try:
+                cache.set(self.cache_key, skew, None)
+            except Exception:
+                logger.warning("Failed to write ESI clock skew to cache", exc_info=True)
+
+    def _load_shared(self) -> None:
+        """Use the offset learned by other processes on the same host."""
+        now = monotonic()
+        if (
+            self._synced_at is not None
+            and now - self._synced_at < CLOCK_SKEW_SHARE_INTERVAL_SECS
+        ):
+            return
+        self._synced_at = now
+        try:
+            skew = cache.get(self.cache_key)
+        except Exception:
+            logger.warning("Failed to read ESI clock skew from cache", exc_info=True)
+            return
+        if skew is not None:
+            self.skew = float(skew)
+
+
+server_clock = ServerClock()
+
+_cache_generations = OrderedDict()
+_cache_generations_lock = threading.Lock()
+
+
+def _cache_generation_key(operation_id: str, param_name=None, param_value=None) -> str:
+    """Generate the key name for the generation of a group of cached responses.
+
+    Changing the generation of a group makes all its cached responses unreachable.
+    """
+    if param_name is None:
+        return f'esi_generation_{operation_id}'
+    return f'esi_generation_{operation_id}_{param_name}_{param_value}'
+
+
+def _cache_param_generations_key(operation_id: str) -> str:
+    """Generate the key name of the marker for operations,
+    which have cached responses invalidated for a path parameter value.
+    """
+    return f'esi_generation_params_{operation_id}'
+
+
+def _get_cache_generations(keys: list) -> list:
+    """Fetch the current generations for a list of generation keys.
+
+    Generations are memorized in-process for ``CACHE_GENERATIONS_LOCAL_TTL``
+    seconds to avoid fetching them from the cache for every request.
+    Only the ``CACHE_GENERATIONS_LOCAL_MAX_ENTRIES`` most recently used
+    generations are memorized.
+    """
+    now = monotonic()
+    generations = dict()
+    with _cache_generations_lock:
+        for key in keys:
+            entry = _cache_generations.get(key)
+            if entry is not None and entry[1] > now:
+                _cache_generations.move_to_end(key)
+                generations[key] = entry[0]
+
+    missing = [key for key in keys if key not in generations]
+    if missing:
+        try:
+            found = cache.get_many(missing)
+        except Exception:
+            found = {}
+            logger.warning("Failed to read ESI cache generations", exc_info=True)
+        with _cache_generations_lock:
+            for key in missing:
+                generations[key] = found.get(key, '')
+                _cache_generations[key] = (
+                    generations[key], now + CACHE_GENERATIONS_LOCAL_TTL
+                )
+                _cache_generations.move_to_end(key)
+            while len(_cache_generations) > CACHE_GENERATIONS_LOCAL_MAX_ENTRIES:
+                _cache_generations.popitem(last=False)
+    return [generations[key] for key in keys]
+
+
+def invalidate_cache(operation_id: str, **path_param) -> None:
+    """Invalidate all cached responses of an operation.
+
+    Optionally only the cached responses for one value of a path parameter
+    are invalidated, e.g. to drop the cached assets of a character after a change:
+
+    .. code-block:: python
+
+        invalidate_cache('get_characters_character_id_assets', character_id=1234)
+
+    Other processes may still use invalidated responses for up to one second
+    and from their in-process cache until the responses expire.
+
+    Args:
+        operation_id: ID of the operation, e.g. ``get_universe_types_type_id``
+        path_param: (optional) name and value of one path parameter
+    """
+    if len(path_param) > 1:
+        raise ValueError('Only one path parameter is supported')
+
+    key = _cache_generation_key(
+        operation_id, *next(iter(path_param.items()), (None, None))
+    )
+    if path_param:
+        cache.set(_cache_param_generations_key(operation_id), True, None)
+    cache.set(key, uuid4().hex, None)
+    with _cache_generations_lock:
+        _cache_generations.pop(key, None)
+        _cache_generations.pop(_cache_param_generations_key(operation_id), None)
+    local_response_cache.delete_matching(_cache_key_pattern(operation_id))
+
+
+def _cache_key_prefix(operation, params: dict) -> str:
+    """Generate the prefix of cache keys for an operation.
+
+    The prefix consists of datasource, spec version and operation ID.
+    """
+    datasource = params.get('datasource')
+    if datasource is None and 'datasource' in operation.params:
+        datasource = operation.params['datasource'].param_spec.get('default', '')
+    version = operation.swagger_spec.spec_dict.get('info', {}).get('version', '')
+    return f'esi_{datasource}_{version}_{operation.operation_id}'
+
+
+def _cache_key_pattern(operation_id: str) -> re.Pattern:
+    """Pattern matching the cache keys of an operation
+    for any datasource and spec version.
+    """
+    return re.compile(
+        rf'esi_[^_]*_[^_]*_{re.escape(operation_id)}_(item_)?[0-9a-f]{{32}}$'
+    )
+
+
+@lru_cache(maxsize=1024)
+def _token_identity(access_token: str) -> Optional[str]:
+    """Identify the owner and scopes of an access token from its JWT claims.
+
+    Tokens of the same owner with different scopes get different identities,
+    so e.g. a cached 403 for a missing scope is not used for a token with that scope.
+
+    The claims are not verified, so a forged JWT with the identity of another
+    character can read that character's cached responses. Access tokens must
+    therefore only come from trusted sources, e.g. the SSO.
+
+    Returns:
+        token type, ID of the owner and hash of the scopes,
+        e.g. ``character:1001:0cc175b9c0f1b6a831c399e269772661``,
+        or None if the token is not a JWT
+    """
+    try:
+        claims = jwt.get_unverified_claims(access_token)
+        token_type, _, owner_id = claims['sub'].split(':')
+    except (JWTError, KeyError, ValueError, AttributeError):
+        return None
+    scopes = claims.get('scp') or []
+    if isinstance(scopes, str):
+        scopes = [scopes]
+    data = ' '.join(sorted(str(scope) for scope in scopes)).encode('utf-8')
+    # The following hash is not used in any security context. It only shortens
+    # the scopes for the cache key
+    scopes_hash = md5(data).hexdigest()  # nosec B303, B303-1
+    return f'{token_type.lower()}:{owner_id}:{scopes_hash}'
+
+
+@lru_cache(maxsize=None)
+def _path_pattern(path_name: str):
+    """Compile a regex matching a swagger path and capturing its parameters."""
+    parts = re.split(r'\{(\w+)\}', path_name)
+    pattern = ''.join(
+        f'(?P<{part}>[^/]+)' if num % 2 else re.escape(part)
+        for num, part in enumerate(parts)
+    )
+    return re.compile(pattern + '$')
+
+
+_stale_refresh_executor = None
+_stale_refresh_keys = set()
+_stale_refresh_lock = threading.Lock()
+
+
+def _get_stale_refresh_executor() -> ThreadPoolExecutor:
+    """Thread pool for refreshing stale cache entries in the background."""
+    global _stale_refresh_executor
+    with _stale_refresh_lock:
+        if _stale_refresh_executor is None:
+            _stale_refresh_executor = ThreadPoolExecutor(
+                max_workers=STALE_REFRESH_MAX_WORKERS,
+                thread_name_prefix='esi_stale_refresh',
+            )
+        return _stale_refresh_executor
+
+
+_async_executor = None
+_async_lock = threading.Lock()
+
+
+def _get_async_executor() -> ThreadPoolExecutor:
+    """Thread pool for running requests on behalf of coroutines."""
+    global _async_executor
+    with _async_lock:
+        if _async_executor is None:
+            _async_executor = ThreadPoolExecutor(
+                max_workers=max(1, app_settings.ESI_CONNECTION_POOL_MAXSIZE),
+                thread_name_prefix='esi_async',
+            )
+        return _async_executor
+
+
+async def _run_async(func, *args, **kwargs):
+    """Run a blocking function in the async thread pool and await its result."""
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        _get_async_executor(), partial(context.run, func, *args, **kwargs)
+    )
+
+
+_shared_session = None
+_shared_session_lock = threading.Lock()
+
+
+def _get_shared_session() -> requests.Session:
+    """HTTP session with a connection pool shared by all ESI clients of this process.
+
+    Cookies are not stored, since the session is used with many tokens.
+    """
+    global _shared_session
+    with _shared_session_lock:
+        if _shared_session is None:
+            session = requests.Session()
+            session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+            session.mount('https://', HTTPAdapter(
+                pool_maxsize=app_settings.ESI_CONNECTION_POOL_MAXSIZE,
+                max_retries=app_settings.ESI_CONNECTION_ERROR_MAX_RETRIES
+            ))
+            _shared_session = session
+        return _shared_session
+
+
+def _reset_session_pools(session: requests.Session) -> None:
+    """Replace the connection pools of a session in place.
+
+    Used in a forked process, so that clients built before the fork
+    do not share connections with the parent process.
+    The pools are replaced instead of cleared, since their locks may have been
+    held by another thread of the parent process at the time of the fork.
+    """
+    for adapter in session.adapters.values():
+        if isinstance(adapter, HTTPAdapter):
+            adapter.init_poolmanager(
+                adapter._pool_connections,
+                adapter._pool_maxsize,
+                block=adapter._pool_block,
+            )
+            adapter.proxy_manager = dict()
+
+
+_single_flight_locks = dict()
+_single_flight_calls = dict()
+_single_flight_lock = threading.Lock()
+
+
+@contextmanager
+def _single_flight(key: str):
+    """Allow only one thread of this process at a time to run for a key."""
+    with _single_flight_lock:
+        entry = _single_flight_locks.setdefault(key, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _single_flight_lock:
+            entry[1] -= 1
+            if not entry[1]:
+                del _single_flight_locks[key]
+
+
+def _single_flight_call(key: str, func, *args, **kwargs) -> Tuple[Any, bool]:
+    """Call a function only once for all threads of this process
+    calling it concurrently for the same key.
+
+    Threads calling while the first call is running wait for it
+    and get its return value or exception.
+
+    Returns:
+        Tuple with the return value and if it was returned by another thread's call
+    """
+    with _single_flight_lock:
+        future = _single_flight_calls.get(key)
+        is_shared = future is not None
+        if not is_shared:
+            future = _single_flight_calls[key] = Future()
+    if is_shared:
+        return future.result(), True
+
+    try:
+        value = func(*args, **kwargs)
+    except BaseException as ex:
+        with _single_flight_lock:
+            del _single_flight_calls[key]
+        future.set_exception(ex)
+        raise
+    with _single_flight_lock:
+        del _single_flight_calls[key]
+    future.set_result(value)
+    return value, False
+
+
+def _reset_after_fork():
+    """Drop thread pool, locks, connections and local cache
+    inherited from the parent process.
+    """
+    global _stale_refresh_executor, _stale_refresh_lock, _single_flight_lock
+    global _async_executor, _async_lock, _shared_session_lock
+    global _built_specs_lock, _cache_generations_lock
+    global local_response_cache, server_clock
+    local_response_cache = LocalResponseCache()
+    server_clock = ServerClock()
+    _stale_refresh_executor = None
+    _stale_refresh_keys.clear()
+    _stale_refresh_lock = threading.Lock()
+    _single_flight_locks.clear()
+    _single_flight_calls.clear()
+    _single_flight_lock = threading.Lock()
+    _async_executor = None
+    _async_lock = threading.Lock()
+    if _shared_session is not None:
+        _reset_session_pools(_shared_session)
+    _shared_session_lock = threading.Lock()
+    _built_specs_lock = threading.Lock()
+    _cache_generations_lock = threading.Lock()
+    for provider in list(_providers):
+        provider._reset()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
 
 class CachingHttpFuture(HttpFuture):
     """Extended wrapper for a FutureAdapter that returns a HTTP response
@@ -42,84 +707,406 @@ class CachingHttpFuture(HttpFuture):
     This class contains the response for an ESI request with an ESI client.
     """
     def _cache_key(self) -> str:
-        """Generate the key name used to cache responses."""
+        """Generate the key name used to cache responses.
+
+        The key is prefixed with datasource, spec version and operation ID.
+        The request is serialized with sorted parameters, so equal requests
+        always get the same key. Access tokens are replaced by the identity of
+        their owner and scopes, so cached responses survive token refreshes.
+        Cache generations are not part of the key,
+        but are stored with the cached response.
+        """
         request = self.future.request
-        data = (
-            request.method
-            + request.url
-            + str(request.params)
-            + str(request.data)
-            + str(request.json)
+        params = dict(request.params)
+        if params.get('token'):
+            params['token'] = _token_identity(params['token']) or params['token']
+        data = json.dumps(
+            [
+                request.method,
+                request.url,
+                sorted(params.items()),
+                request.data,
+                request.json,
+            ],
+            sort_keys=True,
+            default=str,
         ).encode('utf-8')
         # The following hash is not used in any security context. It is only used
         # to generate unique values, collisions are acceptable and "data" is not
         # coming from user-generated input
         str_hash = md5(data).hexdigest()  # nosec B303, B303-1
-        return f'esi_{str_hash}'
+        return f'{_cache_key_prefix(self.operation, request.params)}_{str_hash}'
+
+    def _current_generations(self) -> tuple:
+        """Current cache generations of the request.
+
+        The generations of its path parameter values are only included
+        for operations, which had cached responses invalidated for a path
+        parameter value. Otherwise they are not read, since all requests
+        of an operation share the same memorized generations.
+        """
+        operation_id = self.operation.operation_id
+        generation, has_param_generations = _get_cache_generations(
+            [
+                _cache_generation_key(operation_id),
+                _cache_param_generations_key(operation_id),
+            ]
+        )
+        if not has_param_generations:
+            return (generation,)
+        return (generation, *_get_cache_generations([
+            _cache_generation_key(operation_id, name, value)
+            for name, value in self._path_params().items()
+        ]))
+
+    def _is_current_generation(self, response: CachedResponse) -> bool:
+        """Determine if a cached response has not been invalidated since.
+
+        Missing generations are treated as never invalidated.
+        """
+        current = self._current_generations()
+        stored = response.generations
+        size = max(len(current), len(stored))
+        return (
+            stored + ('',) * (size - len(stored))
+            == current + ('',) * (size - len(current))
+        )
+
+    def _path_params(self) -> dict:
+        """Values of the path parameters of the current request."""
+        path = urlparse.urlsplit(self.future.request.url).path
+        match = _path_pattern(self.operation.path_name).search(path)
+        return match.groupdict() if match else {}
 
     @staticmethod
     def _time_to_expiry(expires):
         """Determine the seconds until a HTTP header "Expires" timestamp.
 
+        The current time is taken from the estimated clock of the ESI servers.
+
         Args:
             expires: HTTP response "Expires" header
 
         Returns:
             seconds until "Expires" time
         """
-        try:
-            expires_dt = datetime.strptime(str(expires), '%a, %d %b %Y %H:%M:%S %Z')
-            delta = expires_dt - datetime.utcnow()
-            return delta.total_seconds()
-        except ValueError:
+        expires_ts = _parse_http_date(str(expires))
+        if expires_ts is None:
             return 0
+        return expires_ts - server_clock.now()
+
+    @classmethod
+    def _response_ttl(cls, headers) -> float:
+        """Determine the seconds until a response just received expires.
+
+        The time is relative to the ``Date`` header of the response,
+        so it does not depend on the local clock.
+        """
+        expires_ts = _parse_http_date(str(headers.get('Expires')))
+        if expires_ts is None:
+            return 0
+        date_ts = _parse_http_date(str(headers.get('Date')))
+        if date_ts is None:
+            return cls._time_to_expiry(headers.get('Expires'))
+        return expires_ts - date_ts
 
     def results(self, **kwargs) -> Union[Any, Tuple[Any, IncomingResponse]]:
         """Executes the request and returns the response from ESI for the current
         route. Response will include all pages if there are more available.
 
-        Accepts same parameters in ``kwargs`` as :meth:`result`
+        Accepts same parameters in ``kwargs`` as :meth:`result` plus ``parallel_pages``
+
+        Args:
+            parallel_pages: (optional) set to ``True`` to fetch all pages after \
+                the first concurrently, overwrites default
 
         Returns:
             same as :meth:`result`, but for multiple pages
         """
         results = list()
         headers = None
+        is_paged = "page" in self.operation.params
+        for result, headers in self._iter_pages(**kwargs):
+            if is_paged:
+                # append to results list to be seamless to the client
+                results += result
+            else:
+                results = result
+
+        # obey the output
+        if self.request_config.also_return_response:
+            return results, headers
+        else:
+            return results
+
+    def results_iter(self, by_page: bool = False, **kwargs) -> Iterator:
+        """Executes the request and yields the response from ESI for the current
+        route as the pages are retrieved.
+
+        Only the current page is kept in memory, which allows processing
+        very large responses in chunks.
+
+        Accepts same parameters in ``kwargs`` as :meth:`results`
+
+        Args:
+            by_page: (optional) set to ``True`` to yield a list with all items \
+                of each page instead of single items
+
+        Yields:
+            Items from the response or lists of items for each page
+        """
+        for result, _ in self._iter_pages(**kwargs):
+            if by_page or not isinstance(result, list):
+                yield result
+            else:
+                yield from result
+
+    def _iter_pages(self, **kwargs) -> Iterator[Tuple[Any, IncomingResponse]]:
+        """Generate the result and response for all pages of the current route."""
+        parallel_pages = (
+            kwargs.pop('parallel_pages')
+            if 'parallel_pages' in kwargs.keys()
+            else app_settings.ESI_PARALLEL_PAGES
+        )
         # preserve original value
         _also_return_response = self.request_config.also_return_response
         # override to always get the raw response for expiry header
         self.request_config.also_return_response = True
+        try:
+            if "page" not in self.operation.params:
+                yield self.result(**kwargs)
+                return
 
-        if "page" in self.operation.params:
             current_page = 1
             total_pages = 1
-
-            # loop all pages and add data to output array
+            # loop all pages
             while current_page <= total_pages:
                 self.future.request.params["page"] = current_page
                 # will use cache if applicable
                 result, headers = self.result(**kwargs)
                 total_pages = int(headers.headers['X-Pages'])
-                # append to results list to be seamless to the client
-                results += result
+                yield result, headers
                 current_page += 1
-        else:  # it doesn't so just return
-            results, headers = self.result(**kwargs)
+                if current_page <= total_pages and (
+                    parallel_pages or self._is_cached(kwargs.get('ignore_cache'))
+                ):
+                    yield from self._results_pages(
+                        current_page, total_pages, parallel_pages, **kwargs
+                    )
+                    break
+        finally:
+            # restore original value
+            self.request_config.also_return_response = _also_return_response
 
-        # restore original value
-        self.request_config.also_return_response = _also_return_response
+    def results_cursor(
+        self, after: Optional[str] = None, **kwargs
+    ) -> Tuple[list, Optional[str]]:
+        """Executes the request for a route with cursor based pagination
+        and returns all records from ESI.
 
-        # obey the output
-        if self.request_config.also_return_response:
-            return results, headers
-        else:
-            return results
+        Without ``after`` all records are returned from the newest to the oldest.
+        With the cursor returned by a previous call as ``after``,
+        only records added since that call are returned.
+
+        Accepts same parameters in ``kwargs`` as :meth:`result`
+
+        Args:
+            after: (optional) cursor to resume from
+
+        Returns:
+            Tuple with all records and the cursor for resuming with the next call
+        """
+        records = list()
+        for page, after in self.results_cursor_iter(after=after, **kwargs):
+            records += page
+        return records, after
+
+    def results_cursor_iter(
+        self, after: Optional[str] = None, **kwargs
+    ) -> Iterator[Tuple[list, Optional[str]]]:
+        """Executes the request for a route with cursor based pagination
+        and yields the records from ESI as the pages are retrieved.
+
+        Same as :meth:`results_cursor`, but the cursor for resuming is yielded
+        with each page. It can be stored after a page has been processed,
+        so an interrupted sync can be resumed from there.
+
+        Yields:
+            Tuples with the records of a page and the cursor for resuming
+        """
+        params = self.operation.params
+        if 'before' not in params or 'after' not in params:
+            raise ValueError(
+                f'{self.operation.operation_id} does not support cursor pagination'
+            )
+
+        # preserve original values
+        _also_return_response = self.request_config.also_return_response
+        self.request_config.also_return_response = True
+        request_params = self.future.request.params
+        _cursor_params = {
+            name: request_params[name]
+            for name in ('after', 'before')
+            if name in request_params
+        }
+        try:
+            if after:
+                # follow the after cursor until there are no newer records
+                while True:
+                    request_params['after'] = after
+                    result, _ = self.result(**kwargs)
+                    records = self._cursor_records(result)
+                    next_after = self._cursor(result, 'after')
+                    if records:
+                        yield records, next_after or after
+                    if not records or not next_after or next_after == after:
+                        break
+                    after = next_after
+            else:
+                # follow the before cursor until there are no older records
+                request_params.pop('after', None)
+                request_params.pop('before', None)
+                result, _ = self.result(**kwargs)
+                after = self._cursor(result, 'after')
+                while True:
+                    records = self._cursor_records(result)
+                    if not records:
+                        break
+                    yield records, after
+                    before = self._cursor(result, 'before')
+                    if not before or before == request_params.get('before'):
+                        break
+                    request_params['before'] = before
+                    result, _ = self.result(**kwargs)
+        finally:
+            # restore original values
+            self.request_config.also_return_response = _also_return_response
+            request_params.pop('after', None)
+            request_params.pop('before', None)
+            request_params.update(_cursor_params)
+
+    @staticmethod
+    def _cursor(result: dict, name: str) -> Optional[str]:
+        """Return a cursor from the result of a route with cursor based pagination."""
+        return (result.get('cursor') or {}).get(name)
+
+    @staticmethod
+    def _cursor_records(result: dict) -> list:
+        """Return the records from the result of a route
+        with cursor based pagination.
+        """
+        for key, value in result.items():
+            if key != 'cursor' and isinstance(value, list):
+                return value
+        return []
+
+    def _results_pages(
+        self, first_page: int, last_page: int, parallel_pages: bool, **kwargs
+    ) -> Iterator[Tuple[Any, IncomingResponse]]:
+        """Fetch a range of pages.
+
+        Pages are looked up in the cache in batches of ``PAGES_CACHE_BATCH_SIZE``
+        with a single round trip per batch. The next batch is only looked up
+        when the pages of the previous batch have been processed.
+        Pages missing from the cache are fetched one by one or concurrently.
+
+        Yields:
+            Tuples with result and response for each page in page order
+        """
+        page_futures = []
+        for page in range(first_page, last_page + 1):
+            page_future = self._clone()
+            page_future.future.request.params['page'] = page
+            page_futures.append(page_future)
+
+        pages = self._cached_pages(page_futures, kwargs.get('ignore_cache'))
+        if parallel_pages:
+            yield from self._results_parallel(pages, **kwargs)
+            return
+
+        for page_future, response in pages:
+            if response is not None:
+                yield page_future._decode(response), response
+            else:
+                yield page_future.result(**kwargs)
+
+    def _cached_pages(
+        self, page_futures: list, ignore_cache: bool = False
+    ) -> Iterator[Tuple['CachingHttpFuture', Optional[CachedResponse]]]:
+        """Look up pages in the cache in batches.
+
+        Yields:
+            Tuples with the future of each page and its unexpired cached response
+            or ``None`` if it is not cached
+        """
+        is_cached = self._is_cached(ignore_cache)
+        for start in range(0, len(page_futures), PAGES_CACHE_BATCH_SIZE):
+            batch = page_futures[start:start + PAGES_CACHE_BATCH_SIZE]
+            if not is_cached:
+                yield from ((page_future, None) for page_future in batch)
+                continue
+
+            responses = self._cache_get_many(
+                [page_future._cache_key() for page_future in batch]
+            )
+            for page_future, response in zip(batch, responses):
+                if (
+                    response is not None
+                    and self._time_to_expiry(str(response.headers.get('Expires')))
+                    < 0
+                ):
+                    response = None
+                yield page_future, response
+
+    @staticmethod
+    def _results_parallel(
+        pages: Iterator[Tuple['CachingHttpFuture', Optional[CachedResponse]]],
+        **kwargs,
+    ) -> Iterator[Tuple[Any, IncomingResponse]]:
+        """Fetch pages missing from the cache concurrently.
+
+        Pages are processed through a sliding window as large as the connection
+        pool. The next page is only started after a page has been yielded,
+        so fetched pages do not pile up in memory while the caller is busy.
+        Each page is cached and retried like a single request.
+
+        Yields:
+            Tuples with result and response for each page in the given order
+        """
+        window_size = max(1, app_settings.ESI_CONNECTION_POOL_MAXSIZE)
+        window = deque()
+        with ThreadPoolExecutor(
+            max_workers=window_size, thread_name_prefix='esi_pages'
+        ) as executor:
+
+            def fill_window():
+                for page_future, response in islice(pages, window_size - len(window)):
+                    if response is None:
+                        response = executor.submit(page_future.result, **kwargs)
+                    window.append((page_future, response))
+
+            try:
+                fill_window()
+                while window:
+                    page_future, response = window.popleft()
+                    if isinstance(response, Future):
+                        yield response.result()
+                    else:
+                        yield page_future._decode(response), response
+                    fill_window()
+            finally:
+                for _, response in window:
+                    if isinstance(response, Future):
+                        response.cancel()
 
     def results_localized(self, languages: list = None, **kwargs) -> dict:
         """Executes the request and returns the response from ESI for all default
         languages and pages (if any).
 
-        Accepts same parameters in ``kwargs`` as :meth:`result` plus ``languages``
+        The languages are fetched concurrently. Operations which are not localized
+        are only fetched once and the same response is returned for all languages.
+
+        Accepts same parameters in ``kwargs`` as :meth:`results` plus ``languages``
 
         Args:
             languages: (optional) list of languages to return \
@@ -128,19 +1115,82 @@ class CachingHttpFuture(HttpFuture):
         Returns:
             Dict of all responses with the language code as keys.
         """
+        my_languages = self._languages(languages)
+        if not self._is_localized():
+            results = self.results(**kwargs)
+            return {language: results for language in my_languages}
+
+        max_workers = min(
+            max(1, app_settings.ESI_CONNECTION_POOL_MAXSIZE), len(my_languages)
+        )
+        with ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='esi_languages'
+        ) as executor:
+            futures = {
+                language: executor.submit(
+                    self._clone().results, language=language, **kwargs
+                )
+                for language in my_languages
+            }
+            try:
+                return {
+                    language: future.result() for language, future in futures.items()
+                }
+            finally:
+                for future in futures.values():
+                    future.cancel()
+
+    @staticmethod
+    def _languages(languages: Optional[list]) -> list:
+        """Validate the requested languages or return the default languages."""
         if not languages:
-            my_languages = list(app_settings.ESI_LANGUAGES)
-        else:
-            my_languages = []
-            for lang in dict.fromkeys(languages):
-                if lang not in app_settings.ESI_LANGUAGES:
-                    raise ValueError('Invalid language code: %s' % lang)
-                my_languages.append(lang)
-
-        return {
-            language: self.results(language=language, **kwargs)
-            for language in my_languages
-        }
+            return list(app_settings.ESI_LANGUAGES)
+        my_languages = []
+        for lang in dict.fromkeys(languages):
+            if lang not in app_settings.ESI_LANGUAGES:
+                raise ValueError('Invalid language code: %s' % lang)
+            my_languages.append(lang)
+        return my_languages
+
+    def _is_localized(self) -> bool:
+        """Determine if the current route returns localized responses."""
+        params = self.operation.params
+        return 'language' in params or 'Accept-Language' in params
+
+    async def aresult(self, **kwargs) -> Union[Any, Tuple[Any, IncomingResponse]]:
+        """Async version of :meth:`result`.
+
+        The request is run in a thread pool sized by
+        ``ESI_CONNECTION_POOL_MAXSIZE`` and uses the same caching and retries.
+        """
+        return await _run_async(self.result, **kwargs)
+
+    async def aresults(self, **kwargs) -> Union[Any, Tuple[Any, IncomingResponse]]:
+        """Async version of :meth:`results`.
+
+        The request is run in a thread pool sized by
+        ``ESI_CONNECTION_POOL_MAXSIZE`` and uses the same caching, retries
+        and pagination.
+        """
+        return await _run_async(self.results, **kwargs)
+
+    async def aresults_localized(self, languages: list = None, **kwargs) -> dict:
+        """Async version of :meth:`results_localized`.
+
+        The languages are awaited concurrently.
+        """
+        my_languages = self._languages(languages)
+        if not self._is_localized():
+            results = await self.aresults(**kwargs)
+            return {language: results for language in my_languages}
+
+        results = await asyncio.gather(
+            *(
+                self._clone().aresults(language=language, **kwargs)
+                for language in my_languages
+            )
+        )
+        return dict(zip(my_languages, results))
 
     def result(self, **kwargs) -> Union[Any, Tuple[Any, IncomingResponse]]:
         """Executes the request and returns the response from ESI. Response will
@@ -151,6 +1201,9 @@ class CachingHttpFuture(HttpFuture):
             retries: (optional) max number of retries, overwrites default
             language: (optional) retrieve result for specific language
             ignore_cache: (optional) set to ``True`` to ignore response caching
+            stale_while_revalidate: (optional) set to ``True`` to return a recently \
+                expired cached response right away and refresh it in the background, \
+                overwrites default
 
         Returns:
             Response from endpoint or a tuple with response from endpoint \
@@ -170,56 +1223,479 @@ class CachingHttpFuture(HttpFuture):
         ignore_cache = (
             kwargs.pop('ignore_cache') if 'ignore_cache' in kwargs.keys() else False
         )
+        stale_while_revalidate = (
+            kwargs.pop('stale_while_revalidate')
+            if 'stale_while_revalidate' in kwargs.keys()
+            else app_settings.ESI_CACHE_STALE_WHILE_REVALIDATE
+        )
 
-        if (
+        if self._is_cached(ignore_cache):
+            cache_key = self._cache_key()
+            response = self._cache_get(cache_key)
+            if response is not None:
+                expiry = self._time_to_expiry(str(response.headers.get('Expires')))
+                etag = response.headers.get('ETag')
+                if expiry >= 0:
+                    result = self._decode(response)
+                elif response.status_code >= 400:
+                    response = None
+                elif (
+                    stale_while_revalidate
+                    and -expiry <= app_settings.ESI_CACHE_STALE_GRACE_PERIOD
+                ):
+                    logger.debug(
+                        "cache expired by %d seconds, serving stale response", expiry
+                    )
+                    self._refresh_in_background(cache_key, response, **kwargs)
+                    result = self._decode(response)
+                elif etag and 'If-None-Match' not in self.future.request.headers:
+                    logger.debug(
+                        "cache expired by %d seconds, revalidating with ETag %s",
+                        expiry,
+                        etag
+                    )
+                    result, response = self._fetch_single_flight(
+                        cache_key, self._revalidate, etag, response, **kwargs
+                    )
+                else:
+                    logger.debug(
+                        "cache expired by %d seconds, Forcing expiry", expiry
+                    )
+                    response = None
+
+            if response is None:
+                result, response = self._fetch_single_flight(
+                    cache_key, self._result_with_retries, **kwargs
+                )
+
+            if self.request_config.also_return_response:
+                return result, response
+            return result
+
+        elif self.operation is not None:
+            result, response = self._result_with_retries(**kwargs)
+            if self.request_config.also_return_response:
+                return result, response
+            return result
+
+        return super().result(**kwargs)
+
+    def _is_cached(self, ignore_cache: bool = False) -> bool:
+        """Determine if responses for the current request are cached."""
+        return (
             app_settings.ESI_CACHE_RESPONSE
             and not ignore_cache
             and self.future.request.method == 'GET'
             and self.operation is not None
+        )
+
+    def _clone(self) -> 'CachingHttpFuture':
+        """Create a copy of this future with its own copy of the request.
+
+        The copy can be used safely in another thread.
+        """
+        request = copy.copy(self.future.request)
+        request.params = dict(request.params)
+        request.headers = dict(request.headers)
+        future = copy.copy(self.future)
+        future.request = request
+        return self.__class__(
+            future,
+            self.response_adapter,
+            self.operation,
+            copy.copy(self.request_config),
+        )
+
+    def _refresh_in_background(
+        self, cache_key: str, response: CachedResponse, **kwargs
+    ) -> Optional[Future]:
+        """Refresh a stale cache entry in a background thread.
+
+        Only one refresh per cache entry is started at a time. A short lived
+        lock in the cache prevents other processes from refreshing the same
+        entry concurrently.
+
+        Returns:
+            Future of the refresh or ``None`` if a refresh is already running
+        """
+        with _stale_refresh_lock:
+            if cache_key in _stale_refresh_keys:
+                return None
+            _stale_refresh_keys.add(cache_key)
+
+        lock_key = f'{cache_key}_refresh'
+        try:
+            is_locked = not cache.add(
+                lock_key, True, app_settings.ESI_REQUESTS_READ_TIMEOUT
+            )
+        except Exception:
+            is_locked = False
+            logger.warning("Failed to acquire ESI refresh lock", exc_info=True)
+
+        if is_locked:
+            _stale_refresh_keys.discard(cache_key)
+            return None
+
+        return _get_stale_refresh_executor().submit(
+            self._clone()._refresh_cache, cache_key, lock_key, response, **kwargs
+        )
+
+    def _refresh_cache(
+        self, cache_key: str, lock_key: str, response: CachedResponse, **kwargs
+    ) -> None:
+        """Fetch a stale response again from ESI and update the cache."""
+        try:
+            etag = response.headers.get('ETag')
+            if etag:
+                _, response = self._revalidate(etag, response, **kwargs)
+            else:
+                _, response = self._result_with_retries(**kwargs)
+            self._cache_response(cache_key, response)
+        except Exception:
+            logger.warning(
+                "Failed to refresh stale ESI response for %s",
+                self.future.request.url,
+                exc_info=True
+            )
+        finally:
+            _stale_refresh_keys.discard(cache_key)
+            try:
+                cache.delete(lock_key)
+            except Exception:
+                logger.warning("Failed to release ESI refresh lock", exc_info=True)
+
+    def _fetch_single_flight(
+        self, cache_key: str, fetch, *args, **kwargs
+    ) -> Tuple[Any, IncomingResponse]:
+        """Fetch a response from ESI and cache it,
+        while coalescing concurrent requests for the same cache key.
+
+        Only one thread per process fetches the response.
+        The other threads of the process wait for it and get its result
+        or its exception, even if nothing was cached.
+
+        Only one process at a time fetches the response.
+        Processes are coordinated with a short lived lock in the cache.
+        The fetching thread of another process polls the cache until the response
+        appears or the lock is released. If that takes longer than
+        ``ESI_CACHE_SINGLE_FLIGHT_TIMEOUT`` seconds the response is fetched
+        regardless. Waiting threads of the same process wait without a timeout
+        for the fetching thread.
+
+        Args:
+            cache_key: cache key of the response
+            fetch: method fetching the response from ESI, called with \
+                ``args`` and ``kwargs``
+
+        Returns:
+            Tuple with result and response
+        """
+        if not app_settings.ESI_CACHE_SINGLE_FLIGHT:
+            return self._fetch_and_cache(cache_key, fetch, *args, **kwargs)
+
+        (result, response), is_shared = _single_flight_call(
+            cache_key, self._fetch_locked, cache_key, fetch, *args, **kwargs
+        )
+        if is_shared:
+            logger.debug('Using response fetched concurrently: %s', cache_key)
+            # the result of the fetching thread may be modified by its caller
+            result = copy.deepcopy(result)
+        return result, response
+
+    def _fetch_locked(
+        self, cache_key: str, fetch, *args, **kwargs
+    ) -> Tuple[Any, IncomingResponse]:
+        """Fetch a response from ESI and cache it,
+        while no other process is fetching it.
+
+        The caller has just missed the cache, so it is only read again
+        after waiting for another process.
+        """
+        lock_key = f'{cache_key}_fetch'
+        timeout = app_settings.ESI_CACHE_SINGLE_FLIGHT_TIMEOUT
+        deadline = monotonic() + timeout
+        while True:
+            try:
+                is_acquired = cache.add(lock_key, True, timeout)
+            except Exception:
+                is_acquired = True
+                logger.warning("Failed to acquire ESI fetch lock", exc_info=True)
+
+            if is_acquired or monotonic() >= deadline:
+                break
+
+            sleep(SINGLE_FLIGHT_POLL_SECS)
+            response = self._cache_get_fresh(cache_key)
+            if response is not None:
+                logger.debug('Using response fetched by other process: %s', cache_key)
+                return self._decode(response), response
+
+        try:
+            return self._fetch_and_cache(cache_key, fetch, *args, **kwargs)
+        finally:
+            if is_acquired:
+                try:
+                    cache.delete(lock_key)
+                except Exception:
+                    logger.warning("Failed to release ESI fetch lock", exc_info=True)
+
+    def _fetch_and_cache(
+        self, cache_key: str, fetch, *args, **kwargs
+    ) -> Tuple[Any, IncomingResponse]:
+        """Fetch a response from ESI and cache it.
+
+        Error responses are cached too, if configured for their status code.
+        """
+        try:
+            result, response = fetch(*args, **kwargs)
+        except HTTPError as ex:
+            self._cache_error(cache_key, ex)
+            raise
+
+        self._cache_response(cache_key, response)
+        return result, response
+
+    def _cache_get_fresh(self, cache_key: str) -> Optional[CachedResponse]:
+        """Fetch a response from the cache, but only if it has not expired."""
+        response = self._cache_get(cache_key)
+        if (
+            response is not None
+            and self._time_to_expiry(str(response.headers.get('Expires'))) >= 0
         ):
-            result = None
-            response = None
-            cache_key = self._cache_key()
+            return response
+        return None
+
+    def _cache_get(self, cache_key: str) -> Optional[CachedResponse]:
+        """Fetch a response from the local cache or else the Django cache.
+
+        Responses from the Django cache are only used, if they have not been
+        invalidated since they were cached.
+
+        Returns:
+            Cached response or ``None`` if there is no usable cache entry
+        """
+        if local_response_cache.is_enabled:
+            envelope = local_response_cache.get(cache_key)
+            if envelope:
+                return CachedResponse.from_envelope(envelope)
+
+        try:
+            envelope = cache.get(cache_key)
+        except Exception:
+            logger.warning(
+                "Attempt to read ESI results from cache failed", exc_info=True
+            )
+            return None
+
+        response = CachedResponse.from_envelope(envelope) if envelope else None
+        if response is not None and not self._is_current_generation(response):
+            return None
+        if response is not None and local_response_cache.is_enabled:
+            local_response_cache.set(
+                cache_key,
+                envelope,
+                self._time_to_expiry(str(response.headers.get('Expires'))),
+            )
+        return response
+
+    def _cache_get_many(self, cache_keys: list) -> list:
+        """Fetch many responses from the local cache or else the Django cache.
+
+        Responses missing from the local cache are fetched from the Django cache
+        with a single round trip. All keys must belong to the same cache
+        generations as the current request, e.g. the pages of a response.
+
+        Returns:
+            Cached response or ``None`` for each key
+        """
+        responses = dict()
+        if local_response_cache.is_enabled:
+            for cache_key in cache_keys:
+                envelope = local_response_cache.get(cache_key)
+                response = CachedResponse.from_envelope(envelope) if envelope else None
+                if response is not None:
+                    responses[cache_key] = response
+
+        missing = [cache_key for cache_key in cache_keys if cache_key not in responses]
+        if missing:
+            try:
+                envelopes = cache.get_many(missing)
+            except Exception:
+                envelopes = dict()
+                logger.warning(
+                    "Attempt to read ESI results from cache failed", exc_info=True
+                )
+            for cache_key, envelope in envelopes.items():
+                response = CachedResponse.from_envelope(envelope)
+                if response is None or not self._is_current_generation(response):
+                    continue
+                responses[cache_key] = response
+                if local_response_cache.is_enabled:
+                    local_response_cache.set(
+                        cache_key,
+                        envelope,
+                        self._time_to_expiry(str(response.headers.get('Expires'))),
+                    )
+
+        return [responses.get(cache_key) for cache_key in cache_keys]
+
+    def _cache_response(self, cache_key: str, response) -> None:
+        """Store a response in the cache until it expires.
+
+        Responses are kept for another ``ESI_CACHE_STALE_GRACE_PERIOD`` seconds
+        after they expired, so they can be served while being refreshed.
+        Responses with an ETag are kept for at least
+        ``ESI_CACHE_ETAG_RETENTION`` seconds after they expired,
+        so they can be revalidated with a conditional request.
+        """
+        if not response or 'Expires' not in response.headers:
+            return
+
+        expires = self._response_ttl(response.headers)
+        if expires <= 0:
+            return
+
+        retention = app_settings.ESI_CACHE_STALE_GRACE_PERIOD
+        if response.headers.get('ETag'):
+            retention = max(retention, app_settings.ESI_CACHE_ETAG_RETENTION)
+
+        try:
+            if not isinstance(response, CachedResponse):
+                response = CachedResponse.from_response(response)
+        except Exception:
+            logger.warning("Failed to write ESI result to cache", exc_info=True)
+            return
+
+        self._cache_set(cache_key, response, expires, max(0, retention))
+
+    def _cache_error(self, cache_key: str, error: HTTPError) -> None:
+        """Store an error response in the cache, if configured for its status code.
+
+        The error is cached until it expires according to the ``Expires``
+        header or else for the configured time. Responses of the error limit
+        (420) are cached until the limit resets according to the
+        ``X-Esi-Error-Limit-Reset`` header. ESI sends this header with all
+        errors, but for other errors it does not tell how long they last.
+        """
+        ttls = {
+            **app_settings.ESI_CACHE_ERRORS,
+            **app_settings.ESI_CACHE_ERRORS_BY_OPERATION.get(
+                self.operation.operation_id, {}
+            ),
+        }
+        if not ttls.get(error.status_code) or error.response is None:
+            return
+
+        headers = error.response.headers
+        expires = self._response_ttl(headers)
+        if expires <= 0 and error.status_code == 420:
+            try:
+                expires = int(headers.get('X-Esi-Error-Limit-Reset', 0))
+            except ValueError:
+                expires = 0
+        if expires <= 0:
+            expires = ttls[error.status_code]
+
+        try:
+            response = CachedResponse.from_response(error.response)
+        except Exception:
+            logger.warning("Failed to write ESI error to cache", exc_info=True)
+            return
+
+        response.headers['Expires'] = formatdate(
+            server_clock.now() + expires, usegmt=True
+        )
+        self._cache_set(cache_key, response, expires)
+
+    def _cache_set(
+        self, cache_key: str, response: CachedResponse, expires: float, retention=0
+    ) -> None:
+        """Store a response in the Django cache and the local cache.
+
+        Args:
+            cache_key: cache key of the response
+            response: response to store
+            expires: seconds until the response expires
+            retention: seconds to keep the response in the Django cache \
+                after it expired
+        """
+        try:
+            response.generations = self._current_generations()
+            envelope = response.to_envelope()
+            cache.set(cache_key, envelope, expires + retention)
+        except Exception:
+            logger.warning("Failed to write ESI result to cache", exc_info=True)
+            return
+
+        if local_response_cache.is_enabled:
+            local_response_cache.set(cache_key, envelope, expires)
+
+    def _decode(self, response: IncomingResponse) -> Any:
+        """Unmarshal the body of a cached response.
+
+        Cached bodies have already been validated when they were received,
+        so JSON bodies are unmarshalled without validating them again.
+
+        Raises:
+            HTTPError: for cached error responses
+        """
+        if response.status_code >= 400:
             try:
-                cached = cache.get(cache_key)
+                swagger_result = self._unmarshal(response)
             except Exception:
-                cached = None
-                logger.warning(
-                    "Attempt to read ESI results from cache failed", exc_info=True
-                )
+                swagger_result = None
+            raise make_http_exception(response, swagger_result=swagger_result)
+
+        return self._unmarshal(response)
+
+    def _unmarshal(self, response: IncomingResponse) -> Any:
+        """Unmarshal the body of a cached response without validating it."""
+        content_type = response.headers.get('Content-Type', '').lower()
+        if not content_type.startswith('application/json'):
+            return unmarshal_response_inner(response, self.operation)
+
+        response_spec = get_response_spec(response.status_code, self.operation)
+        if 'schema' not in response_spec:
+            return None
+
+        swagger_spec = self.operation.swagger_spec
+        return unmarshal_schema_object(
+            swagger_spec=swagger_spec,
+            schema_object_spec=swagger_spec.deref(response_spec['schema']),
+            value=response.json(),
+        )
 
-            if cached:
-                result, response = cached
-                expiry = self._time_to_expiry(str(response.headers.get('Expires')))
-                if expiry < 0:
-                    logger.warning(
-                        "cache expired by %d seconds, Forcing expiry", expiry
-                    )
-                    cached = False
-
-            if not cached:
-                result, response = self._result_with_retries(**kwargs)
-                if response and 'Expires' in response.headers:
-                    expires = self._time_to_expiry(response.headers['Expires'])
-                    if expires > 0:
-                        try:
-                            cache.set(cache_key, (result, response), expires)
-                        except Exception:
-                            logger.warning(
-                                "Failed to write ESI result to cache", exc_info=True
-                            )
+    def _revalidate(
+        self, etag: str, response: CachedResponse, **kwargs
+    ) -> Tuple[Any, IncomingResponse]:
+        """Revalidate an expired cached response with ESI.
 
-            if self.request_config.also_return_response:
-                return result, response
-            return result
+        Sends the request with an ``If-None-Match`` header. When ESI answers
+        with 304 Not Modified the cached body is reused and only the headers
+        of the cached response are refreshed.
 
-        elif self.operation is not None:
-            result, response = self._result_with_retries(**kwargs)
-            if self.request_config.also_return_response:
-                return result, response
-            return result
+        Args:
+            etag: ETag of the cached response
+            response: cached response
 
-        return super().result(**kwargs)
+        Returns:
+            Tuple with result and response, either the cached ones \
+                with updated headers or the newly received ones
+        """
+        headers = self.future.request.headers
+        headers['If-None-Match'] = etag
+        try:
+            return self._result_with_retries(**kwargs)
+        except HTTPNotModified as ex:
+            logger.debug('ESI response not modified: %s', self.future.request.url)
+            server_clock.update(ex.response.headers.get('Date'))
+            response.headers.pop('Date', None)
+            for header in ('Expires', 'Date', 'ETag', 'Last-Modified'):
+                if header in ex.response.headers:
+                    response.headers[header] = ex.response.headers[header]
+            return self._decode(response), response
+        finally:
+            headers.pop('If-None-Match', None)
 
     def _result_with_retries(self, **kwargs) -> Tuple[Any, IncomingResponse]:
         """Execute request and retry on certain HTTP errors.
@@ -242,53 +1718,352 @@ class CachingHttpFuture(HttpFuture):
         max_retries = max(0, max_retries)
 
         retries = 0
-        while retries <= max_retries:
-            try:
-                if app_settings.ESI_INFO_LOGGING_ENABLED:
-                    params = self.future.request.params
-                    logger.info(
-                        'Fetching from ESI: %s%s%s',
+        try:
+            while retries <= max_retries:
+                try:
+                    if app_settings.ESI_INFO_LOGGING_ENABLED:
+                        params = self.future.request.params
+                        logger.info(
+                            'Fetching from ESI: %s%s%s',
+                            self.future.request.url,
+                            f' - language {params["language"]}'
+                            if 'language' in params else '',
+                            f' - page {params["page"]}'
+                            if 'page' in params else ''
+                        )
+                    logger.debug(
+                        'ESI request: %s - %s',
                         self.future.request.url,
-                        f' - language {params["language"]}'
-                        if 'language' in params else '',
-                        f' - page {params["page"]}'
-                        if 'page' in params else ''
+                        self.future.request.params
                     )
-                logger.debug(
-                    'ESI request: %s - %s',
-                    self.future.request.url,
-                    self.future.request.params
+                    logger.debug('ESI request headers: %s', self.future.request.headers)
+                    result, response = super().result(**kwargs)
+                    server_clock.update(response.headers.get('Date'))
+                    logger.debug('ESI response status code: %s', response.status_code)
+                    logger.debug('ESI response headers: %s', response.headers)
+                    logger.debug('ESI response content: %s', response.text)
+                    break
+                except (
+                    HTTPBadGateway, HTTPGatewayTimeout, HTTPServiceUnavailable
+                ) as ex:
+                    if retries < max_retries:
+                        retries += 1
+                        logger.warning(
+                            "ESI error - %s %s - Retry: %d/%d",
+                            self.future.request.url,
+                            ex.status_code,
+                            retries,
+                            max_retries
+                        )
+                        wait_secs = (
+                            app_settings.ESI_SERVER_ERROR_BACKOFF_FACTOR
+                            * (2 ** (retries - 1))
+                        )
+                        sleep(wait_secs)
+                    else:
+                        raise ex
+        finally:
+            # restore original value
+            self.request_config.also_return_response = _also_return_response
+        return result, response
+
+
+requests_client.HttpFuture = CachingHttpFuture
+
+
+class CallableOperationPlus(CallableOperation):
+    """Extended wrapper for an operation, which can also fetch the results
+    for many values of a parameter concurrently.
+
+    Requests share the connection pool, the cache and the retry policy
+    of the client.
+    """
+
+    def map(
+        self, max_workers: Optional[int] = None, result_kwargs: dict = None, **op_kwargs
+    ) -> dict:
+        """Fetch the results for many values of a parameter concurrently.
+
+        Example:
+
+        .. code-block:: python
+
+            types = esi.client.Universe.get_universe_types_type_id.map(
+                type_id=[587, 603, 608]
+            )
+
+        Accepts same parameters in ``op_kwargs`` as the operation itself.
+        Exactly one of them has to be a list, tuple, set or range of values.
+
+        Args:
+            max_workers: (optional) max number of concurrent requests, \
+                defaults to ``ESI_CONNECTION_POOL_MAXSIZE``
+            result_kwargs: (optional) parameters passed on to \
+                :meth:`CachingHttpFuture.results`
+
+        Returns:
+            Dict with the result for each value. When fetching the result \
+            for a value failed, the exception is returned instead.
+        """
+        return dict(
+            self.map_iter(
+                max_workers=max_workers, result_kwargs=result_kwargs, **op_kwargs
+            )
+        )
+
+    def map_iter(
+        self, max_workers: Optional[int] = None, result_kwargs: dict = None, **op_kwargs
+    ) -> Iterator[Tuple[Any, Any]]:
+        """Same as :meth:`map`, but yields the results as they are completed.
+
+        Yields:
+            Tuples with value and result or exception
+        """
+        name, values = self._map_param(op_kwargs)
+        values = list(dict.fromkeys(values))
+        if not values:
+            return
+
+        max_workers = max_workers or app_settings.ESI_CONNECTION_POOL_MAXSIZE
+        with ThreadPoolExecutor(
+            max_workers=min(max(1, max_workers), len(values)),
+            thread_name_prefix='esi_map',
+        ) as executor:
+            futures = {
+                executor.submit(
+                    self._map_result, result_kwargs or {}, **op_kwargs, **{name: value}
+                ): value
+                for value in values
+            }
+            try:
+                for future in as_completed(futures):
+                    yield futures[future], future.result()
+            finally:
+                for future in futures:
+                    future.cancel()
+
+    def results_chunked(
+        self, max_workers: Optional[int] = None, result_kwargs: dict = None, **op_kwargs
+    ) -> Any:
+        """Fetch the results for an operation with an array in the body,
+        which can be larger than the max size allowed by ESI.
+
+        Example:
+
+        .. code-block:: python
+
+            names = esi.client.Universe.post_universe_names.results_chunked(
+                ids=character_ids
+            )
+
+        The array is split into chunks of the max size defined in the spec,
+        which are fetched concurrently. The results of all chunks are merged.
+        When the result contains an object for each item of the array,
+        e.g. the name for each ID, the objects are also cached for each item.
+        Then only items missing from the cache are fetched.
+
+        Accepts same parameters in ``op_kwargs`` as the operation itself.
+
+        Args:
+            max_workers: (optional) max number of concurrent requests, \
+                defaults to ``ESI_CONNECTION_POOL_MAXSIZE``
+            result_kwargs: (optional) parameters passed on to \
+                :meth:`CachingHttpFuture.result`
+
+        Returns:
+            Merged results of all chunks
+        """
+        name, schema = self._body_array_param()
+        values = list(dict.fromkeys(op_kwargs.pop(name)))
+        result_kwargs = dict(result_kwargs or {})
+        item_key = self._item_key(name)
+        is_cached = (
+            item_key is not None
+            and app_settings.ESI_CACHE_RESPONSE
+            and not result_kwargs.pop('ignore_cache', False)
+        )
+
+        items = dict()
+        if is_cached:
+            cache_keys = {
+                value: self._item_cache_key(op_kwargs, value) for value in values
+            }
+            try:
+                cached = cache.get_many(list(cache_keys.values()))
+            except Exception:
+                cached = dict()
+                logger.warning(
+                    "Attempt to read ESI results from cache failed", exc_info=True
                 )
-                logger.debug('ESI request headers: %s', self.future.request.headers)
-                result, response = super().result(**kwargs)
-                logger.debug('ESI response status code: %s', response.status_code)
-                logger.debug('ESI response headers: %s', response.headers)
-                logger.debug('ESI response content: %s', response.text)
-                break
-            except (HTTPBadGateway, HTTPGatewayTimeout, HTTPServiceUnavailable) as ex:
-                if retries < max_retries:
-                    retries += 1
-                    logger.warning(
-                        "ESI error - %s %s - Retry: %d/%d",
-                        self.future.request.url,
-                        ex.status_code,
-                        retries,
-                        max_retries
-                    )
-                    wait_secs = (
-                        app_settings.ESI_SERVER_ERROR_BACKOFF_FACTOR
-                        * (2 ** (retries - 1))
+            items = {
+                value: cached[cache_key]
+                for value, cache_key in cache_keys.items()
+                if cache_key in cached
+            }
+
+        missing = [value for value in values if value not in items]
+        chunk_size = schema.get('maxItems') or len(missing) or 1
+        chunks = [
+            missing[num:num + chunk_size] for num in range(0, len(missing), chunk_size)
+        ]
+        results = list()
+        if chunks:
+            max_workers = max_workers or app_settings.ESI_CONNECTION_POOL_MAXSIZE
+            with ThreadPoolExecutor(
+                max_workers=min(max(1, max_workers), len(chunks)),
+                thread_name_prefix='esi_chunks',
+            ) as executor:
+                futures = [
+                    executor.submit(
+                        self._chunk_result, result_kwargs, **op_kwargs, **{name: chunk}
                     )
-                    sleep(wait_secs)
-                else:
-                    raise ex
+                    for chunk in chunks
+                ]
+                try:
+                    for future in futures:
+                        results.append(future.result())
+                finally:
+                    for future in futures:
+                        future.cancel()
+
+        if item_key is None:
+            return self._merge_results([result for result, _ in results])
+
+        for result, response in results:
+            fetched = {item[item_key]: item for item in result}
+            items.update(fetched)
+            if is_cached:
+                self._cache_items(op_kwargs, fetched, response)
+
+        return [items[value] for value in values if value in items]
+
+    def _body_array_param(self) -> Tuple[str, dict]:
+        """Return name and schema of the array in the body of the operation."""
+        swagger_spec = self.operation.swagger_spec
+        for name, param in self.operation.params.items():
+            if param.location != 'body':
+                continue
+            schema = swagger_spec.deref(param.param_spec.get('schema', {}))
+            if schema.get('type') == 'array':
+                return name, schema
+
+        raise ValueError(f'{self.operation.operation_id} has no array in the body')
+
+    def _item_key(self, name: str) -> Optional[str]:
+        """Return the property identifying the item for each object in the result.
+
+        e.g. ``id`` for ``ids`` or ``character_id`` for ``characters``
+        """
+        swagger_spec = self.operation.swagger_spec
+        try:
+            response_spec = get_response_spec(200, self.operation)
+        except Exception:
+            return None
+        schema = swagger_spec.deref(response_spec.get('schema', {}))
+        if schema.get('type') != 'array':
+            return None
+
+        properties = swagger_spec.deref(schema.get('items', {})).get('properties', {})
+        singular = name[:-1] if name.endswith('s') else name
+        for key in (singular, f'{singular}_id'):
+            if key in properties and key.endswith('id'):
+                return key
+        return None
+
+    def _item_cache_key(self, op_kwargs: dict, value) -> str:
+        """Generate the key name used to cache the result for one item."""
+        params = dict(op_kwargs)
+        if params.get('token'):
+            params['token'] = _token_identity(params['token']) or params['token']
+        generations = _get_cache_generations(
+            [_cache_generation_key(self.operation.operation_id)]
+        )
+        data = json.dumps(
+            [sorted(params.items()), value, generations], sort_keys=True, default=str
+        ).encode('utf-8')
+        # The following hash is not used in any security context. It is only used
+        # to generate unique values, collisions are acceptable and "data" is not
+        # coming from user-generated input
+        str_hash = md5(data).hexdigest()  # nosec B303, B303-1
+        return f'{_cache_key_prefix(self.operation, params)}_item_{str_hash}'
 
-        # restore original value
-        self.request_config.also_return_response = _also_return_response
-        return result, response
+    def _cache_items(self, op_kwargs: dict, items: dict, response) -> None:
+        """Store the result for each item in the cache until the response expires."""
+        expires = CachingHttpFuture._response_ttl(response.headers)
+        if expires <= 0 or not items:
+            return
+        try:
+            cache.set_many(
+                {
+                    self._item_cache_key(op_kwargs, value): item
+                    for value, item in items.items()
+                },
+                expires,
+            )
+        except Exception:
+            logger.warning("Failed to write ESI result to cache", exc_info=True)
 
+    def _chunk_result(
+        self, result_kwargs: dict, **op_kwargs
+    ) -> Tuple[Any, IncomingResponse]:
+        future = self(**op_kwargs)
+        future.request_config.also_return_response = True
+        return future.result(**result_kwargs)
+
+    @staticmethod
+    def _merge_results(results: list) -> Any:
+        """Merge the results of several chunks."""
+        if len(results) == 1:
+            return results[0]
+        if all(isinstance(result, list) for result in results):
+            return [obj for result in results for obj in result]
+        if all(isinstance(result, dict) for result in results):
+            merged = dict()
+            for result in results:
+                for key, value in result.items():
+                    if isinstance(value, list):
+                        merged.setdefault(key, []).extend(value)
+                    else:
+                        merged[key] = value
+            return merged
+        raise ValueError('Results of this operation can not be merged')
+
+    def _map_param(self, op_kwargs: dict) -> Tuple[str, Any]:
+        """Remove the parameter to map over from op_kwargs and return it."""
+        swagger_spec = self.operation.swagger_spec
+        names = list()
+        for name, value in op_kwargs.items():
+            if not isinstance(value, (list, tuple, set, frozenset, range)):
+                continue
+            param = self.operation.params.get(name)
+            if param is not None:
+                param_spec = param.param_spec
+                schema = swagger_spec.deref(param_spec.get('schema', {}))
+                if 'array' in (param_spec.get('type'), schema.get('type')):
+                    continue
+            names.append(name)
+
+        if len(names) != 1:
+            raise ValueError(
+                'Exactly one parameter must have a list of values to map over'
+            )
+
+        return names[0], op_kwargs.pop(names[0])
+
+    def _map_result(self, result_kwargs: dict, **op_kwargs) -> Any:
+        try:
+            return self(**op_kwargs).results(**result_kwargs)
+        except Exception as ex:
+            logger.debug(
+                'Failed to fetch %s for %s',
+                self.operation.operation_id,
+                op_kwargs,
+                exc_info=True,
+            )
+            return ex
 
-requests_client.HttpFuture = CachingHttpFuture
+
+bravado_client.CallableOperation = CallableOperationPlus
 
 
 class TokenAuthenticator(requests_client.Authenticator):
@@ -317,7 +2092,9 @@ class TokenAuthenticator(requests_client.Authenticator):
 
 
 class RequestsClientPlus(requests_client.RequestsClient):
-    """RequestsClient with ability to set the user agent header for all requests"""
+    """RequestsClient with ability to set the user agent header for all requests
+    and to use an existing session.
+    """
 
     def __init__(
         self,
@@ -325,10 +2102,13 @@ class RequestsClientPlus(requests_client.RequestsClient):
         ssl_cert=None,
         future_adapter_class=requests_client.RequestsFutureAdapter,
         response_adapter_class=requests_client.RequestsResponseAdapter,
+        session: requests.Session = None,
     ):
         super().__init__(
             ssl_verify, ssl_cert, future_adapter_class, response_adapter_class
         )
+        if session is not None:
+            self.session = session
         self.user_agent = None
 
     def request(
@@ -342,6 +2122,172 @@ class RequestsClientPlus(requests_client.RequestsClient):
         return super().request(request_params, operation, request_config)
 
 
+class SwaggerClientPlus(SwaggerClient):
+    """SwaggerClient which can cheaply create clients for other tokens."""
+
+    def __init__(self, swagger_spec, also_return_response=False):
+        super().__init__(swagger_spec, also_return_response=also_return_response)
+        self._also_return_response = also_return_response
+
+    def for_token(self, token, datasource: str = None) -> 'SwaggerClientPlus':
+        """Create a client for a token, which shares the spec, resources
+        and HTTP session with this client.
+
+        Args:
+            token(esi.models.Token): used to access authenticated endpoints.
+            datasource: (optional) Name of the ESI datasource to access, \
+                defaults to the datasource of this client
+
+        Returns:
+            New ESI client
+        """
+        http_client = copy.copy(self.swagger_spec.http_client)
+        authenticator = http_client.authenticator
+        if datasource is None and isinstance(authenticator, TokenAuthenticator):
+            datasource = authenticator.datasource
+        http_client.authenticator = TokenAuthenticator(
+            token=token, datasource=datasource
+        )
+        return self.__class__(
+            _spec_with_http_client(self.swagger_spec, http_client),
+            also_return_response=self._also_return_response,
+        )
+
+
+class LazyResources(MutableMapping):
+    """Resources of a spec, which are only built on first access.
+
+    Behaves like the ``AliasKeyDict`` of bravado-core: the original names of
+    resources can be used as alias for their sanitized names,
+    but only the sanitized names are iterated.
+
+    Built resources are kept. Concurrent first accesses may build a resource
+    twice, but all callers get the same instance.
+    """
+
+    def __init__(self, keys, build, alias_to_key=None):
+        """
+        Args:
+            keys: names of all resources
+            build: callable returning the resource for a name
+            alias_to_key: (optional) dict mapping aliases to names
+        """
+        self._keys = dict.fromkeys(keys)
+        self._build = build
+        self._resources = dict()
+        self.alias_to_key = dict(alias_to_key or {})
+
+    def add_alias(self, alias, key):
+        if alias != key:
+            self.alias_to_key[alias] = key
+
+    def determine_key(self, key):
+        return self.alias_to_key.get(key, key)
+
+    def built(self) -> dict:
+        """Return the resources built so far by name."""
+        return dict(self._resources)
+
+    def __getitem__(self, key):
+        key = self.determine_key(key)
+        try:
+            return self._resources[key]
+        except KeyError:
+            if key not in self._keys:
+                raise
+        return self._resources.setdefault(key, self._build(key))
+
+    def __setitem__(self, key, resource):
+        key = self.determine_key(key)
+        self._keys[key] = None
+        self._resources[key] = resource
+
+    def __delitem__(self, key):
+        key = self.determine_key(key)
+        del self._keys[key]
+        self._resources.pop(key, None)
+        self.alias_to_key = {
+            alias: name for alias, name in self.alias_to_key.items() if name != key
+        }
+
+    def __contains__(self, key):
+        return self.determine_key(key) in self._keys
+
+    def __iter__(self):
+        return iter(list(self._keys))
+
+    def __len__(self):
+        return len(self._keys)
+
+
+class SpecPlus(Spec):
+    """Spec which can build its resources and operations lazily.
+
+    With ``ESI_CLIENT_LAZY_RESOURCES`` enabled a resource and the parameter
+    schemas of its operations are only built on first access.
+    """
+
+    def build(self):
+        if not app_settings.ESI_CLIENT_LAZY_RESOURCES:
+            return super().build()
+
+        # same as Spec.build() except for the resources
+        self._validate_spec()
+        model_discovery(self)
+        if self.config['internally_dereference_refs']:
+            self.deref = lambda ref_dict: ref_dict
+            self._internal_spec_dict = self.deref_flattened_spec
+        for user_defined_format in self.config['formats']:
+            self.register_format(user_defined_format)
+        self.resources = self._lazy_resources()
+        self.api_url = build_api_serving_url(
+            spec_dict=self.spec_dict,
+            origin_url=self.origin_url,
+            use_spec_url_for_base_path=self.config['use_spec_url_for_base_path'],
+        )
+
+    def _lazy_resources(self) -> LazyResources:
+        """Index the operations of all resources without building them.
+
+        Resources are derived from the tags of operations the same way as
+        bravado-core does.
+        """
+        deref = self.deref
+        self._resource_operations = defaultdict(list)
+        alias_to_key = dict()
+        spec_dict = deref(self._internal_spec_dict)
+        for path_name, path_spec in deref(spec_dict.get('paths', {})).items():
+            for http_method, op_spec in deref(path_spec).items():
+                if http_method.startswith('x-') or http_method == 'parameters':
+                    continue
+                op_spec = deref(op_spec)
+                tags = deref(op_spec.get('tags', [])) or [
+                    convert_path_to_resource(path_name)
+                ]
+                for tag in tags:
+                    tag = deref(tag)
+                    name = sanitize_name(tag)
+                    self._resource_operations[name].append(
+                        (path_name, http_method, op_spec)
+                    )
+                    if tag != name:
+                        alias_to_key[tag] = name
+
+        return LazyResources(
+            self._resource_operations, self._build_resource, alias_to_key
+        )
+
+    def _build_resource(self, name) -> Resource:
+        operations = dict()
+        for path_name, http_method, op_spec in self._resource_operations[name]:
+            operation = Operation.from_spec(self, path_name, http_method, op_spec)
+            operations[operation.operation_id] = operation
+        return Resource(name, operations)
+
+
+bravado_client.Spec = SpecPlus
+
+
 def build_cache_name(name):
     """
     Cache key name formatter
@@ -352,16 +2298,198 @@ def build_cache_name(name):
     return 'esi_swaggerspec_%s' % name
 
 
-def cache_spec(name, spec):
+def cache_spec(name, spec, etag=None, last_modified=None):
     """
     Cache the spec dict
+
+    Cached specs are kept until replaced. Their ETag, Last-Modified header and
+    content hash are cached separately for checking them for changes.
     :param name: Version name
     :param spec: Spec dict
+    :param etag: ETag header of the response with the spec
+    :param last_modified: Last-Modified header of the response with the spec
     :return: True if cached
     """
-    return cache.set(
-        build_cache_name(name), spec, app_settings.ESI_SPEC_CACHE_DURATION
+    result = cache.set(build_cache_name(name), spec, None)
+    cache.set(
+        _spec_meta_cache_name(name), _spec_meta(spec, etag, last_modified), None
+    )
+    return result
+
+
+def _spec_meta_cache_name(name) -> str:
+    return build_cache_name(name) + '_meta'
+
+
+def _spec_meta(spec_dict, etag=None, last_modified=None) -> dict:
+    """Return the meta data for checking a cached spec for changes."""
+    return {
+        'hash': _spec_hash(spec_dict),
+        'etag': etag,
+        'last_modified': last_modified,
+        'checked_at': time(),
+    }
+
+
+def _spec_hash(spec_dict) -> str:
+    """Return a hash of the content of a spec dict."""
+    data = json.dumps(spec_dict, sort_keys=True, separators=(',', ':'))
+    return md5(data.encode('utf-8')).hexdigest()  # nosec B303, B303-1
+
+
+def _refresh_spec(name, http_client, meta=None) -> Tuple[Optional[dict], dict]:
+    """Download a spec and cache it.
+
+    With the meta data of the cached spec a conditional request is made,
+    which only downloads the spec when it was modified.
+    :return: Tuple of spec dict or None if not modified and meta data
+    """
+    headers = dict()
+    if meta and meta.get('etag'):
+        headers['If-None-Match'] = meta['etag']
+    if meta and meta.get('last_modified'):
+        headers['If-Modified-Since'] = meta['last_modified']
+    try:
+        response = http_client.request(
+            {'method': 'GET', 'url': build_spec_url(name), 'headers': headers}
+        ).result()
+    except HTTPNotModified:
+        meta = dict(meta, checked_at=time())
+        cache.set(_spec_meta_cache_name(name), meta, None)
+        return None, meta
+
+    spec_dict = response.json()
+    meta = _spec_meta(
+        spec_dict,
+        etag=response.headers.get('ETag'),
+        last_modified=response.headers.get('Last-Modified'),
     )
+    cache.set(build_cache_name(name), spec_dict, None)
+    cache.set(_spec_meta_cache_name(name), meta, None)
+    return spec_dict, meta
+
+
+def _refresh_spec_in_background(name, meta, user_agent=None) -> Optional[Future]:
+    """Refresh a cached spec in a background thread.
+
+    Only one refresh per spec is started at a time. A short lived lock in
+    the cache prevents other processes from refreshing the same spec
+    concurrently. Specs are refreshed with an unauthenticated client
+    using the shared HTTP session. After a failed refresh the lock is kept
+    for ``SPEC_REFRESH_RETRY_SECS`` seconds, so an outage of ESI does not
+    start a new download for every client built meanwhile.
+
+    Returns:
+        Future of the refresh or ``None`` if a refresh is already running
+    """
+    cache_key = build_cache_name(name)
+    with _stale_refresh_lock:
+        if cache_key in _stale_refresh_keys:
+            return None
+        _stale_refresh_keys.add(cache_key)
+
+    lock_key = f'{cache_key}_refresh'
+    try:
+        is_locked = not cache.add(
+            lock_key, True, app_settings.ESI_REQUESTS_READ_TIMEOUT
+        )
+    except Exception:
+        is_locked = False
+        logger.warning("Failed to acquire spec refresh lock", exc_info=True)
+
+    if is_locked:
+        _stale_refresh_keys.discard(cache_key)
+        return None
+
+    def refresh():
+        http_client = RequestsClientPlus(session=_get_shared_session())
+        http_client.user_agent = user_agent
+        try:
+            _refresh_spec(name, http_client, meta)
+        except Exception:
+            logger.warning("Failed to refresh spec %s", name, exc_info=True)
+            try:
+                cache.set(lock_key, True, SPEC_REFRESH_RETRY_SECS)
+            except Exception:
+                logger.warning("Failed to keep spec refresh lock", exc_info=True)
+        else:
+            try:
+                cache.delete(lock_key)
+            except Exception:
+                logger.warning("Failed to release spec refresh lock", exc_info=True)
+        finally:
+            _stale_refresh_keys.discard(cache_key)
+
+    return _get_stale_refresh_executor().submit(refresh)
+
+
+def _get_cached_spec(name, http_client) -> Tuple[dict, dict]:
+    """Return the cached spec and its meta data, downloading it if not cached.
+
+    Specs checked longer than ``ESI_SPEC_CACHE_DURATION`` ago are refreshed
+    in the background, while the cached spec is returned.
+    """
+    cache_key = build_cache_name(name)
+    meta_key = _spec_meta_cache_name(name)
+    entries = cache.get_many([cache_key, meta_key])
+    spec_dict, meta = entries.get(cache_key), entries.get(meta_key)
+    if spec_dict is None:
+        with _single_flight(cache_key):
+            spec_dict, meta = cache.get(cache_key), cache.get(meta_key)
+            if spec_dict is None:
+                spec_dict, meta = _refresh_spec(name, http_client)
+        return spec_dict, meta or _spec_meta(spec_dict)
+
+    if meta is None:
+        # cached without meta data, e.g. by an older version
+        meta = {'hash': _spec_hash(spec_dict), 'checked_at': 0}
+    _check_cached_spec(name, http_client, meta)
+    return spec_dict, meta
+
+
+def _check_cached_spec(name, http_client, meta) -> None:
+    """Refresh a cached spec in the background if it is due for a check."""
+    if time() - meta['checked_at'] >= app_settings.ESI_SPEC_CACHE_DURATION:
+        _refresh_spec_in_background(
+            name, meta, user_agent=getattr(http_client, 'user_agent', None)
+        )
+
+
+def _load_spec(name, http_client) -> Tuple[dict, dict, bool]:
+    """Load a spec dict from a snapshot or the cache.
+
+    :return: Tuple of spec dict, its meta data and if it was loaded from a snapshot
+    """
+    snapshot = read_spec_snapshot(name)
+    if snapshot and snapshot[1] <= app_settings.ESI_SPEC_SNAPSHOT_MAX_AGE:
+        return snapshot[0], _spec_meta(snapshot[0]), True
+    try:
+        spec_dict, meta = _get_cached_spec(name, http_client)
+    except (HTTPError, requests.RequestException):
+        if not snapshot:
+            raise
+        logger.warning(
+            "Failed to load spec %s, using snapshot from %d seconds ago",
+            name,
+            snapshot[1],
+        )
+        return snapshot[0], _spec_meta(snapshot[0]), True
+    return spec_dict, meta, False
+
+
+def _load_spec_meta(name, http_client) -> dict:
+    """Load the meta data of a spec for checking it for changes.
+
+    Only the small meta data entry is read for cached specs.
+    """
+    snapshot = read_spec_snapshot(name)
+    if snapshot and snapshot[1] <= app_settings.ESI_SPEC_SNAPSHOT_MAX_AGE:
+        return _spec_meta(snapshot[0])
+    meta = cache.get(_spec_meta_cache_name(name))
+    if meta is None:
+        return _load_spec(name, http_client)[1]
+    _check_cached_spec(name, http_client, meta)
+    return meta
 
 
 def build_spec_url(spec_version):
@@ -373,45 +2501,293 @@ def build_spec_url(spec_version):
     return urlparse.urljoin(app_settings.ESI_API_URL, spec_version + '/swagger.json')
 
 
-def get_spec(name, http_client=None, config=None):
+def build_snapshot_path(name):
+    """
+    Generates the path of the spec snapshot file for the ESI version
+    :param name: Name of the swagger spec version, like latest or v4
+    :return: Path to the snapshot file in ``ESI_SPEC_SNAPSHOT_DIR``
+    :rtype: str
+    """
+    return os.path.join(
+        app_settings.ESI_SPEC_SNAPSHOT_DIR, build_cache_name(name) + '.json'
+    )
+
+
+def write_spec_snapshot(name, http_client=None):
+    """
+    Downloads and validates the spec and writes a snapshot of it to disk
+    :param name: Name of the swagger spec version, like latest or v4
+    :param http_client: Requests client used for retrieving specs
+    :return: Path to the snapshot file
+    :rtype: str
+    """
+    http_client = http_client or requests_client.RequestsClient()
+    spec_url = build_spec_url(name)
+    spec_dict = Loader(http_client).load_spec(spec_url)
+    # snapshots are not validated again when loaded
+    Spec.from_dict(
+        copy.deepcopy(spec_dict),
+        spec_url,
+        http_client,
+        dict(CONFIG_DEFAULTS, **SPEC_CONFIG),
+    )
+    path = build_snapshot_path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = '%s.%d.tmp' % (path, os.getpid())
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(
+            {'url': spec_url, 'created_at': time(), 'spec': spec_dict},
+            f,
+            separators=(',', ':'),
+        )
+    os.replace(temp_path, path)
+    return path
+
+
+def read_spec_snapshot(name) -> Optional[Tuple[dict, float]]:
+    """
+    Reads the snapshot of a spec if ``ESI_SPEC_SNAPSHOT_DIR`` is set
+    :param name: Name of the swagger spec version, like latest or v4
+    :return: Tuple of spec dict and age of the snapshot in seconds or None
+    """
+    if not app_settings.ESI_SPEC_SNAPSHOT_DIR:
+        return None
+    path = build_snapshot_path(name)
+    try:
+        with open(path, encoding='utf-8') as f:
+            snapshot = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError):
+        logger.warning("Failed to read spec snapshot %s", path, exc_info=True)
+        return None
+    if snapshot.get('url') != build_spec_url(name):
+        return None
+    return snapshot['spec'], time() - snapshot['created_at']
+
+
+def get_spec(name, http_client=None, config=None, operations=None, resources=None):
     """
     :param name: Name of the revision of spec, eg latest or v4
     :param http_client: Requests client used for retrieving specs
     :param config: Spec configuration - see Spec.CONFIG_DEFAULTS
+    :param operations: Operation IDs to retain, see :func:`minimize_spec`
+    :param resources: Resource names to retain, see :func:`minimize_spec`
     :return: :class:`bravado_core.spec.Spec`
     """
     http_client = http_client or requests_client.RequestsClient()
+    spec_dict, _, is_snapshot = _load_spec(name, http_client)
+    return _spec_from_dict(
+        name, spec_dict, is_snapshot, http_client, config, operations, resources
+    )
 
-    def load_spec():
-        loader = Loader(http_client)
-        return loader.load_spec(build_spec_url(name))
 
-    spec_dict = cache.get_or_set(
-        build_cache_name(name), load_spec, app_settings.ESI_SPEC_CACHE_DURATION
-    )
+def _spec_from_dict(
+    name,
+    spec_dict,
+    is_snapshot,
+    http_client,
+    config=None,
+    operations=None,
+    resources=None,
+) -> Spec:
+    """Build a spec from a loaded spec dict, see :func:`get_spec`."""
     config = dict(CONFIG_DEFAULTS, **(config or {}))
-    return Spec.from_dict(spec_dict, build_spec_url(name), http_client, config)
+    if is_snapshot:
+        # snapshots are validated when written
+        config['validate_swagger_spec'] = False
+
+    if operations or resources:
+        spec_dict = minimize_spec(spec_dict, operations, resources)
+    return SpecPlus.from_dict(spec_dict, build_spec_url(name), http_client, config)
 
 
-def build_spec(base_version, http_client=None, **kwargs):
+_built_specs = dict()
+_built_specs_lock = threading.Lock()
+
+
+def build_spec(
+    base_version, http_client=None, operations=None, resources=None, **kwargs
+):
     """
     Generates the Spec used to initialize a SwaggerClient,
     supporting mixed resource versions
+
+    Built specs are shared by all clients of the process.
+    When their specs are checked for changes every ``ESI_SPEC_CACHE_DURATION``
+    seconds, they are only rebuilt if the content of the specs changed.
+    Each call returns a view of the shared spec using its own http client.
     :param http_client: :class:`bravado.requests_client.RequestsClient`
     :param base_version: Version to base the spec on.
     Any resource without an explicit version will be this.
+    :param operations: Operation IDs to retain, see :func:`minimize_spec`
+    :param resources: Resource names to retain, see :func:`minimize_spec`
     :param kwargs: Explicit resource versions, by name (eg Character='v4')
     :return: :class:`bravado_core.spec.Spec`
     """
-    base_spec = get_spec(base_version, http_client=http_client, config=SPEC_CONFIG)
+    key = (
+        app_settings.ESI_API_URL,
+        base_version,
+        tuple(sorted(
+            (resource.capitalize(), resource_version)
+            for resource, resource_version in kwargs.items()
+        )),
+        tuple(sorted(operations or [])),
+        tuple(sorted(resources or [])),
+    )
+    http_client = http_client or requests_client.RequestsClient()
+    versions = sorted({base_version, *kwargs.values()})
+    with _built_specs_lock:
+        spec, next_check, spec_hashes = _built_specs.get(key, (None, None, None))
+        if spec is None or monotonic() >= next_check:
+            loaded_specs = None
+            if spec is None:
+                loaded_specs = {
+                    version: _load_spec(version, http_client) for version in versions
+                }
+                metas = [loaded_specs[version][1] for version in versions]
+            else:
+                metas = [_load_spec_meta(version, http_client) for version in versions]
+            current_hashes = tuple(meta['hash'] for meta in metas)
+            if spec is None or current_hashes != spec_hashes:
+                if loaded_specs is None:
+                    loaded_specs = {
+                        version: _load_spec(version, http_client)
+                        for version in versions
+                    }
+                    metas = [loaded_specs[version][1] for version in versions]
+                    current_hashes = tuple(meta['hash'] for meta in metas)
+                spec = _build_spec(
+                    base_version,
+                    http_client=http_client,
+                    operations=operations,
+                    resources=resources,
+                    loaded_specs=loaded_specs,
+                    **kwargs,
+                )
+                for swagger_spec in _operation_specs(spec):
+                    # don't keep the client of the first caller alive
+                    swagger_spec.http_client = None
+            # check again when the specs are due for their next check,
+            # which is right away while a refresh is still pending
+            checked_at = min(meta['checked_at'] for meta in metas)
+            next_check = (
+                monotonic()
+                + checked_at
+                + app_settings.ESI_SPEC_CACHE_DURATION
+                - time()
+            )
+            _built_specs[key] = (spec, next_check, current_hashes)
+    return _spec_with_http_client(spec, http_client)
+
+
+def _operation_specs(spec: Spec) -> list:
+    """Return the specs the operations of a spec belong to.
+
+    Operations of resources with an explicit version belong to another spec.
+    """
+    specs = {id(spec): spec}
+    resources = spec.resources
+    if isinstance(resources, LazyResources):
+        # resources not built yet belong to the spec itself
+        resources = resources.built()
+    for resource in resources.values():
+        for operation in resource.operations.values():
+            specs.setdefault(id(operation.swagger_spec), operation.swagger_spec)
+    return list(specs.values())
+
+
+def _shallow_copy(obj):
+    """Copy an object without calling ``__getstate__``.
+
+    Copying a spec with :func:`copy.copy` would rebuild all its models.
+    """
+    obj_copy = obj.__class__.__new__(obj.__class__)
+    obj_copy.__dict__.update(obj.__dict__)
+    return obj_copy
+
+
+def _spec_with_http_client(spec: Spec, http_client) -> Spec:
+    """Create a view of a shared spec which uses the given http client.
+
+    Only the spec, its resources and operations are copied shallowly,
+    everything else is shared. Resources of the view are copied on first access.
+    """
+    views = dict()
+
+    def view_of(swagger_spec: Spec) -> Spec:
+        view = views.get(id(swagger_spec))
+        if view is None:
+            view = _shallow_copy(swagger_spec)
+            view.http_client = http_client
+            view = views.setdefault(id(swagger_spec), view)
+        return view
+
+    def build_resource(name) -> Resource:
+        operations = dict()
+        for operation_id, operation in spec.resources[name].operations.items():
+            operations[operation_id] = _shallow_copy(operation)
+            operations[operation_id].swagger_spec = view_of(operation.swagger_spec)
+        return Resource(name, operations)
+
+    view = view_of(spec)
+    view.resources = LazyResources(
+        spec.resources,
+        build_resource,
+        alias_to_key=getattr(spec.resources, 'alias_to_key', None),
+    )
+    return view
+
+
+def _build_spec(
+    base_version,
+    http_client=None,
+    operations=None,
+    resources=None,
+    loaded_specs=None,
+    **kwargs,
+) -> Spec:
+    """Build a new spec, see :func:`build_spec`.
+
+    ``loaded_specs`` are the results of :func:`_load_spec` by version,
+    which are used instead of loading the specs again.
+    """
+    remaining_uses = Counter([base_version, *kwargs.values()])
+
+    def get_versioned_spec(version) -> Spec:
+        if loaded_specs is None:
+            return get_spec(
+                version,
+                http_client=http_client,
+                config=SPEC_CONFIG,
+                operations=operations,
+                resources=resources,
+            )
+        spec_dict, _, is_snapshot = loaded_specs[version]
+        remaining_uses[version] -= 1
+        if remaining_uses[version]:
+            # building a spec annotates its dict
+            spec_dict = copy.deepcopy(spec_dict)
+        return _spec_from_dict(
+            version,
+            spec_dict,
+            is_snapshot,
+            http_client,
+            SPEC_CONFIG,
+            operations,
+            resources,
+        )
+
+    base_spec = get_versioned_spec(base_version)
     if kwargs:
         for resource, resource_version in kwargs.items():
-            versioned_spec = get_spec(
-                resource_version, http_client=http_client, config=SPEC_CONFIG
-            )
+            versioned_spec = get_versioned_spec(resource_version)
             try:
                 spec_resource = versioned_spec.resources[resource.capitalize()]
             except KeyError:
+                if operations or resources:
+                    # resource is not retained in the minimized spec
+                    continue
                 raise AttributeError(
                     'Resource {} not found on API revision {}'.format(
                         resource, resource_version
@@ -421,17 +2797,22 @@ def build_spec(base_version, http_client=None, **kwargs):
     return base_spec
 
 
-def read_spec(path, http_client=None):
+def read_spec(path, http_client=None, operations=None, resources=None):
     """
     Reads in a swagger spec file used to initialize a SwaggerClient
     :param path: String path to local swagger spec file.
     :param http_client: :class:`bravado.requests_client.RequestsClient`
+    :param operations: Operation IDs to retain, see :func:`minimize_spec`
+    :param resources: Resource names to retain, see :func:`minimize_spec`
     :return: :class:`bravado_core.spec.Spec`
     """
     with open(path, encoding='utf-8') as f:
         spec_dict = json.loads(f.read())
 
-    return SwaggerClient.from_spec(
+    if operations or resources:
+        spec_dict = minimize_spec(spec_dict, operations, resources)
+
+    return SwaggerClientPlus.from_spec(
         spec_dict, http_client=http_client, config=SPEC_CONFIG
     )
 
@@ -442,6 +2823,8 @@ def esi_client_factory(
     spec_file: str = None,
     version: str = None,
     app_info_text: str = None,
+    operations: list = None,
+    resources: list = None,
     **kwargs
 ) -> SwaggerClient:
     """Generate a new ESI client.
@@ -455,6 +2838,10 @@ def esi_client_factory(
             included in the User-Agent header. Should contain name and version of the \
             application using ESI. e.g. `"my-app v1.0.0"`. \
             Note that spaces are used as delimiter.
+        operations: Operation IDs to include in the client, e.g. \
+            `["get_status"]`. Defaults to all operations.
+        resources: Resource names to include in the client, e.g. \
+            `["Universe"]`. Defaults to all resources.
         kwargs: Explicit resource versions to build, in the form Character='v4'. \
             Same values accepted as version.
 
@@ -462,13 +2849,16 @@ def esi_client_factory(
     Meaning the version and resource version kwargs are ignored in favour of the
     versions available in the spec_file.
 
+    Building a client with only the operations and resources it needs
+    is faster and uses less memory.
+
     Returns:
         New ESI client
     """
     if app_settings.ESI_INFO_LOGGING_ENABLED:
         logger.info('Generating an ESI client...')
 
-    client = RequestsClientPlus()
+    client = RequestsClientPlus(session=_get_shared_session())
     user_agent = (
         str(app_info_text) if app_info_text else f"{__title__} v{__version__}"
     )
@@ -477,22 +2867,24 @@ def esi_client_factory(
 
     client.user_agent = user_agent
 
-    my_http_adapter = HTTPAdapter(
-        pool_maxsize=app_settings.ESI_CONNECTION_POOL_MAXSIZE,
-        max_retries=app_settings.ESI_CONNECTION_ERROR_MAX_RETRIES
-    )
-    client.session.mount('https://', my_http_adapter)
-
     if token or datasource:
         client.authenticator = TokenAuthenticator(token=token, datasource=datasource)
 
     api_version = version or app_settings.ESI_API_VERSION
 
     if spec_file:
-        return read_spec(spec_file, http_client=client)
+        return read_spec(
+            spec_file, http_client=client, operations=operations, resources=resources
+        )
     else:
-        spec = build_spec(api_version, http_client=client, **kwargs)
-        return SwaggerClient(spec)
+        spec = build_spec(
+            api_version,
+            http_client=client,
+            operations=operations,
+            resources=resources,
+            **kwargs,
+        )
+        return SwaggerClientPlus(spec)
 
 
 def minimize_spec(spec_dict, operations=None, resources=None):
@@ -506,27 +2898,74 @@ def minimize_spec(spec_dict, operations=None, resources=None):
     :type resources: list of str
     :return: Minimized swagger spec dict
     :rtype: dict
+
+    Definitions, parameters and responses are only retained
+    if they are referenced by the retained operations.
     """
     operations = operations or []
     resources = resources or []
 
-    # keep the ugly overhead for now but only add paths we need
-    minimized = {key: value for key, value in spec_dict.items() if key != 'paths'}
+    minimized = {
+        key: value
+        for key, value in spec_dict.items()
+        if key not in ('paths',) + SPEC_REF_SECTIONS
+    }
     minimized['paths'] = {}
 
     for path_name, path in spec_dict['paths'].items():
         for method, data in path.items():
+            if method == 'parameters':
+                continue
             if (
                 data['operationId'] in operations
                 or any(tag in resources for tag in data['tags'])
             ):
                 if path_name not in minimized['paths']:
                     minimized['paths'][path_name] = {}
+                    if 'parameters' in path:
+                        minimized['paths'][path_name]['parameters'] = (
+                            path['parameters']
+                        )
                 minimized['paths'][path_name][method] = data
 
+    # only add what is reachable from the retained paths
+    for section in SPEC_REF_SECTIONS:
+        if section in spec_dict:
+            minimized[section] = {}
+    pending = list(_spec_refs(minimized['paths']))
+    seen = set()
+    while pending:
+        ref = pending.pop()
+        if ref in seen:
+            continue
+        seen.add(ref)
+        parts = [
+            part.replace('~1', '/').replace('~0', '~')
+            for part in urlparse.unquote(ref[2:]).split('/')
+        ]
+        if len(parts) < 2 or parts[1] not in spec_dict.get(parts[0], {}):
+            continue
+        if parts[0] in SPEC_REF_SECTIONS:
+            value = spec_dict[parts[0]][parts[1]]
+            minimized[parts[0]][parts[1]] = value
+            pending.extend(_spec_refs(value))
+
     return minimized
 
 
+def _spec_refs(obj) -> Iterator[str]:
+    """Generate all local references in a part of a spec dict."""
+    if isinstance(obj, dict):
+        ref = obj.get('$ref')
+        if isinstance(ref, str) and ref.startswith('#/'):
+            yield ref
+        for value in obj.values():
+            yield from _spec_refs(value)
+    elif isinstance(obj, list):
+        for value in obj:
+            yield from _spec_refs(value)
+
+
 class EsiClientProvider:
     """Class for providing a single ESI client instance for the whole app
 
@@ -539,11 +2978,15 @@ class EsiClientProvider:
             the application using ESI. e.g. `"my-app v1.0.0"`. \
             Note that spaces are used as delimiter.
         kwargs: Explicit resource versions to build, in the form Character='v4'. \
-            Same values accepted as version.
+            Same values accepted as version. Also accepts `operations` and \
+            `resources` to include in the client, see :func:`esi_client_factory`.
 
     If a spec_file is specified, specific versioning is not available.
     Meaning the version and resource version kwargs are ignored in favour of the
     versions available in the spec_file.
+
+    The client is built once on first access, even when accessed from many threads
+    at the same time, or up front by calling :meth:`warm`.
     """
 
     _client = None
@@ -561,18 +3004,45 @@ class EsiClientProvider:
         self._version = version
         self._app_text = app_info_text
         self._kwargs = kwargs
+        self._lock = threading.Lock()
+        _providers.add(self)
 
     @property
     def client(self):
         if self._client is None:
-            self._client = esi_client_factory(
-                datasource=self._datasource,
-                spec_file=self._spec_file,
-                version=self._version,
-                app_info_text=self._app_text,
-                **self._kwargs,
-            )
+            with self._lock:
+                if self._client is None:
+                    self._client = esi_client_factory(
+                        datasource=self._datasource,
+                        spec_file=self._spec_file,
+                        version=self._version,
+                        app_info_text=self._app_text,
+                        **self._kwargs,
+                    )
         return self._client
 
+    def warm(self) -> SwaggerClient:
+        """Build the client now instead of on first access.
+
+        Call this before a process starts handling requests,
+        e.g. from ``AppConfig.ready()``, gunicorn's ``post_fork`` hook
+        or Celery's ``worker_process_init`` signal.
+
+        Clients built before a fork are rebuilt on first access in the child
+        process with its own connections, reusing the already loaded spec.
+
+        Returns:
+            ESI client
+        """
+        return self.client
+
+    def _reset(self):
+        """Drop the client and lock inherited from the parent process."""
+        self._client = None
+        self._lock = threading.Lock()
+
     def __str__(self):
         return 'EsiClientProvider'
+
+
+_providers = weakref.WeakSet()
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from esi import app_settings
+from esi.clients import write_spec_snapshot
+
+
+class Command(BaseCommand):
+    help = (
+        "Download the swagger specs of ESI and write snapshots of them to "
+        "ESI_SPEC_SNAPSHOT_DIR, which are used for building clients."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "versions",
+            nargs="*",
+            help="Spec versions to download, defaults to ESI_API_VERSION. "
+            "Include the versions of all resources with explicit versions.",
+        )
+
+    def handle(self, *args, **options):
+        if not app_settings.ESI_SPEC_SNAPSHOT_DIR:
+            raise CommandError("Set ESI_SPEC_SNAPSHOT_DIR first and try again!")
+
+        versions = options["versions"] or [app_settings.ESI_API_VERSION]
+        for version in dict.fromkeys(versions):
+            path = write_spec_snapshot(version)
+            self.stdout.write("Wrote snapshot of spec %s to %s" % (version, path))
@@ -72,12 +72,13 @@ def _generate_claims(
     character_name: str,
     issuer=None,
     audience=None,
+    scopes=None,
 ) -> dict:
     if not issuer:
         issuer = _ISSUER
     expires_at = issued_at + dt.timedelta(minutes=20)
     claims = {
-        "scp": "esi-characters.read_medals.v1",
+        "scp": "esi-characters.read_medals.v1" if scopes is None else scopes,
         "jti": "xxx",
         "kid": "JWT-Signature-Key",
         "sub": f"CHARACTER:EVE:{character_id}",
@@ -104,6 +105,7 @@ def generate_token(
     issued_at: dt.datetime = None,
     issuer=None,
     audience=None,
+    scopes=None,
 ) -> Tuple[str, dict]:
     """Generate a JWT for Eve Online."""
     if not issued_at:
@@ -114,6 +116,7 @@ def generate_token(
         character_name=character_name,
         issuer=issuer,
         audience=audience,
+        scopes=scopes,
     )
     token_string = jwt.encode(
         claims=claims, key=_RSA_PRIVATE_KEY, algorithm=_ALGORITHM, headers=_HEADERS
@@ -1,12 +1,29 @@
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+import copy
+import threading
 from datetime import datetime, timedelta, timezone
+import email.message
+from email.utils import formatdate
 import os
-from unittest.mock import patch, Mock
+import re
+import tempfile
+from time import sleep, time
+from unittest.mock import call, patch, Mock
 import json
+import urllib.request
 
 import bravado
 from bravado_core.spec import Spec
 from bravado.requests_client import RequestsClient
-from bravado.exception import HTTPBadGateway
+from bravado.exception import (
+    HTTPBadGateway,
+    HTTPError,
+    HTTPNotModified,
+    make_http_exception,
+)
+import requests
 import requests_mock
 
 import django
@@ -14,21 +31,35 @@ from django.contrib.auth.models import User
 from django.core.cache import cache
 
 from . import _generate_token, _store_as_Token, NoSocketsTestCase
-from .factories import create_http_error
+from .factories import BravadoResponseStub, create_http_error
+from .jwt_factory import generate_token
 from ..clients import (
     EsiClientProvider,
+    LazyResources,
     esi_client_factory,
     TokenAuthenticator,
     build_cache_name,
+    build_snapshot_path,
     build_spec,
     build_spec_url,
     cache_spec,
     get_spec,
     read_spec,
+    read_spec_snapshot,
     minimize_spec,
     SwaggerClient,
     CachingHttpFuture,
+    CachedResponse,
+    LocalResponseCache,
     RequestsClientPlus,
+    SwaggerClientPlus,
+    invalidate_cache,
+    ServerClock,
+    _built_specs,
+    _get_shared_session,
+    _parse_http_date,
+    _reset_after_fork,
+    _single_flight_calls,
 )
 from ..errors import TokenExpiredError
 
@@ -50,9 +81,13 @@ def _load_json_file(path):
 class MockResultFuture:
     def __init__(self):
         dt = datetime.utcnow().replace(tzinfo=timezone.utc) + timedelta(seconds=60)
-        self.headers = {"Expires": dt.strftime("%a, %d %b %Y %H:%M:%S %Z")}
+        self.headers = {
+            "Expires": dt.strftime("%a, %d %b %Y %H:%M:%S %Z"),
+            "Content-Type": "application/json; charset=UTF-8",
+        }
         self.status_code = 200
         self.text = "dummy"
+        self.raw_bytes = b"dummy"
 
 
 class MockResultPast:
@@ -61,6 +96,21 @@ class MockResultPast:
         self.headers = {"Expires": dt.strftime("%a, %d %b %Y %H:%M:%S %Z")}
 
 
+def _cached_status(players: int, response, **headers) -> tuple:
+    """Build a cache envelope for a status response."""
+    return CachedResponse(
+        200,
+        {
+            "Content-Type": "application/json; charset=UTF-8",
+            **response.headers,
+            **headers,
+        },
+        json.dumps({"players": players}).encode("utf-8"),
+    ).to_envelope()
+
+
+@patch(MODULE_PATH + "._cache_generations", new=OrderedDict())
+@patch.object(django.core.cache.cache, "get_many", new=Mock(return_value={}))
 @patch.object(django.core.cache.cache, "set")
 @patch.object(django.core.cache.cache, "get")
 @patch.object(bravado.http_future.HttpFuture, "result")
@@ -85,12 +135,12 @@ class TestClientCache(NoSocketsTestCase):
         r = self.c.Status.get_status().result()
         self.assertEqual(r["players"], 500)
 
-        mock_cache_get.return_value = ({"players": 50}, MockResultFuture())
+        mock_cache_get.return_value = _cached_status(50, MockResultFuture())
         # hit cache and pass
         r = self.c.Status.get_status().result()
         self.assertEqual(r["players"], 50)
 
-        mock_cache_get.return_value = ({"players": 50}, MockResultPast())
+        mock_cache_get.return_value = _cached_status(50, MockResultPast())
         # hit cache fail, re-hit api
         r = self.c.Status.get_status().result()
         self.assertEqual(r["players"], 500)
@@ -142,190 +192,1774 @@ class TestClientCache(NoSocketsTestCase):
         r = self.c.Status.get_status().result()
         self.assertEqual(r["players"], 500)
 
+    @patch(MODULE_PATH + ".app_settings.ESI_CACHE_ETAG_RETENTION", 600)
+    def test_should_keep_responses_with_etag_after_expiry(
+        self, mock_future_result, mock_cache_get, mock_cache_set
+    ):
+        # given
+        response = MockResultFuture()
+        response.headers["ETag"] = '"abc"'
+        mock_future_result.return_value = ({"players": 500}, response)
+        mock_cache_get.return_value = False
+        # when
+        self.c.Status.get_status().result()
+        # then
+        _, _, timeout = mock_cache_set.call_args[0]
+        self.assertGreater(timeout, 600)
+        self.assertLessEqual(timeout, 660)
 
-@patch(MODULE_PATH + ".app_settings.ESI_SPEC_CACHE_DURATION", 3)
-@patch(MODULE_PATH + ".app_settings.ESI_API_URL", "https://www.example.com/esi/")
-@patch(MODULE_PATH + ".app_settings.ESI_API_DATASOURCE", "dummy")
-@patch("esi.models.app_settings.ESI_TOKEN_VALID_DURATION", 120)
-class TestTokenAuthenticator(NoSocketsTestCase):
-    def setUp(self):
-        self.user = User.objects.create_user(
-            "Bruce Wayne", "abc@example.com", "password"
-        )
-        self.token = _store_as_Token(
-            _generate_token(
-                character_id=101,
-                character_name=self.user.username,
-                scopes=["abc"],
-                access_token="my_access_token",
-            ),
-            self.user,
+    def test_should_reuse_cached_result_when_not_modified(
+        self, mock_future_result, mock_cache_get, mock_cache_set
+    ):
+        # given
+        not_modified = BravadoResponseStub(304, headers=MockResultFuture().headers)
+        mock_future_result.side_effect = HTTPNotModified(response=not_modified)
+        mock_cache_get.return_value = _cached_status(
+            50, MockResultPast(), ETag='"abc"'
         )
+        operation = self.c.Status.get_status()
+        # when
+        r = operation.result()
+        # then
+        self.assertEqual(r["players"], 50)
+        self.assertEqual(mock_future_result.call_count, 1)
+        self.assertNotIn("If-None-Match", operation.future.request.headers)
+        (_, envelope, timeout), _ = mock_cache_set.call_args
+        response = CachedResponse.from_envelope(envelope)
+        self.assertEqual(response.json()["players"], 50)
+        self.assertEqual(response.headers["Expires"], not_modified.headers["Expires"])
+        self.assertGreater(timeout, 0)
+
+    def test_should_send_etag_when_revalidating(
+        self, mock_future_result, mock_cache_get, mock_cache_set
+    ):
+        # given
+        sent_headers = []
 
-    def test_apply_defaults(self):
-        request = Mock()
-        request.headers = dict()
-        request.params = dict()
+        def my_result(*args, **kwargs):
+            sent_headers.append(dict(operation.future.request.headers))
+            return {"players": 500}, MockResultFuture()
 
-        x = TokenAuthenticator()
-        request2 = x.apply(request)
-        self.assertEqual(request2.headers["Authorization"], None)
-        self.assertEqual(request2.params["datasource"], "dummy")
+        mock_future_result.side_effect = my_result
+        mock_cache_get.return_value = _cached_status(
+            50, MockResultPast(), ETag='"abc"'
+        )
+        operation = self.c.Status.get_status()
+        # when
+        r = operation.result()
+        # then
+        self.assertEqual(r["players"], 500)
+        self.assertEqual(sent_headers[0]["If-None-Match"], '"abc"')
+        self.assertNotIn("If-None-Match", operation.future.request.headers)
 
-    def test_apply_token(self):
-        request = Mock()
-        request.headers = dict()
-        request.params = dict()
+    def test_should_store_compact_envelope(
+        self, mock_future_result, mock_cache_get, mock_cache_set
+    ):
+        # given
+        response = MockResultFuture()
+        response.headers["Set-Cookie"] = "dummy"
+        mock_future_result.return_value = ({"players": 500}, response)
+        mock_cache_get.return_value = False
+        # when
+        self.c.Status.get_status().result()
+        # then
+        (_, envelope, _), _ = mock_cache_set.call_args
+        self.assertIsInstance(envelope, tuple)
+        cached = CachedResponse.from_envelope(envelope)
+        self.assertEqual(cached.status_code, 200)
+        self.assertEqual(cached.raw_bytes, b"dummy")
+        self.assertIn("Expires", cached.headers)
+        self.assertNotIn("Set-Cookie", cached.headers)
+
+    def test_should_ignore_cache_entries_in_unknown_format(
+        self, mock_future_result, mock_cache_get, mock_cache_set
+    ):
+        # given
+        mock_future_result.return_value = ({"players": 500}, MockResultFuture())
+        mock_cache_get.return_value = ({"players": 50}, MockResultFuture())
+        # when
+        r = self.c.Status.get_status().result()
+        # then
+        self.assertEqual(r["players"], 500)
+        self.assertTrue(mock_future_result.called)
 
-        x = TokenAuthenticator(token=self.token)
-        request2 = x.apply(request)
-        self.assertEqual(request2.headers["Authorization"], "Bearer my_access_token")
-        self.assertEqual(request2.params["datasource"], "dummy")
 
-    def test_apply_token_datasource(self):
-        request = Mock()
-        request.headers = dict()
-        request.params = dict()
+@patch.object(bravado.http_future.HttpFuture, "result")
+class TestClientCacheStaleWhileRevalidate(NoSocketsTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        spec = _load_json_file(SWAGGER_SPEC_PATH_MINIMAL)
+        with requests_mock.Mocker() as requests_mocker:
+            requests_mocker.register_uri(
+                "GET", url="https://esi.evetech.net/_latest/swagger.json", json=spec
+            )
+            cls.c = esi_client_factory(spec_file=SWAGGER_SPEC_PATH_MINIMAL)
 
-        x = TokenAuthenticator(token=self.token, datasource="dummy2")
-        request2 = x.apply(request)
-        self.assertEqual(request2.headers["Authorization"], "Bearer my_access_token")
-        self.assertEqual(request2.params["datasource"], "dummy2")
+    def setUp(self) -> None:
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        patcher = patch(
+            MODULE_PATH + "._get_stale_refresh_executor", return_value=self.executor
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.operation = self.c.Status.get_status()
+        self.cache_key = self.operation._cache_key()
+        cache.set(self.cache_key, _cached_status(50, MockResultPast()), 60)
+        self.fresh_response = MockResultFuture()
+        self.fresh_response.raw_bytes = b'{"players": 500}'
+
+    @patch(MODULE_PATH + ".app_settings.ESI_CACHE_STALE_GRACE_PERIOD", 300)
+    def test_should_return_stale_response_and_refresh_it(self, mock_future_result):
+        # given
+        mock_future_result.return_value = ({"players": 500}, self.fresh_response)
+        # when
+        r = self.operation.result(stale_while_revalidate=True)
+        self.executor.shutdown(wait=True)
+        # then
+        self.assertEqual(r["players"], 50)
+        self.assertEqual(mock_future_result.call_count, 1)
+        cached = CachedResponse.from_envelope(cache.get(self.cache_key))
+        self.assertEqual(cached.json()["players"], 500)
 
-    @patch("esi.models.Token.refresh", spec=True)
-    def test_apply_token_expired_success(self, mock_Token_refresh):
-        request = Mock()
-        request.headers = dict()
-        request.params = dict()
+    @patch(MODULE_PATH + ".app_settings.ESI_CACHE_STALE_GRACE_PERIOD", 30)
+    def test_should_not_return_response_expired_beyond_grace_period(
+        self, mock_future_result
+    ):
+        # given
+        mock_future_result.return_value = ({"players": 500}, self.fresh_response)
+        # when
+        r = self.operation.result(stale_while_revalidate=True)
+        # then
+        self.assertEqual(r["players"], 500)
 
-        self.token.created -= timedelta(121)
+    @patch(MODULE_PATH + ".app_settings.ESI_CACHE_STALE_WHILE_REVALIDATE", True)
+    @patch(MODULE_PATH + ".app_settings.ESI_CACHE_STALE_GRACE_PERIOD", 300)
+    def test_should_use_setting_as_default(self, mock_future_result):
+        # given
+        mock_future_result.return_value = ({"players": 500}, self.fresh_response)
+        # when
+        r = self.operation.result()
+        self.executor.shutdown(wait=True)
+        # then
+        self.assertEqual(r["players"], 50)
 
-        x = TokenAuthenticator(token=self.token)
-        request2 = x.apply(request)
-        self.assertEqual(request2.headers["Authorization"], "Bearer my_access_token")
-        self.assertEqual(request2.params["datasource"], "dummy")
-        self.assertEqual(mock_Token_refresh.call_count, 1)
+    @patch(MODULE_PATH + ".app_settings.ESI_CACHE_STALE_WHILE_REVALIDATE", True)
+    @patch(MODULE_PATH + ".app_settings.ESI_CACHE_STALE_GRACE_PERIOD", 300)
+    def test_should_not_start_refresh_when_locked(self, mock_future_result):
+        # given
+        cache.add(f"{self.cache_key}_refresh", True)
+        # when
+        r = self.operation.result()
+        self.executor.shutdown(wait=True)
+        # then
+        self.assertEqual(r["players"], 50)
+        self.assertFalse(mock_future_result.called)
 
-    @patch("esi.models.Token.refresh", spec=True)
-    def test_apply_token_expired_failed(self, mock_Token_refresh):
-        request = Mock()
-        request.headers = dict()
-        request.params = dict()
 
-        self.token.created -= timedelta(121)
-        self.token.refresh_token = None
+@patch.object(bravado.http_future.HttpFuture, "result")
+class TestClientCacheSingleFlight(NoSocketsTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        spec = _load_json_file(SWAGGER_SPEC_PATH_MINIMAL)
+        with requests_mock.Mocker() as requests_mocker:
+            requests_mocker.register_uri(
+                "GET", url="https://esi.evetech.net/_latest/swagger.json", json=spec
+            )
+            cls.c = esi_client_factory(spec_file=SWAGGER_SPEC_PATH_MINIMAL)
 
-        x = TokenAuthenticator(token=self.token)
-        with self.assertRaises(TokenExpiredError):
-            x.apply(request)
+    def setUp(self) -> None:
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.fresh_response = MockResultFuture()
+        self.fresh_response.raw_bytes = b'{"players": 500}'
+        self.cache_key = self.c.Status.get_status()._cache_key()
 
-        self.assertEqual(mock_Token_refresh.call_count, 0)
+    @staticmethod
+    def _waiting_future_class(is_waiting: threading.Semaphore):
+        class WaitingFuture(Future):
+            def result(self, timeout=None):
+                is_waiting.release()
+                return super().result(timeout)
 
+        return WaitingFuture
 
-class TestModuleFunctions(NoSocketsTestCase):
-    @classmethod
-    def setUpClass(cls):
-        super().setUpClass()
-        cls.spec = _load_json_file(SWAGGER_SPEC_PATH_MINIMAL)
+    def test_should_fetch_only_once_for_concurrent_threads(self, mock_future_result):
+        # given
+        is_fetching = threading.Event()
+        may_finish = threading.Event()
 
-    def test_build_cache_name(self):
-        self.assertEqual(build_cache_name("abc"), "esi_swaggerspec_abc")
+        def my_result(*args, **kwargs):
+            is_fetching.set()
+            may_finish.wait(timeout=5)
+            return {"players": 500}, self.fresh_response
 
-    @patch(MODULE_PATH + ".app_settings.ESI_SPEC_CACHE_DURATION", 3)
-    def test_cache_spec(self):
-        spec = {"dummy_spec": True}
-        cache_spec("abc", spec)
-        self.assertDictEqual(cache.get("esi_swaggerspec_abc"), spec)
+        mock_future_result.side_effect = my_result
+        results = []
 
-    @patch(MODULE_PATH + ".app_settings.ESI_API_URL", "https://www.example.com/esi/")
-    def test_build_spec_url(self):
-        self.assertEqual(
-            build_spec_url("v2"), "https://www.example.com/esi/v2/swagger.json"
-        )
+        def thread_func():
+            results.append(self.c.Status.get_status().result())
 
-    @requests_mock.Mocker()
-    @patch(MODULE_PATH + ".app_settings.ESI_SPEC_CACHE_DURATION", 1)
-    def test_get_spec_defaults(self, requests_mocker):
+        threads = [threading.Thread(target=thread_func) for _ in range(3)]
+        # when
+        threads[0].start()
+        is_fetching.wait(timeout=5)
+        for thread in threads[1:]:
+            thread.start()
+        may_finish.set()
+        for thread in threads:
+            thread.join(timeout=5)
+        # then
+        self.assertEqual(mock_future_result.call_count, 1)
+        self.assertEqual([r["players"] for r in results], [500, 500, 500])
+
+    def test_should_share_errors_with_concurrent_threads(self, mock_future_result):
         # given
-        requests_mocker.register_uri(
-            "GET", url="https://esi.evetech.net/_latest/swagger.json", json=self.spec
-        )
-        requests_mocker.register_uri(
-            "GET", url="https://esi.evetech.net/latest/swagger.json", json=self.spec
-        )
+        is_fetching = threading.Event()
+        may_finish = threading.Event()
+
+        def my_result(*args, **kwargs):
+            is_fetching.set()
+            may_finish.wait(timeout=5)
+            raise create_http_error(404)
+
+        mock_future_result.side_effect = my_result
+        errors = []
+
+        def thread_func():
+            try:
+                self.c.Status.get_status().result()
+            except bravado.exception.HTTPNotFound as ex:
+                errors.append(ex)
+
+        threads = [threading.Thread(target=thread_func) for _ in range(3)]
+        is_waiting = threading.Semaphore(0)
         # when
-        spec = get_spec("latest")
+        with patch(MODULE_PATH + ".Future", self._waiting_future_class(is_waiting)):
+            threads[0].start()
+            is_fetching.wait(timeout=5)
+            for thread in threads[1:]:
+                thread.start()
+                is_waiting.acquire(timeout=5)
+            may_finish.set()
+            for thread in threads:
+                thread.join(timeout=5)
         # then
-        self.assertIsInstance(spec, Spec)
+        self.assertEqual(mock_future_result.call_count, 1)
+        self.assertEqual(len(errors), 3)
+        self.assertNotIn(self.cache_key, _single_flight_calls)
 
-    @patch(MODULE_PATH + ".app_settings.ESI_SPEC_CACHE_DURATION", 1)
-    def test_get_spec_with_http_client(self):
-        mock_http_client = Mock(spec=RequestsClient)
-        mock_http_client.request.return_value.result.return_value.json.return_value = (
-            self.spec
-        )
-        spec = get_spec("latest", http_client=mock_http_client)
-        self.assertIsInstance(spec, Spec)
+    def test_should_give_concurrent_threads_own_results(self, mock_future_result):
+        # given
+        is_fetching = threading.Event()
+        may_finish = threading.Event()
 
-    @patch(MODULE_PATH + ".app_settings.ESI_SPEC_CACHE_DURATION", 1)
-    def test_get_spec_with_config(self):
-        mock_http_client = Mock(spec=RequestsClient)
-        mock_http_client.request.return_value.result.return_value.json.return_value = (
-            self.spec
-        )
-        spec = get_spec(
-            "latest", http_client=mock_http_client, config={"dummy_config": True}
-        )
-        self.assertIsInstance(spec, Spec)
-        self.assertIn("dummy_config", spec.config)
+        def my_result(*args, **kwargs):
+            is_fetching.set()
+            may_finish.wait(timeout=5)
+            return {"players": 500}, self.fresh_response
 
-    @patch(MODULE_PATH + ".app_settings.ESI_SPEC_CACHE_DURATION", 1)
-    def test_build_spec_defaults(self):
-        mock_http_client = Mock(spec=RequestsClient)
-        mock_http_client.request.return_value.result.return_value.json.return_value = (
-            self.spec
-        )
-        spec = build_spec("v1", http_client=mock_http_client)
-        self.assertIsInstance(spec, Spec)
+        mock_future_result.side_effect = my_result
+        results = []
 
-    @patch(MODULE_PATH + ".app_settings.ESI_SPEC_CACHE_DURATION", 1)
-    def test_build_spec_explicit_resource_found(self):
-        mock_http_client = Mock(spec=RequestsClient)
-        mock_http_client.request.return_value.result.return_value.json.return_value = (
-            self.spec
-        )
-        spec = build_spec("v1", http_client=mock_http_client, Status="v1")
-        self.assertIsInstance(spec, Spec)
+        def thread_func():
+            results.append(self.c.Status.get_status().result())
 
-    @patch(MODULE_PATH + ".app_settings.ESI_SPEC_CACHE_DURATION", 1)
-    def test_build_spec_explicit_resource_not_found(self):
-        mock_http_client = Mock(spec=RequestsClient)
-        mock_http_client.request.return_value.result.return_value.json.return_value = (
-            self.spec
-        )
-        with self.assertRaises(AttributeError):
-            build_spec("v1", http_client=mock_http_client, Character="v4")
+        threads = [threading.Thread(target=thread_func) for _ in range(2)]
+        is_waiting = threading.Semaphore(0)
+        # when
+        with patch(MODULE_PATH + ".Future", self._waiting_future_class(is_waiting)):
+            threads[0].start()
+            is_fetching.wait(timeout=5)
+            threads[1].start()
+            is_waiting.acquire(timeout=5)
+            may_finish.set()
+            for thread in threads:
+                thread.join(timeout=5)
+        # then
+        self.assertEqual(results[0], results[1])
+        self.assertIsNot(results[0], results[1])
 
-    @requests_mock.Mocker()
-    def test_read_spec(self, requests_mocker):
+    @patch(MODULE_PATH + ".sleep")
+    def test_should_wait_for_response_fetched_by_other_process(
+        self, mock_sleep, mock_future_result
+    ):
         # given
-        requests_mocker.register_uri(
-            "GET", url="https://esi.evetech.net/_latest/swagger.json", json=self.spec
+        cache.add(f"{self.cache_key}_fetch", True)
+        mock_sleep.side_effect = lambda _: cache.set(
+            self.cache_key, _cached_status(50, MockResultFuture()), 60
         )
         # when
-        client = read_spec(SWAGGER_SPEC_PATH_MINIMAL)
+        r = self.c.Status.get_status().result()
         # then
-        self.assertIsInstance(client, SwaggerClient)
-
-    def test_minimize_spec_defaults(self):
-        spec_dict = minimize_spec(self.spec)
-        self.assertIsInstance(spec_dict, dict)
-        # todo: add better verification of functionality
+        self.assertEqual(r["players"], 50)
+        self.assertFalse(mock_future_result.called)
 
-    def test_minimize_spec_resources(self):
-        spec_dict = minimize_spec(self.spec, resources=["Status"])
-        self.assertIsInstance(spec_dict, dict)
-        # todo: add better verification of functionality
+    def test_should_not_read_cache_again_before_fetching(self, mock_future_result):
+        # given
+        mock_future_result.return_value = ({"players": 500}, self.fresh_response)
+        # when
+        with patch.object(cache, "get", wraps=cache.get) as spy_cache_get:
+            r = self.c.Status.get_status().result()
+        # then
+        self.assertEqual(r["players"], 500)
+        self.assertEqual(
+            [c for c in spy_cache_get.call_args_list if c[0][0] == self.cache_key],
+            [call(self.cache_key)],
+        )
+
+    @patch(MODULE_PATH + ".app_settings.ESI_CACHE_SINGLE_FLIGHT_TIMEOUT", 0)
+    def test_should_fetch_when_waiting_times_out(self, mock_future_result):
+        # given
+        cache.add(f"{self.cache_key}_fetch", True)
+        mock_future_result.return_value = ({"players": 500}, self.fresh_response)
+        # when
+        r = self.c.Status.get_status().result()
+        # then
+        self.assertEqual(r["players"], 500)
+        self.assertEqual(mock_future_result.call_count, 1)
+
+    def test_should_release_lock_after_fetching(self, mock_future_result):
+        # given
+        mock_future_result.side_effect = create_http_error(404)
+        # when
+        with self.assertRaises(bravado.exception.HTTPNotFound):
+            self.c.Status.get_status().result()
+        # then
+        self.assertIsNone(cache.get(f"{self.cache_key}_fetch"))
+
+    @patch(MODULE_PATH + ".app_settings.ESI_CACHE_SINGLE_FLIGHT", False)
+    def test_should_not_coalesce_when_disabled(self, mock_future_result):
+        # given
+        cache.add(f"{self.cache_key}_fetch", True)
+        mock_future_result.return_value = ({"players": 500}, self.fresh_response)
+        # when
+        r = self.c.Status.get_status().result()
+        # then
+        self.assertEqual(r["players"], 500)
+
+
+@patch.object(bravado.http_future.HttpFuture, "result")
+class TestClientCacheErrors(NoSocketsTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        spec = _load_json_file(SWAGGER_SPEC_PATH_MINIMAL)
+        with requests_mock.Mocker() as requests_mocker:
+            requests_mocker.register_uri(
+                "GET", url="https://esi.evetech.net/_latest/swagger.json", json=spec
+            )
+            cls.c = esi_client_factory(spec_file=SWAGGER_SPEC_PATH_MINIMAL)
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    @staticmethod
+    def _error(status_code: int, **headers) -> HTTPError:
+        return make_http_exception(
+            BravadoResponseStub(
+                status_code,
+                headers={"Content-Type": "application/json", **headers},
+                raw_bytes=b'{"error": "Test exception"}',
+            )
+        )
+
+    def _cached_expiry(self) -> float:
+        future = self.c.Status.get_status()
+        response = CachedResponse.from_envelope(cache.get(future._cache_key()))
+        return future._time_to_expiry(response.headers["Expires"])
+
+    def test_should_not_cache_errors_by_default(self, mock_future_result):
+        # given
+        mock_future_result.side_effect = self._error(404)
+        # when
+        for _ in range(2):
+            with self.assertRaises(bravado.exception.HTTPNotFound):
+                self.c.Status.get_status().result()
+        # then
+        self.assertEqual(mock_future_result.call_count, 2)
+
+    @patch(MODULE_PATH + ".app_settings.ESI_CACHE_ERRORS", {404: 60})
+    def test_should_raise_cached_error(self, mock_future_result):
+        # given
+        mock_future_result.side_effect = self._error(404)
+        with self.assertRaises(bravado.exception.HTTPNotFound):
+            self.c.Status.get_status().result()
+        # when
+        with self.assertRaises(bravado.exception.HTTPNotFound) as cm:
+            self.c.Status.get_status().result()
+        # then
+        self.assertEqual(mock_future_result.call_count, 1)
+        self.assertEqual(cm.exception.response.status_code, 404)
+        self.assertAlmostEqual(self._cached_expiry(), 60, delta=2)
+
+    @patch(MODULE_PATH + ".app_settings.ESI_CACHE_ERRORS", {404: 60})
+    def test_should_not_cache_other_errors(self, mock_future_result):
+        # given
+        mock_future_result.side_effect = self._error(403)
+        # when
+        for _ in range(2):
+            with self.assertRaises(bravado.exception.HTTPForbidden):
+                self.c.Status.get_status().result()
+        # then
+        self.assertEqual(mock_future_result.call_count, 2)
+
+    @patch(MODULE_PATH + ".app_settings.ESI_CACHE_ERRORS", {404: 60})
+    @patch(
+        MODULE_PATH + ".app_settings.ESI_CACHE_ERRORS_BY_OPERATION",
+        {"get_status": {404: 0, 403: 60}},
+    )
+    def test_should_override_errors_by_operation(self, mock_future_result):
+        # given
+        mock_future_result.side_effect = [self._error(404), self._error(404)]
+        # when
+        for _ in range(2):
+            with self.assertRaises(bravado.exception.HTTPNotFound):
+                self.c.Status.get_status().result()
+        mock_future_result.side_effect = [self._error(403)]
+        for _ in range(2):
+            with self.assertRaises(bravado.exception.HTTPForbidden):
+                self.c.Status.get_status().result()
+        # then
+        self.assertEqual(mock_future_result.call_count, 3)
+
+    @patch(MODULE_PATH + ".app_settings.ESI_CACHE_ERRORS", {404: 60})
+    def test_should_use_expiry_from_response(self, mock_future_result):
+        # given
+        expires = datetime.utcnow() + timedelta(seconds=300)
+        mock_future_result.side_effect = self._error(
+            404, Expires=expires.strftime("%a, %d %b %Y %H:%M:%S GMT")
+        )
+        # when
+        with self.assertRaises(bravado.exception.HTTPNotFound):
+            self.c.Status.get_status().result()
+        # then
+        self.assertAlmostEqual(self._cached_expiry(), 300, delta=2)
+
+    @patch(MODULE_PATH + ".app_settings.ESI_CACHE_ERRORS", {404: 300})
+    def test_should_ignore_error_limit_reset_for_other_errors(
+        self, mock_future_result
+    ):
+        # given
+        mock_future_result.side_effect = self._error(
+            404, **{"X-Esi-Error-Limit-Reset": "15"}
+        )
+        # when
+        with self.assertRaises(bravado.exception.HTTPNotFound):
+            self.c.Status.get_status().result()
+        # then
+        self.assertAlmostEqual(self._cached_expiry(), 300, delta=2)
+
+    @patch(MODULE_PATH + ".app_settings.ESI_CACHE_ERRORS", {420: 60})
+    def test_should_use_error_limit_reset_from_response(self, mock_future_result):
+        # given
+        mock_future_result.side_effect = self._error(
+            420, **{"X-Esi-Error-Limit-Reset": "15"}
+        )
+        # when
+        with self.assertRaises(bravado.exception.HTTPClientError):
+            self.c.Status.get_status().result()
+        # then
+        self.assertAlmostEqual(self._cached_expiry(), 15, delta=2)
+
+
+@patch(MODULE_PATH + "._cache_generations", new_callable=OrderedDict)
+class TestClientCacheKey(NoSocketsTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        spec = _load_json_file(SWAGGER_SPEC_PATH_FULL)
+        with requests_mock.Mocker() as requests_mocker:
+            requests_mocker.register_uri(
+                "GET", url="https://esi.evetech.net/_latest/swagger.json", json=spec
+            )
+            cls.c = esi_client_factory(spec_file=SWAGGER_SPEC_PATH_FULL)
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_should_prefix_key_with_datasource_version_and_operation(self, _):
+        # when
+        key = self.c.Universe.get_universe_types_type_id(type_id=34)._cache_key()
+        # then
+        self.assertTrue(
+            key.startswith("esi_tranquility_1.3.8_get_universe_types_type_id_")
+        )
+
+    def test_should_ignore_order_of_params(self, _):
+        # given
+        future = self.c.Universe.get_universe_types_type_id(type_id=34, language="de")
+        key = future._cache_key()
+        # when
+        params = future.future.request.params
+        future.future.request.params = dict(reversed(list(params.items())))
+        # then
+        self.assertEqual(future._cache_key(), key)
+
+    def _cache_response(self, future) -> None:
+        expires = formatdate(time() + 60, usegmt=True)
+        response = CachedResponse(200, {"Expires": expires}, b"[]")
+        future._cache_set(future._cache_key(), response, 60)
+
+    def _is_cached(self, future) -> bool:
+        return future._cache_get(future._cache_key()) is not None
+
+    def _assets(self, character_id: int):
+        return self.c.Assets.get_characters_character_id_assets(
+            character_id=character_id
+        )
+
+    def _type(self):
+        return self.c.Universe.get_universe_types_type_id(type_id=34)
+
+    def test_should_invalidate_operation(self, _):
+        # given
+        self._cache_response(self._assets(1001))
+        self._cache_response(self._assets(1002))
+        self._cache_response(self._type())
+        # when
+        invalidate_cache("get_characters_character_id_assets")
+        # then
+        self.assertFalse(self._is_cached(self._assets(1001)))
+        self.assertFalse(self._is_cached(self._assets(1002)))
+        self.assertTrue(self._is_cached(self._type()))
+
+    def test_should_invalidate_operation_for_path_param(self, _):
+        # given
+        self._cache_response(self._assets(1001))
+        self._cache_response(self._assets(1002))
+        # when
+        invalidate_cache("get_characters_character_id_assets", character_id=1001)
+        # then
+        self.assertFalse(self._is_cached(self._assets(1001)))
+        self.assertTrue(self._is_cached(self._assets(1002)))
+
+    def test_should_cache_responses_after_invalidation(self, _):
+        # given
+        invalidate_cache("get_characters_character_id_assets")
+        # when
+        self._cache_response(self._assets(1001))
+        # then
+        self.assertTrue(self._is_cached(self._assets(1001)))
+
+    def test_should_see_invalidation_from_other_process(self, generations):
+        # given
+        self._cache_response(self._assets(1001))
+        self.assertTrue(self._is_cached(self._assets(1001)))
+        cache.set("esi_generation_get_characters_character_id_assets", "other")
+        # when
+        generations.clear()
+        # then
+        self.assertFalse(self._is_cached(self._assets(1001)))
+
+    @patch(MODULE_PATH + ".app_settings.ESI_CACHE_LOCAL_MAX_BYTES", 100000)
+    @patch(MODULE_PATH + ".local_response_cache", new_callable=LocalResponseCache)
+    def test_should_not_read_generations_for_local_cache_hits(self, _, generations):
+        # given
+        futures = [
+            self.c.Universe.get_universe_types_type_id(type_id=type_id)
+            for type_id in range(50)
+        ]
+        for future in futures:
+            self._cache_response(future)
+        generations.clear()
+        # when
+        with patch.object(cache, "get_many", wraps=cache.get_many) as spy_get_many:
+            cached = [self._is_cached(future) for future in futures]
+        # then
+        self.assertTrue(all(cached))
+        self.assertFalse(spy_get_many.called)
+
+    def test_should_read_generations_once_for_different_path_params(
+        self, generations
+    ):
+        # given
+        futures = [
+            self.c.Universe.get_universe_types_type_id(type_id=type_id)
+            for type_id in range(50)
+        ]
+        for future in futures:
+            self._cache_response(future)
+        generations.clear()
+        # when
+        with patch.object(cache, "get_many", wraps=cache.get_many) as spy_get_many:
+            cached = [self._is_cached(future) for future in futures]
+        # then
+        self.assertTrue(all(cached))
+        self.assertEqual(spy_get_many.call_count, 1)
+
+    def test_should_keep_responses_cached_before_first_path_param_invalidation(
+        self, _
+    ):
+        # given
+        self._cache_response(self._assets(1001))
+        # when
+        invalidate_cache("get_characters_character_id_assets", character_id=1002)
+        # then
+        self.assertTrue(self._is_cached(self._assets(1001)))
+        self.assertFalse(self._is_cached(self._assets(1002)))
+
+    @patch(MODULE_PATH + ".app_settings.ESI_CACHE_LOCAL_MAX_BYTES", 100000)
+    @patch(MODULE_PATH + ".local_response_cache", new_callable=LocalResponseCache)
+    def test_should_invalidate_local_cache(self, *_):
+        # given
+        self._cache_response(self._assets(1001))
+        # when
+        invalidate_cache("get_characters_character_id_assets", character_id=1001)
+        # then
+        self.assertFalse(self._is_cached(self._assets(1001)))
+
+    @patch(MODULE_PATH + ".app_settings.ESI_CACHE_LOCAL_MAX_BYTES", 100000)
+    @patch(MODULE_PATH + ".local_response_cache", new_callable=LocalResponseCache)
+    def test_should_keep_local_cache_of_other_operations(self, local_cache, _):
+        # given
+        character = self.c.Character.get_characters_character_id(character_id=1001)
+        self._cache_response(self._assets(1001))
+        self._cache_response(self._type())
+        self._cache_response(character)
+        # when
+        invalidate_cache("get_characters_character_id_assets", character_id=1001)
+        # then
+        self.assertIsNone(local_cache.get(self._assets(1001)._cache_key()))
+        self.assertIsNotNone(local_cache.get(self._type()._cache_key()))
+        self.assertIsNotNone(local_cache.get(character._cache_key()))
+
+    def test_should_use_same_key_for_refreshed_token(self, _):
+        # given
+        token_1, _ = generate_token(1001, "Bruce Wayne")
+        issued_at = datetime.now(tz=timezone.utc) + timedelta(minutes=20)
+        token_2, _ = generate_token(1001, "Bruce Wayne", issued_at=issued_at)
+        # when
+        key_1 = self.c.Assets.get_characters_character_id_assets(
+            character_id=1001, token=token_1
+        )._cache_key()
+        key_2 = self.c.Assets.get_characters_character_id_assets(
+            character_id=1001, token=token_2
+        )._cache_key()
+        # then
+        self.assertNotEqual(token_1, token_2)
+        self.assertEqual(key_1, key_2)
+
+    def test_should_use_different_keys_for_different_characters(self, _):
+        # given
+        token_1, _ = generate_token(1001, "Bruce Wayne")
+        token_2, _ = generate_token(1002, "Peter Parker")
+        # when
+        key_1 = self.c.Assets.get_characters_character_id_assets(
+            character_id=1001, token=token_1
+        )._cache_key()
+        key_2 = self.c.Assets.get_characters_character_id_assets(
+            character_id=1001, token=token_2
+        )._cache_key()
+        # then
+        self.assertNotEqual(key_1, key_2)
+
+    def test_should_use_different_keys_for_different_scopes(self, _):
+        # given
+        token_1, _ = generate_token(1001, "Bruce Wayne", scopes=["esi-a.v1"])
+        token_2, _ = generate_token(
+            1001, "Bruce Wayne", scopes=["esi-a.v1", "esi-assets.read_assets.v1"]
+        )
+        # when
+        key_1 = self.c.Assets.get_characters_character_id_assets(
+            character_id=1001, token=token_1
+        )._cache_key()
+        key_2 = self.c.Assets.get_characters_character_id_assets(
+            character_id=1001, token=token_2
+        )._cache_key()
+        # then
+        self.assertNotEqual(key_1, key_2)
+
+    def test_should_ignore_order_of_scopes(self, _):
+        # given
+        token_1, _ = generate_token(
+            1001, "Bruce Wayne", scopes=["esi-a.v1", "esi-b.v1"]
+        )
+        token_2, _ = generate_token(
+            1001, "Bruce Wayne", scopes=["esi-b.v1", "esi-a.v1"]
+        )
+        # when
+        key_1 = self.c.Assets.get_characters_character_id_assets(
+            character_id=1001, token=token_1
+        )._cache_key()
+        key_2 = self.c.Assets.get_characters_character_id_assets(
+            character_id=1001, token=token_2
+        )._cache_key()
+        # then
+        self.assertEqual(key_1, key_2)
+
+    def test_should_use_raw_token_when_not_a_jwt(self, _):
+        # when
+        key_1 = self.c.Assets.get_characters_character_id_assets(
+            character_id=1001, token="abc"
+        )._cache_key()
+        key_2 = self.c.Assets.get_characters_character_id_assets(
+            character_id=1001, token="def"
+        )._cache_key()
+        # then
+        self.assertNotEqual(key_1, key_2)
+
+    @patch(MODULE_PATH + ".CACHE_GENERATIONS_LOCAL_MAX_ENTRIES", 3)
+    def test_should_keep_recently_used_generations(self, generations):
+        # given
+        invalidate_cache("get_characters_character_id_assets", character_id=1)
+        self._cache_response(self._assets(1001))
+        # when
+        self._cache_response(self._assets(1002))
+        # then
+        self.assertEqual(
+            list(generations),
+            [
+                "esi_generation_get_characters_character_id_assets",
+                "esi_generation_params_get_characters_character_id_assets",
+                "esi_generation_get_characters_character_id_assets_character_id_1002",
+            ],
+        )
+
+    def test_should_memorize_generations_concurrently(self, generations):
+        # given
+        invalidate_cache("get_characters_character_id_assets", character_id=1)
+        # when
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            executor.map(
+                lambda character_id: self._cache_response(self._assets(character_id)),
+                range(1000, 1200),
+            )
+        # then
+        self.assertTrue(
+            all(self._is_cached(self._assets(id)) for id in range(1000, 1200))
+        )
+
+    def test_should_not_allow_multiple_path_params(self, _):
+        with self.assertRaises(ValueError):
+            invalidate_cache("get_universe_types_type_id", type_id=34, language="de")
+
+
+@patch(MODULE_PATH + ".app_settings.ESI_CACHE_LOCAL_MAX_BYTES", 1000)
+class TestLocalResponseCache(NoSocketsTestCase):
+    @staticmethod
+    def _envelope(size: int) -> tuple:
+        return CachedResponse(200, {}, b"x" * size).to_envelope()
+
+    def test_should_return_stored_envelope(self):
+        # given
+        local_cache = LocalResponseCache()
+        envelope = self._envelope(10)
+        # when
+        local_cache.set("a", envelope, 60)
+        # then
+        self.assertEqual(local_cache.get("a"), envelope)
+        self.assertIsNone(local_cache.get("b"))
+        stats = local_cache.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["entries"], 1)
+
+    def test_should_delete_matching_entries(self):
+        # given
+        local_cache = LocalResponseCache()
+        local_cache.set("a1", self._envelope(10), 60)
+        local_cache.set("b1", self._envelope(10), 60)
+        # when
+        local_cache.delete_matching(re.compile("a"))
+        # then
+        self.assertIsNone(local_cache.get("a1"))
+        self.assertIsNotNone(local_cache.get("b1"))
+        self.assertEqual(local_cache.stats()["entries"], 1)
+
+    @patch(MODULE_PATH + ".monotonic")
+    def test_should_expire_entries(self, mock_monotonic):
+        # given
+        local_cache = LocalResponseCache()
+        mock_monotonic.return_value = 100
+        local_cache.set("a", self._envelope(10), 60)
+        # when
+        mock_monotonic.return_value = 161
+        # then
+        self.assertIsNone(local_cache.get("a"))
+        self.assertEqual(local_cache.size, 0)
+
+    def test_should_evict_least_recently_used_entries(self):
+        # given
+        local_cache = LocalResponseCache()
+        local_cache.set("a", self._envelope(200), 60)
+        local_cache.set("b", self._envelope(200), 60)
+        local_cache.get("a")
+        # when
+        local_cache.set("c", self._envelope(200), 60)
+        # then
+        self.assertIsNotNone(local_cache.get("a"))
+        self.assertIsNone(local_cache.get("b"))
+        self.assertIsNotNone(local_cache.get("c"))
+        self.assertLessEqual(local_cache.size, 1000)
+        self.assertEqual(local_cache.stats()["evictions"], 1)
+
+    def test_should_not_store_entries_larger_than_budget(self):
+        # given
+        local_cache = LocalResponseCache()
+        # when
+        local_cache.set("a", self._envelope(2000), 60)
+        # then
+        self.assertIsNone(local_cache.get("a"))
+        self.assertEqual(local_cache.size, 0)
+
+
+@patch(MODULE_PATH + ".app_settings.ESI_CACHE_LOCAL_MAX_BYTES", 100000)
+@patch(MODULE_PATH + ".local_response_cache", new_callable=LocalResponseCache)
+@patch.object(django.core.cache.cache, "get_many", new=Mock(return_value={}))
+@patch.object(django.core.cache.cache, "get")
+@patch.object(bravado.http_future.HttpFuture, "result")
+class TestClientCacheLocal(NoSocketsTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        spec = _load_json_file(SWAGGER_SPEC_PATH_MINIMAL)
+        with requests_mock.Mocker() as requests_mocker:
+            requests_mocker.register_uri(
+                "GET", url="https://esi.evetech.net/_latest/swagger.json", json=spec
+            )
+            cls.c = esi_client_factory(spec_file=SWAGGER_SPEC_PATH_MINIMAL)
+
+    def test_should_use_local_cache_after_fetching(
+        self, mock_future_result, mock_cache_get, mock_local_cache
+    ):
+        # given
+        response = MockResultFuture()
+        response.raw_bytes = b'{"players": 500}'
+        mock_future_result.return_value = ({"players": 500}, response)
+        mock_cache_get.return_value = None
+        self.c.Status.get_status().result()
+        mock_cache_get.reset_mock()
+        # when
+        r = self.c.Status.get_status().result()
+        # then
+        self.assertEqual(r["players"], 500)
+        self.assertEqual(mock_future_result.call_count, 1)
+        self.assertFalse(mock_cache_get.called)
+        self.assertEqual(mock_local_cache.stats()["hits"], 1)
+
+    def test_should_fill_local_cache_from_django_cache(
+        self, mock_future_result, mock_cache_get, mock_local_cache
+    ):
+        # given
+        mock_cache_get.return_value = _cached_status(50, MockResultFuture())
+        self.c.Status.get_status().result()
+        mock_cache_get.reset_mock()
+        # when
+        r = self.c.Status.get_status().result()
+        # then
+        self.assertEqual(r["players"], 50)
+        self.assertFalse(mock_cache_get.called)
+        self.assertFalse(mock_future_result.called)
+
+    def test_should_not_keep_expired_responses(
+        self, mock_future_result, mock_cache_get, mock_local_cache
+    ):
+        # given
+        mock_cache_get.return_value = _cached_status(50, MockResultPast())
+        mock_future_result.return_value = ({"players": 500}, MockResultFuture())
+        # when
+        self.c.Status.get_status().result()
+        # then
+        self.assertEqual(mock_local_cache.stats()["entries"], 1)
+        self.assertEqual(mock_local_cache.stats()["hits"], 0)
+
+
+class TestCachedResponse(NoSocketsTestCase):
+    @patch(MODULE_PATH + ".app_settings.ESI_CACHE_COMPRESSION_THRESHOLD", 10)
+    def test_should_compress_large_bodies(self):
+        # given
+        body = json.dumps([{"type_id": 1}] * 100).encode("utf-8")
+        response = BravadoResponseStub(
+            200, headers={"X-Pages": "3"}, raw_bytes=body
+        )
+        # when
+        envelope = CachedResponse.from_response(response).to_envelope()
+        # then
+        self.assertLess(len(envelope[3]), len(body))
+        cached = CachedResponse.from_envelope(envelope)
+        self.assertEqual(cached.headers["x-pages"], "3")
+        self.assertEqual(cached.json(), [{"type_id": 1}] * 100)
+
+    @patch(MODULE_PATH + ".app_settings.ESI_CACHE_COMPRESSION_THRESHOLD", 0)
+    def test_should_not_compress_when_disabled(self):
+        # given
+        body = b"[1, 2, 3]" * 200
+        response = BravadoResponseStub(200, raw_bytes=body)
+        # when
+        envelope = CachedResponse.from_response(response).to_envelope()
+        # then
+        self.assertEqual(envelope[3], body)
+
+    def test_should_reject_unknown_envelope_version(self):
+        self.assertIsNone(CachedResponse.from_envelope((0, 200, {}, b"", False)))
+
+
+class TestParseHttpDate(NoSocketsTestCase):
+    def test_should_parse_rfc_7231_date(self):
+        self.assertEqual(
+            _parse_http_date("Sun, 06 Nov 1994 08:49:37 GMT"), 784111777.0
+        )
+
+    def test_should_parse_other_formats(self):
+        self.assertEqual(
+            _parse_http_date("Sun, 06 Nov 1994 08:49:37 UTC"), 784111777.0
+        )
+        self.assertEqual(
+            _parse_http_date("Sunday, 06-Nov-94 08:49:37 GMT"), 784111777.0
+        )
+
+    def test_should_return_none_for_invalid_date(self):
+        self.assertIsNone(_parse_http_date("fail"))
+        self.assertIsNone(_parse_http_date("Sun, 06 Foo 1994 08:49:37 GMT"))
+
+
+@patch(MODULE_PATH + ".time", lambda: 1000.0)
+class TestServerClock(NoSocketsTestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_should_learn_skew_from_date_header(self):
+        # given
+        clock = ServerClock()
+        # when
+        clock.update(formatdate(900.0, usegmt=True))
+        # then
+        self.assertAlmostEqual(clock.now(), 900.5)
+
+    def test_should_smooth_skew(self):
+        # given
+        clock = ServerClock()
+        clock.update(formatdate(900.0, usegmt=True))
+        # when
+        clock.update(formatdate(1000.0, usegmt=True))
+        # then
+        self.assertAlmostEqual(clock.skew, 79.5)
+
+    def test_should_ignore_invalid_date(self):
+        # given
+        clock = ServerClock()
+        # when
+        clock.update("fail")
+        clock.update(None)
+        # then
+        self.assertEqual(clock.now(), 1000.0)
+
+    @patch(MODULE_PATH + ".app_settings.ESI_CACHE_CLOCK_SKEW_CORRECTION", False)
+    def test_should_use_local_clock_when_disabled(self):
+        # given
+        clock = ServerClock()
+        # when
+        clock.update(formatdate(900.0, usegmt=True))
+        # then
+        self.assertEqual(clock.now(), 1000.0)
+
+    @patch(MODULE_PATH + ".app_settings.ESI_CACHE_CLOCK_SKEW_SHARED", True)
+    def test_should_share_skew_with_other_processes(self):
+        # given
+        clock_1 = ServerClock()
+        clock_2 = ServerClock()
+        # when
+        clock_1.update(formatdate(900.0, usegmt=True))
+        # then
+        self.assertAlmostEqual(clock_2.now(), 900.5)
+
+    def test_should_compute_ttl_relative_to_date_header(self):
+        # when
+        ttl = CachingHttpFuture._response_ttl(
+            {
+                "Date": formatdate(500.0, usegmt=True),
+                "Expires": formatdate(560.0, usegmt=True),
+            }
+        )
+        # then
+        self.assertEqual(ttl, 60)
+
+
+@patch(MODULE_PATH + ".app_settings.ESI_SPEC_CACHE_DURATION", 3)
+@patch(MODULE_PATH + ".app_settings.ESI_API_URL", "https://www.example.com/esi/")
+@patch(MODULE_PATH + ".app_settings.ESI_API_DATASOURCE", "dummy")
+@patch("esi.models.app_settings.ESI_TOKEN_VALID_DURATION", 120)
+class TestTokenAuthenticator(NoSocketsTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            "Bruce Wayne", "abc@example.com", "password"
+        )
+        self.token = _store_as_Token(
+            _generate_token(
+                character_id=101,
+                character_name=self.user.username,
+                scopes=["abc"],
+                access_token="my_access_token",
+            ),
+            self.user,
+        )
+
+    def test_apply_defaults(self):
+        request = Mock()
+        request.headers = dict()
+        request.params = dict()
+
+        x = TokenAuthenticator()
+        request2 = x.apply(request)
+        self.assertEqual(request2.headers["Authorization"], None)
+        self.assertEqual(request2.params["datasource"], "dummy")
+
+    def test_apply_token(self):
+        request = Mock()
+        request.headers = dict()
+        request.params = dict()
+
+        x = TokenAuthenticator(token=self.token)
+        request2 = x.apply(request)
+        self.assertEqual(request2.headers["Authorization"], "Bearer my_access_token")
+        self.assertEqual(request2.params["datasource"], "dummy")
+
+    def test_apply_token_datasource(self):
+        request = Mock()
+        request.headers = dict()
+        request.params = dict()
+
+        x = TokenAuthenticator(token=self.token, datasource="dummy2")
+        request2 = x.apply(request)
+        self.assertEqual(request2.headers["Authorization"], "Bearer my_access_token")
+        self.assertEqual(request2.params["datasource"], "dummy2")
+
+    @patch("esi.models.Token.refresh", spec=True)
+    def test_apply_token_expired_success(self, mock_Token_refresh):
+        request = Mock()
+        request.headers = dict()
+        request.params = dict()
+
+        self.token.created -= timedelta(121)
+
+        x = TokenAuthenticator(token=self.token)
+        request2 = x.apply(request)
+        self.assertEqual(request2.headers["Authorization"], "Bearer my_access_token")
+        self.assertEqual(request2.params["datasource"], "dummy")
+        self.assertEqual(mock_Token_refresh.call_count, 1)
+
+    @patch("esi.models.Token.refresh", spec=True)
+    def test_apply_token_expired_failed(self, mock_Token_refresh):
+        request = Mock()
+        request.headers = dict()
+        request.params = dict()
+
+        self.token.created -= timedelta(121)
+        self.token.refresh_token = None
+
+        x = TokenAuthenticator(token=self.token)
+        with self.assertRaises(TokenExpiredError):
+            x.apply(request)
+
+        self.assertEqual(mock_Token_refresh.call_count, 0)
+
+
+class TestModuleFunctions(NoSocketsTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.spec = _load_json_file(SWAGGER_SPEC_PATH_MINIMAL)
+
+    def test_build_cache_name(self):
+        self.assertEqual(build_cache_name("abc"), "esi_swaggerspec_abc")
+
+    @patch(MODULE_PATH + ".app_settings.ESI_SPEC_CACHE_DURATION", 3)
+    def test_cache_spec(self):
+        spec = {"dummy_spec": True}
+        cache_spec("abc", spec)
+        self.assertDictEqual(cache.get("esi_swaggerspec_abc"), spec)
+
+    @patch(MODULE_PATH + ".app_settings.ESI_API_URL", "https://www.example.com/esi/")
+    def test_build_spec_url(self):
+        self.assertEqual(
+            build_spec_url("v2"), "https://www.example.com/esi/v2/swagger.json"
+        )
+
+    @requests_mock.Mocker()
+    @patch(MODULE_PATH + ".app_settings.ESI_SPEC_CACHE_DURATION", 1)
+    def test_get_spec_defaults(self, requests_mocker):
+        # given
+        requests_mocker.register_uri(
+            "GET", url="https://esi.evetech.net/_latest/swagger.json", json=self.spec
+        )
+        requests_mocker.register_uri(
+            "GET", url="https://esi.evetech.net/latest/swagger.json", json=self.spec
+        )
+        # when
+        spec = get_spec("latest")
+        # then
+        self.assertIsInstance(spec, Spec)
+
+    @patch(MODULE_PATH + ".app_settings.ESI_SPEC_CACHE_DURATION", 1)
+    def test_get_spec_with_http_client(self):
+        mock_http_client = Mock(spec=RequestsClient)
+        mock_http_client.request.return_value.result.return_value.json.return_value = (
+            self.spec
+        )
+        mock_http_client.request.return_value.result.return_value.headers = {}
+        spec = get_spec("latest", http_client=mock_http_client)
+        self.assertIsInstance(spec, Spec)
+
+    @patch(MODULE_PATH + ".app_settings.ESI_SPEC_CACHE_DURATION", 1)
+    def test_get_spec_with_config(self):
+        mock_http_client = Mock(spec=RequestsClient)
+        mock_http_client.request.return_value.result.return_value.json.return_value = (
+            self.spec
+        )
+        mock_http_client.request.return_value.result.return_value.headers = {}
+        spec = get_spec(
+            "latest", http_client=mock_http_client, config={"dummy_config": True}
+        )
+        self.assertIsInstance(spec, Spec)
+        self.assertIn("dummy_config", spec.config)
+
+    @patch(MODULE_PATH + ".app_settings.ESI_SPEC_CACHE_DURATION", 1)
+    def test_build_spec_defaults(self):
+        mock_http_client = Mock(spec=RequestsClient)
+        mock_http_client.request.return_value.result.return_value.json.return_value = (
+            self.spec
+        )
+        mock_http_client.request.return_value.result.return_value.headers = {}
+        spec = build_spec("v1", http_client=mock_http_client)
+        self.assertIsInstance(spec, Spec)
+
+    @patch(MODULE_PATH + ".app_settings.ESI_SPEC_CACHE_DURATION", 1)
+    def test_build_spec_explicit_resource_found(self):
+        mock_http_client = Mock(spec=RequestsClient)
+        mock_http_client.request.return_value.result.return_value.json.return_value = (
+            self.spec
+        )
+        mock_http_client.request.return_value.result.return_value.headers = {}
+        spec = build_spec("v1", http_client=mock_http_client, Status="v1")
+        self.assertIsInstance(spec, Spec)
+
+    @patch(MODULE_PATH + ".app_settings.ESI_SPEC_CACHE_DURATION", 1)
+    def test_build_spec_explicit_resource_not_found(self):
+        mock_http_client = Mock(spec=RequestsClient)
+        mock_http_client.request.return_value.result.return_value.json.return_value = (
+            self.spec
+        )
+        mock_http_client.request.return_value.result.return_value.headers = {}
+        with self.assertRaises(AttributeError):
+            build_spec("v1", http_client=mock_http_client, Character="v4")
+
+    @requests_mock.Mocker()
+    def test_read_spec(self, requests_mocker):
+        # given
+        requests_mocker.register_uri(
+            "GET", url="https://esi.evetech.net/_latest/swagger.json", json=self.spec
+        )
+        # when
+        client = read_spec(SWAGGER_SPEC_PATH_MINIMAL)
+        # then
+        self.assertIsInstance(client, SwaggerClient)
+
+    def test_minimize_spec_defaults(self):
+        spec_dict = minimize_spec(self.spec)
+        self.assertIsInstance(spec_dict, dict)
+        # todo: add better verification of functionality
+
+    def test_minimize_spec_resources(self):
+        spec_dict = minimize_spec(self.spec, resources=["Status"])
+        self.assertIsInstance(spec_dict, dict)
+        # todo: add better verification of functionality
+
+    def test_minimize_spec_should_only_retain_referenced_objects(self):
+        # given
+        spec = _load_json_file(SWAGGER_SPEC_PATH_FULL)
+        # when
+        spec_dict = minimize_spec(spec, operations=["get_status"])
+        # then
+        self.assertListEqual(list(spec_dict["paths"]), ["/status/"])
+        self.assertCountEqual(
+            spec_dict["parameters"], ["datasource", "If-None-Match"]
+        )
+        self.assertNotIn("forbidden", spec_dict["definitions"])
+        self.assertIn("bad_request", spec_dict["definitions"])
+        self.assertEqual(spec_dict["info"], spec["info"])
+
+    def test_minimize_spec_should_follow_nested_references(self):
+        # given
+        spec = {
+            "swagger": "2.0",
+            "paths": {
+                "/a/": {
+                    "parameters": [{"$ref": "#/parameters/p1"}],
+                    "get": {
+                        "operationId": "get_a",
+                        "tags": ["A"],
+                        "responses": {"200": {"$ref": "#/responses/r1"}},
+                    },
+                },
+                "/b/": {
+                    "get": {
+                        "operationId": "get_b",
+                        "tags": ["B"],
+                        "responses": {"200": {"$ref": "#/responses/r2"}},
+                    },
+                },
+            },
+            "parameters": {"p1": {"name": "p1", "in": "query", "type": "string"}},
+            "responses": {
+                "r1": {"schema": {"$ref": "#/definitions/d1"}},
+                "r2": {"schema": {"$ref": "#/definitions/d3"}},
+            },
+            "definitions": {
+                "d1": {"items": {"$ref": "#/definitions/d2"}},
+                "d2": {"properties": {"x": {"$ref": "#/definitions/d1"}}},
+                "d3": {},
+            },
+        }
+        # when
+        spec_dict = minimize_spec(spec, resources=["A"])
+        # then
+        self.assertListEqual(list(spec_dict["paths"]), ["/a/"])
+        self.assertIn("parameters", spec_dict["paths"]["/a/"])
+        self.assertListEqual(list(spec_dict["parameters"]), ["p1"])
+        self.assertListEqual(list(spec_dict["responses"]), ["r1"])
+        self.assertCountEqual(spec_dict["definitions"], ["d1", "d2"])
+
+
+@patch(MODULE_PATH + ".app_settings.ESI_SPEC_CACHE_DURATION", 60)
+@requests_mock.Mocker()
+class TestSpecRefresh(NoSocketsTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.spec = _load_json_file(SWAGGER_SPEC_PATH_MINIMAL)
+        cls.url = "https://esi.evetech.net/_latest/swagger.json"
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        patcher = patch(
+            MODULE_PATH + "._get_stale_refresh_executor", return_value=self.executor
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _cache_stale_spec(self, etag='"abc"'):
+        cache_spec("_latest", self.spec, etag=etag)
+        meta = cache.get("esi_swaggerspec__latest_meta")
+        meta["checked_at"] -= 60
+        cache.set("esi_swaggerspec__latest_meta", meta)
+        return meta
+
+    def _spec_with_version(self, version):
+        spec = copy.deepcopy(self.spec)
+        spec["info"]["version"] = version
+        return spec
+
+    def test_should_cache_spec_with_etag_and_hash(self, requests_mocker):
+        # given
+        requests_mocker.register_uri(
+            "GET",
+            url=self.url,
+            json=self.spec,
+            headers={"ETag": '"abc"', "Last-Modified": "Sat, 17 Oct 2026 11:00:00 GMT"},
+        )
+        # when
+        get_spec("_latest")
+        # then
+        self.assertEqual(cache.get("esi_swaggerspec__latest"), self.spec)
+        meta = cache.get("esi_swaggerspec__latest_meta")
+        self.assertEqual(meta["etag"], '"abc"')
+        self.assertEqual(meta["last_modified"], "Sat, 17 Oct 2026 11:00:00 GMT")
+        self.assertTrue(meta["hash"])
+
+    def test_should_not_download_recently_checked_spec(self, requests_mocker):
+        # given
+        cache_spec("_latest", self.spec, etag='"abc"')
+        # when
+        spec = get_spec("_latest")
+        # then
+        self.assertIn("Status", spec.resources)
+        self.assertFalse(requests_mocker.called)
+
+    def test_should_revalidate_stale_spec_in_background(self, requests_mocker):
+        # given
+        meta = self._cache_stale_spec()
+        requests_mocker.register_uri("GET", url=self.url, status_code=304)
+        # when
+        spec = get_spec("_latest")
+        self.executor.shutdown(wait=True)
+        # then
+        self.assertIn("Status", spec.resources)
+        self.assertEqual(requests_mocker.last_request.headers["If-None-Match"], '"abc"')
+        new_meta = cache.get("esi_swaggerspec__latest_meta")
+        self.assertEqual(new_meta["hash"], meta["hash"])
+        self.assertGreater(new_meta["checked_at"], meta["checked_at"])
+
+    def test_should_return_stale_spec_and_cache_modified_spec(self, requests_mocker):
+        # given
+        meta = self._cache_stale_spec()
+        requests_mocker.register_uri(
+            "GET",
+            url=self.url,
+            json=self._spec_with_version("9.9.9"),
+            headers={"ETag": '"def"'},
+        )
+        # when
+        spec = get_spec("_latest")
+        self.executor.shutdown(wait=True)
+        # then
+        self.assertEqual(spec.spec_dict["info"]["version"], "1.2.9")
+        self.assertEqual(
+            cache.get("esi_swaggerspec__latest")["info"]["version"], "9.9.9"
+        )
+        new_meta = cache.get("esi_swaggerspec__latest_meta")
+        self.assertEqual(new_meta["etag"], '"def"')
+        self.assertNotEqual(new_meta["hash"], meta["hash"])
+
+    def test_should_keep_stale_spec_when_refresh_fails(self, requests_mocker):
+        # given
+        meta = self._cache_stale_spec()
+        requests_mocker.register_uri("GET", url=self.url, status_code=404)
+        # when
+        with self.assertLogs(MODULE_PATH, level="WARNING"):
+            spec = get_spec("_latest")
+            self.executor.shutdown(wait=True)
+        # then
+        self.assertIn("Status", spec.resources)
+        self.assertEqual(cache.get("esi_swaggerspec__latest_meta"), meta)
+
+    def test_should_release_lock_after_refresh(self, requests_mocker):
+        # given
+        self._cache_stale_spec()
+        requests_mocker.register_uri("GET", url=self.url, status_code=304)
+        # when
+        get_spec("_latest")
+        self.executor.shutdown(wait=True)
+        # then
+        self.assertIsNone(cache.get("esi_swaggerspec__latest_refresh"))
+
+    def test_should_not_retry_failed_refresh_right_away(self, requests_mocker):
+        # given
+        self._cache_stale_spec()
+        requests_mocker.register_uri(
+            "GET", url=self.url, exc=requests.exceptions.ConnectionError
+        )
+        # when
+        with self.assertLogs(MODULE_PATH, level="WARNING"):
+            for _ in range(20):
+                get_spec("_latest")
+                self.executor.submit(lambda: None).result()
+        # then
+        self.assertEqual(requests_mocker.call_count, 1)
+        self.assertTrue(cache.get("esi_swaggerspec__latest_refresh"))
+
+    def test_should_refresh_without_authentication(self, requests_mocker):
+        # given
+        self._cache_stale_spec()
+        requests_mocker.register_uri("GET", url=self.url, status_code=304)
+        http_client = RequestsClientPlus()
+        http_client.user_agent = "my-app"
+        http_client.authenticator = Mock(spec=TokenAuthenticator)
+        http_client.authenticator.matches.return_value = True
+        # when
+        get_spec("_latest", http_client=http_client)
+        self.executor.shutdown(wait=True)
+        # then
+        self.assertFalse(http_client.authenticator.apply.called)
+        request = requests_mocker.last_request
+        self.assertNotIn("Authorization", request.headers)
+        self.assertEqual(request.headers["User-Agent"], "my-app")
+
+    def test_should_not_refresh_when_locked_by_other_process(self, requests_mocker):
+        # given
+        self._cache_stale_spec()
+        cache.set("esi_swaggerspec__latest_refresh", True)
+        # when
+        get_spec("_latest")
+        self.executor.shutdown(wait=True)
+        # then
+        self.assertFalse(requests_mocker.called)
+
+
+@patch(MODULE_PATH + ".app_settings.ESI_SPEC_SNAPSHOT_MAX_AGE", 60)
+class TestSpecSnapshot(NoSocketsTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.spec = _load_json_file(SWAGGER_SPEC_PATH_MINIMAL)
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        patcher = patch(
+            MODULE_PATH + ".app_settings.ESI_SPEC_SNAPSHOT_DIR", temp_dir.name
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _write_snapshot(
+        self, age, url="https://esi.evetech.net/_latest/swagger.json"
+    ):
+        with open(build_snapshot_path("_latest"), "w", encoding="utf-8") as f:
+            json.dump({"url": url, "created_at": time() - age, "spec": self.spec}, f)
+
+    def _spec_with_version(self, version):
+        spec = copy.deepcopy(self.spec)
+        spec["info"]["version"] = version
+        return spec
+
+    def test_get_spec_should_use_snapshot_without_validation(self):
+        # given
+        self._write_snapshot(age=30)
+        # when
+        spec = get_spec("_latest")
+        # then
+        self.assertIn("Status", spec.resources)
+        self.assertFalse(spec.config["validate_swagger_spec"])
+
+    @requests_mock.Mocker()
+    def test_get_spec_should_download_spec_when_snapshot_is_too_old(
+        self, requests_mocker
+    ):
+        # given
+        self._write_snapshot(age=90)
+        requests_mocker.register_uri(
+            "GET",
+            url="https://esi.evetech.net/_latest/swagger.json",
+            json=self._spec_with_version("9.9.9"),
+        )
+        # when
+        spec = get_spec("_latest")
+        # then
+        self.assertEqual(spec.spec_dict["info"]["version"], "9.9.9")
+
+    @requests_mock.Mocker()
+    def test_get_spec_should_use_old_snapshot_when_download_fails(
+        self, requests_mocker
+    ):
+        # given
+        self._write_snapshot(age=90)
+        requests_mocker.register_uri(
+            "GET",
+            url="https://esi.evetech.net/_latest/swagger.json",
+            exc=requests.exceptions.ConnectionError,
+        )
+        # when
+        with self.assertLogs(MODULE_PATH, level="WARNING"):
+            spec = get_spec("_latest")
+        # then
+        self.assertEqual(
+            spec.spec_dict["info"]["version"], self.spec["info"]["version"]
+        )
+
+    @requests_mock.Mocker()
+    def test_get_spec_should_raise_error_when_download_fails_without_snapshot(
+        self, requests_mocker
+    ):
+        # given
+        requests_mocker.register_uri(
+            "GET",
+            url="https://esi.evetech.net/_latest/swagger.json",
+            exc=requests.exceptions.ConnectionError,
+        )
+        # when/then
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            get_spec("_latest")
+
+    def test_read_spec_snapshot_should_ignore_snapshot_for_other_url(self):
+        # given
+        self._write_snapshot(
+            age=30, url="https://www.example.com/_latest/swagger.json"
+        )
+        # when/then
+        self.assertIsNone(read_spec_snapshot("_latest"))
+
+    def test_read_spec_snapshot_should_ignore_invalid_snapshot(self):
+        # given
+        with open(build_snapshot_path("_latest"), "w", encoding="utf-8") as f:
+            f.write("{")
+        # when/then
+        with self.assertLogs(MODULE_PATH, level="WARNING"):
+            self.assertIsNone(read_spec_snapshot("_latest"))
+
+    def test_read_spec_snapshot_should_return_none_when_disabled(self):
+        # given
+        self._write_snapshot(age=30)
+        # when/then
+        with patch(MODULE_PATH + ".app_settings.ESI_SPEC_SNAPSHOT_DIR", None):
+            self.assertIsNone(read_spec_snapshot("_latest"))
+
+
+@patch.dict(MODULE_PATH + "._built_specs", clear=True)
+@patch(MODULE_PATH + ".app_settings.ESI_SPEC_CACHE_DURATION", 60)
+class TestBuildSpecShared(NoSocketsTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.spec = _load_json_file(SWAGGER_SPEC_PATH_MINIMAL)
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def _http_client(self, spec=None):
+        http_client = Mock(spec=RequestsClient)
+        http_client.request.return_value.result.return_value.json.return_value = (
+            spec or self.spec
+        )
+        http_client.request.return_value.result.return_value.headers = {}
+        return http_client
+
+    @patch.object(Spec, "from_dict", wraps=Spec.from_dict)
+    def test_should_build_spec_once(self, spy_from_dict):
+        # given
+        http_client_1 = self._http_client()
+        http_client_2 = self._http_client()
+        # when
+        spec_1 = build_spec("v1", http_client=http_client_1)
+        spec_2 = build_spec("v1", http_client=http_client_2)
+        # then
+        self.assertEqual(spy_from_dict.call_count, 1)
+        self.assertIs(spec_1.definitions, spec_2.definitions)
+        self.assertIs(spec_1.http_client, http_client_1)
+        self.assertIs(spec_2.http_client, http_client_2)
+
+    def test_operations_should_use_http_client_of_view(self):
+        # given
+        http_client_1 = self._http_client()
+        http_client_2 = self._http_client()
+        # when
+        spec_1 = build_spec("v1", http_client=http_client_1)
+        spec_2 = build_spec("v1", http_client=http_client_2)
+        # then
+        operation_1 = spec_1.resources["Status"].get_status
+        operation_2 = spec_2.resources["Status"].get_status
+        self.assertIs(operation_1.swagger_spec.http_client, http_client_1)
+        self.assertIs(operation_2.swagger_spec.http_client, http_client_2)
+        self.assertIs(operation_1.params, operation_2.params)
+
+    @patch.object(Spec, "from_dict", wraps=Spec.from_dict)
+    def test_should_build_spec_per_resource_versions(self, spy_from_dict):
+        # when
+        build_spec("v1", http_client=self._http_client())
+        spec = build_spec("v1", http_client=self._http_client(), status="v2")
+        build_spec("v1", http_client=self._http_client(), Status="v2")
+        # then
+        self.assertEqual(spy_from_dict.call_count, 3)
+        operation = spec.resources["Status"].get_status
+        self.assertIsNot(operation.swagger_spec, spec)
+        self.assertIs(operation.swagger_spec.http_client, spec.http_client)
+
+    @patch.object(Spec, "from_dict", wraps=Spec.from_dict)
+    def test_should_rebuild_spec_after_cache_duration_when_changed(
+        self, spy_from_dict
+    ):
+        # given
+        with patch(MODULE_PATH + ".monotonic", return_value=1000):
+            build_spec("v1", http_client=self._http_client())
+        cache_spec("v1", dict(self.spec, info={"title": "changed", "version": "2"}))
+        # when
+        with patch(MODULE_PATH + ".monotonic", return_value=1059):
+            build_spec("v1", http_client=self._http_client())
+        with patch(MODULE_PATH + ".monotonic", return_value=1060):
+            spec = build_spec("v1", http_client=self._http_client())
+        # then
+        self.assertEqual(spy_from_dict.call_count, 2)
+        self.assertEqual(spec.spec_dict["info"]["title"], "changed")
+
+    @requests_mock.Mocker()
+    @patch.object(Spec, "from_dict", wraps=Spec.from_dict)
+    def test_should_rebuild_spec_when_changed_by_background_refresh(
+        self, requests_mocker, spy_from_dict
+    ):
+        # given
+        executor = ThreadPoolExecutor(max_workers=1)
+        changed_spec = dict(self.spec, info={"title": "changed", "version": "2"})
+        requests_mocker.register_uri(
+            "GET", url="https://esi.evetech.net/v1/swagger.json", json=changed_spec
+        )
+        with patch(MODULE_PATH + ".monotonic", return_value=1000):
+            build_spec("v1", http_client=self._http_client())
+        meta = cache.get("esi_swaggerspec_v1_meta")
+        meta["checked_at"] -= 60
+        cache.set("esi_swaggerspec_v1_meta", meta)
+        # when
+        with patch(
+            MODULE_PATH + "._get_stale_refresh_executor", return_value=executor
+        ):
+            with patch(MODULE_PATH + ".monotonic", return_value=1060):
+                http_client = self._http_client()
+                spec_1 = build_spec("v1", http_client=http_client)
+            executor.shutdown(wait=True)
+            with patch(MODULE_PATH + ".monotonic", return_value=1061):
+                spec_2 = build_spec("v1", http_client=self._http_client())
+        # then
+        self.assertFalse(http_client.request.called)
+        self.assertEqual(spy_from_dict.call_count, 2)
+        self.assertEqual(spec_1.spec_dict["info"]["title"], "EVE Swagger Interface")
+        self.assertEqual(spec_2.spec_dict["info"]["title"], "changed")
+
+    @patch(MODULE_PATH + ".read_spec_snapshot", return_value=None)
+    def test_should_load_each_spec_once_when_building(self, spy_read_snapshot):
+        # given
+        http_client = self._http_client()
+        # when
+        with patch.object(cache, "get_many", wraps=cache.get_many) as spy_get_many:
+            build_spec("v1", http_client=http_client, status="v1")
+        # then
+        urls = [c[0][0]["url"] for c in http_client.request.call_args_list]
+        self.assertEqual(urls.count("https://esi.evetech.net/v1/swagger.json"), 1)
+        self.assertEqual(spy_read_snapshot.call_count, 1)
+        self.assertEqual(spy_get_many.call_count, 1)
+
+    @patch.object(Spec, "from_dict", wraps=Spec.from_dict)
+    def test_should_not_rebuild_spec_after_cache_duration_when_unchanged(
+        self, spy_from_dict
+    ):
+        # given
+        with patch(MODULE_PATH + ".monotonic", return_value=1000):
+            build_spec("v1", http_client=self._http_client())
+        # when
+        with patch(MODULE_PATH + ".monotonic", return_value=1060):
+            build_spec("v1", http_client=self._http_client())
+        with patch(MODULE_PATH + ".monotonic", return_value=1060):
+            build_spec("v1", http_client=self._http_client())
+        # then
+        self.assertEqual(spy_from_dict.call_count, 1)
+
+    @requests_mock.Mocker()
+    def test_should_use_default_http_client_for_shared_spec(self, requests_mocker):
+        # given
+        for version in ["v1", "_latest"]:
+            requests_mocker.register_uri(
+                "GET",
+                url=f"https://esi.evetech.net/{version}/swagger.json",
+                json=self.spec,
+            )
+        # when
+        spec_1 = build_spec("v1")
+        spec_2 = build_spec("v1")
+        # then
+        self.assertIsInstance(spec_1.http_client, RequestsClient)
+        self.assertIsInstance(spec_2.http_client, RequestsClient)
+        operation = spec_2.resources["Status"].get_status
+        self.assertIs(operation.swagger_spec.http_client, spec_2.http_client)
+
+    def test_should_not_keep_http_client_in_shared_spec(self):
+        # when
+        build_spec("v1", http_client=self._http_client())
+        # then
+        (shared_spec, _, _), = _built_specs.values()
+        self.assertIsNone(shared_spec.http_client)
+
+    def test_view_should_build_resources_on_first_access(self):
+        # given
+        build_spec("v1", http_client=self._http_client())
+        # when
+        spec = build_spec("v1", http_client=self._http_client())
+        # then
+        self.assertIsInstance(spec.resources, LazyResources)
+        self.assertEqual(spec.resources.built(), {})
+        self.assertIs(spec.resources["Status"], spec.resources["Status"])
+        self.assertEqual(list(spec.resources.built()), ["Status"])
+
+
+@patch.dict(MODULE_PATH + "._built_specs", clear=True)
+@patch(MODULE_PATH + ".app_settings.ESI_CLIENT_LAZY_RESOURCES", True)
+class TestLazyResources(NoSocketsTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.spec = _load_json_file(SWAGGER_SPEC_PATH_FULL)
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def _build_spec(self):
+        http_client = Mock(spec=RequestsClient)
+        http_client.request.return_value.result.return_value.json.return_value = (
+            copy.deepcopy(self.spec)
+        )
+        http_client.request.return_value.result.return_value.headers = {}
+        return build_spec(
+            "latest",
+            http_client=http_client,
+            resources=["Faction Warfare", "Status", "Universe"],
+        )
+
+    def test_should_build_resources_on_first_access(self):
+        # when
+        spec = self._build_spec()
+        # then
+        (shared_spec, _, _), = _built_specs.values()
+        self.assertEqual(shared_spec.resources.built(), {})
+        self.assertEqual(
+            set(spec.resources), {"Faction_Warfare", "Status", "Universe"}
+        )
+        self.assertIn("Universe", spec.resources)
+        self.assertEqual(shared_spec.resources.built(), {})
+        operation = spec.resources["Universe"].get_universe_types_type_id
+        self.assertEqual(operation.operation_id, "get_universe_types_type_id")
+        self.assertIs(operation.swagger_spec.http_client, spec.http_client)
+        self.assertEqual(list(shared_spec.resources.built()), ["Universe"])
+
+    def test_should_support_original_resource_names(self):
+        # when
+        spec = self._build_spec()
+        # then
+        self.assertIn("Faction Warfare", spec.resources)
+        self.assertIs(
+            spec.resources["Faction Warfare"], spec.resources["Faction_Warfare"]
+        )
+        self.assertNotIn("Faction Warfare", list(spec.resources))
+
+    def test_should_support_original_resource_names_when_not_lazy(self):
+        # when
+        with patch(MODULE_PATH + ".app_settings.ESI_CLIENT_LAZY_RESOURCES", False):
+            spec = self._build_spec()
+        # then
+        (shared_spec, _, _), = _built_specs.values()
+        self.assertNotIsInstance(shared_spec.resources, LazyResources)
+        self.assertIs(
+            spec.resources["Faction Warfare"], spec.resources["Faction_Warfare"]
+        )
+
+    def test_should_raise_key_error_for_unknown_resource(self):
+        # when
+        spec = self._build_spec()
+        # then
+        with self.assertRaises(KeyError):
+            spec.resources["Unknown"]
+
+    def test_should_build_resource_once_when_accessed_concurrently(self):
+        # given
+        spec = self._build_spec()
+        # when
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            resources = list(
+                executor.map(lambda _: spec.resources["Universe"], range(8))
+            )
+        # then
+        self.assertTrue(all(resource is resources[0] for resource in resources))
+
+    def test_for_token_should_not_build_resources(self):
+        # given
+        spec = self._build_spec()
+        spec.http_client = RequestsClientPlus()
+        client = SwaggerClientPlus(spec)
+        client.Status
+        # when
+        client_2 = client.for_token(Mock())
+        # then
+        self.assertEqual(list(spec.resources.built()), ["Status"])
+        self.assertEqual(client_2.swagger_spec.resources.built(), {})
+        operation = client_2.Universe.get_universe_types_type_id.operation
+        self.assertIsNot(operation.swagger_spec.http_client, spec.http_client)
+        self.assertEqual(
+            list(client_2.swagger_spec.resources.built()), ["Universe"]
+        )
 
 
 @patch(MODULE_PATH + ".app_settings.ESI_SPEC_CACHE_DURATION", 1)
@@ -350,19 +1984,77 @@ class TestEsiClientFactory(NoSocketsTestCase):
             self.user,
         )
 
-    def test_minimal_client(self, requests_mocker):
+    def test_minimal_client(self, requests_mocker):
+        requests_mocker.register_uri(
+            "GET", url="https://esi.evetech.net/_latest/swagger.json", json=self.spec
+        )
+        requests_mocker.register_uri(
+            "GET", url="https://esi.evetech.net/latest/swagger.json", json=self.spec
+        )
+        # when
+        client = esi_client_factory()
+        # then
+        self.assertIsInstance(client, SwaggerClient)
+
+    def test_client_with_token(self, requests_mocker):
+        # given
+        requests_mocker.register_uri(
+            "GET", url="https://esi.evetech.net/_latest/swagger.json", json=self.spec
+        )
+        requests_mocker.register_uri(
+            "GET", url="https://esi.evetech.net/latest/swagger.json", json=self.spec
+        )
+        # when
+        client = esi_client_factory(token=self.token)
+        # then
+        self.assertIsInstance(client, SwaggerClient)
+
+    def test_client_with_version(self, requests_mocker):
+        # given
+        requests_mocker.register_uri(
+            "GET", url="https://esi.evetech.net/latest/swagger.json", json=self.spec
+        )
+        requests_mocker.register_uri(
+            "GET", url="https://esi.evetech.net/_latest/swagger.json", json=self.spec
+        )
+        requests_mocker.register_uri(
+            "GET", url="https://esi.evetech.net/v1/swagger.json", json=self.spec
+        )
+        # when
+        client = esi_client_factory(version="v1")
+        # then
+        self.assertIsInstance(client, SwaggerClient)
+
+    def test_client_with_spec_file(self, requests_mocker):
+        # given
+        requests_mocker.register_uri(
+            "GET", url="https://esi.evetech.net/latest/swagger.json", json=self.spec
+        )
         requests_mocker.register_uri(
             "GET", url="https://esi.evetech.net/_latest/swagger.json", json=self.spec
         )
+        # when
+        client = esi_client_factory(spec_file=SWAGGER_SPEC_PATH_MINIMAL)
+        # then
+        self.assertIsInstance(client, SwaggerClient)
+
+    def test_client_with_explicit_resource(self, requests_mocker):
+        # given
         requests_mocker.register_uri(
             "GET", url="https://esi.evetech.net/latest/swagger.json", json=self.spec
         )
+        requests_mocker.register_uri(
+            "GET", url="https://esi.evetech.net/_latest/swagger.json", json=self.spec
+        )
+        requests_mocker.register_uri(
+            "GET", url="https://esi.evetech.net/v1/swagger.json", json=self.spec
+        )
         # when
-        client = esi_client_factory()
+        client = esi_client_factory(Status="v1")
         # then
         self.assertIsInstance(client, SwaggerClient)
 
-    def test_client_with_token(self, requests_mocker):
+    def test_should_share_session_between_clients(self, requests_mocker):
         # given
         requests_mocker.register_uri(
             "GET", url="https://esi.evetech.net/_latest/swagger.json", json=self.spec
@@ -371,54 +2063,153 @@ class TestEsiClientFactory(NoSocketsTestCase):
             "GET", url="https://esi.evetech.net/latest/swagger.json", json=self.spec
         )
         # when
-        client = esi_client_factory(token=self.token)
+        client_1 = esi_client_factory()
+        client_2 = esi_client_factory(token=self.token)
         # then
-        self.assertIsInstance(client, SwaggerClient)
+        http_client_1 = client_1.swagger_spec.http_client
+        http_client_2 = client_2.swagger_spec.http_client
+        self.assertIs(http_client_1.session, http_client_2.session)
+        self.assertIsNone(http_client_1.authenticator)
+        self.assertEqual(http_client_2.authenticator.token, self.token)
 
-    def test_client_with_version(self, requests_mocker):
+    def test_should_not_store_cookies_in_shared_session(self, requests_mocker):
+        # given
+        headers = email.message.Message()
+        headers["Set-Cookie"] = "session=abc"
+        response = Mock(**{"info.return_value": headers})
+        request = urllib.request.Request("https://esi.evetech.net/latest/status/")
+        with patch(MODULE_PATH + "._shared_session", None):
+            session = _get_shared_session()
+            # when
+            session.cookies.extract_cookies(response, request)
+        # then
+        self.assertEqual(len(session.cookies), 0)
+
+    def test_should_reset_connections_of_shared_session_after_fork(
+        self, requests_mocker
+    ):
         # given
+        requests_mocker.register_uri(
+            "GET", url="https://esi.evetech.net/_latest/swagger.json", json=self.spec
+        )
         requests_mocker.register_uri(
             "GET", url="https://esi.evetech.net/latest/swagger.json", json=self.spec
         )
+        with patch(MODULE_PATH + "._shared_session", None):
+            client = esi_client_factory()
+            session = client.swagger_spec.http_client.session
+            adapter = session.get_adapter("https://esi.evetech.net")
+            pool_manager = adapter.poolmanager
+            pool_manager.connection_from_url("https://esi.evetech.net")
+            # when
+            _reset_after_fork()
+            # then
+            self.assertIs(_get_shared_session(), session)
+        self.assertIsNot(adapter.poolmanager, pool_manager)
+        self.assertEqual(len(adapter.poolmanager.pools), 0)
+        self.assertEqual(adapter.poolmanager.connection_pool_kw["maxsize"], 10)
+
+    def test_should_create_client_for_token(self, requests_mocker):
+        # given
         requests_mocker.register_uri(
             "GET", url="https://esi.evetech.net/_latest/swagger.json", json=self.spec
         )
         requests_mocker.register_uri(
-            "GET", url="https://esi.evetech.net/v1/swagger.json", json=self.spec
+            "GET", url="https://esi.evetech.net/latest/swagger.json", json=self.spec
         )
+        client = esi_client_factory(app_info_text="my-app v1.0.0")
         # when
-        client = esi_client_factory(version="v1")
+        token_client = client.for_token(self.token)
         # then
-        self.assertIsInstance(client, SwaggerClient)
+        http_client = client.swagger_spec.http_client
+        token_http_client = token_client.swagger_spec.http_client
+        self.assertIsNone(http_client.authenticator)
+        self.assertEqual(token_http_client.authenticator.token, self.token)
+        self.assertIs(token_http_client.session, http_client.session)
+        self.assertEqual(token_http_client.user_agent, http_client.user_agent)
+        self.assertIs(
+            token_client.Status.get_status.operation.swagger_spec.http_client,
+            token_http_client,
+        )
+        self.assertIs(
+            token_client.swagger_spec.definitions, client.swagger_spec.definitions
+        )
 
-    def test_client_with_spec_file(self, requests_mocker):
+    def test_should_keep_datasource_for_token(self, requests_mocker):
         # given
+        requests_mocker.register_uri(
+            "GET", url="https://esi.evetech.net/_latest/swagger.json", json=self.spec
+        )
         requests_mocker.register_uri(
             "GET", url="https://esi.evetech.net/latest/swagger.json", json=self.spec
         )
+        client = esi_client_factory(datasource="singularity")
+        # when
+        token_client = client.for_token(self.token)
+        # then
+        authenticator = token_client.swagger_spec.http_client.authenticator
+        self.assertEqual(authenticator.datasource, "singularity")
+
+    @patch(MODULE_PATH + ".app_settings.ESI_CACHE_RESPONSE", False)
+    def test_should_send_requests_with_token(self, requests_mocker):
+        # given
         requests_mocker.register_uri(
             "GET", url="https://esi.evetech.net/_latest/swagger.json", json=self.spec
         )
-        # when
+        requests_mocker.register_uri(
+            "GET", url="https://esi.evetech.net/latest/swagger.json", json=self.spec
+        )
+        requests_mocker.register_uri(
+            "GET",
+            url="https://esi.evetech.net/v1/status/",
+            json={"players": 1, "server_version": "1", "start_time": "2020-01-01"},
+        )
         client = esi_client_factory(spec_file=SWAGGER_SPEC_PATH_MINIMAL)
+        # when
+        client.for_token(self.token).Status.get_status().result()
+        client.Status.get_status().result()
         # then
-        self.assertIsInstance(client, SwaggerClient)
+        token_request, public_request = requests_mocker.request_history[-2:]
+        self.assertEqual(
+            token_request.headers["Authorization"], "Bearer my_access_token"
+        )
+        self.assertNotIn("Authorization", public_request.headers)
 
-    def test_client_with_explicit_resource(self, requests_mocker):
+    def test_client_with_operations_and_resources(self, requests_mocker):
         # given
         requests_mocker.register_uri(
-            "GET", url="https://esi.evetech.net/latest/swagger.json", json=self.spec
+            "GET",
+            url="https://esi.evetech.net/_latest/swagger.json",
+            json=_load_json_file(SWAGGER_SPEC_PATH_FULL),
+        )
+        # when
+        client = esi_client_factory(
+            spec_file=SWAGGER_SPEC_PATH_FULL,
+            operations=["get_status"],
+            resources=["Universe"],
         )
+        # then
+        self.assertCountEqual(dir(client), ["Status", "Universe"])
+        self.assertListEqual(dir(client.Status), ["get_status"])
+
+    @patch.dict(MODULE_PATH + "._built_specs", clear=True)
+    def test_client_with_operations_and_version(self, requests_mocker):
+        # given
         requests_mocker.register_uri(
             "GET", url="https://esi.evetech.net/_latest/swagger.json", json=self.spec
         )
+        requests_mocker.register_uri(
+            "GET", url="https://esi.evetech.net/latest/swagger.json", json=self.spec
+        )
         requests_mocker.register_uri(
             "GET", url="https://esi.evetech.net/v1/swagger.json", json=self.spec
         )
         # when
-        client = esi_client_factory(Status="v1")
+        client = esi_client_factory(
+            operations=["get_status"], Status="v1", Character="v1"
+        )
         # then
-        self.assertIsInstance(client, SwaggerClient)
+        self.assertListEqual(dir(client), ["Status"])
 
     def test__time_to_expiry_failure(self, requests_mocker):
         seconds = CachingHttpFuture._time_to_expiry("fail")
@@ -517,76 +2308,515 @@ class TestClientResult(NoSocketsTestCase):
             # we tried # times before raising
             self.assertEqual(mock_future_result.call_count, 1)
 
-    @patch(MODULE_PATH + ".app_settings.ESI_SERVER_ERROR_BACKOFF_FACTOR", 0.5)
-    @patch(MODULE_PATH + ".app_settings.ESI_SERVER_ERROR_MAX_RETRIES", 4)
-    @patch(MODULE_PATH + ".sleep", lambda x: None)
-    def test_retry_with_custom_retries(self, mock_future_result):
-        mock_future_result.side_effect = create_http_error(502)
-        try:
-            self.esi_client.Status.get_status().result(retries=1)
-        except HTTPBadGateway as e:
-            # requests error thrown
-            self.assertIsInstance(e, HTTPBadGateway)
-            # we tried # times before raising
-            self.assertEqual(mock_future_result.call_count, 2)
+    @patch(MODULE_PATH + ".app_settings.ESI_SERVER_ERROR_BACKOFF_FACTOR", 0.5)
+    @patch(MODULE_PATH + ".app_settings.ESI_SERVER_ERROR_MAX_RETRIES", 4)
+    @patch(MODULE_PATH + ".sleep", lambda x: None)
+    def test_retry_with_custom_retries(self, mock_future_result):
+        mock_future_result.side_effect = create_http_error(502)
+        try:
+            self.esi_client.Status.get_status().result(retries=1)
+        except HTTPBadGateway as e:
+            # requests error thrown
+            self.assertIsInstance(e, HTTPBadGateway)
+            # we tried # times before raising
+            self.assertEqual(mock_future_result.call_count, 2)
+
+
+@patch(MODULE_PATH + ".HttpFuture.result")
+class TestClientResultAllPages(NoSocketsTestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        spec = _load_json_file(SWAGGER_SPEC_PATH_FULL)
+        with requests_mock.Mocker() as requests_mocker:
+            requests_mocker.register_uri(
+                "GET", url="https://esi.evetech.net/_latest/swagger.json", json=spec
+            )
+            cls.esi_client = esi_client_factory(spec_file=SWAGGER_SPEC_PATH_FULL)
+
+    def test_pages(self, mock_future_result):
+        class MockResultHeaders:
+            def __init__(self):
+                self.headers = {"X-Pages": 10}
+                self.status_code = 200
+                self.text = "dummy"
+
+        # given
+        mock_future_result.return_value = ({"contract_test": 1}, MockResultHeaders())
+        self.esi_client.Contracts.get_contracts_public_region_id(region_id=1).results()
+        # then
+        self.assertEqual(mock_future_result.call_count, 10)  # we got 10 pages of data
+
+    def test_pages_response(self, mock_future_result):
+        class MockResultHeaders:
+            def __init__(self):
+                self.headers = {"X-Pages": 10}
+                self.status_code = 200
+                self.text = "dummy"
+
+        # given
+        mock_future_result.return_value = ({"contract_test": 1}, MockResultHeaders())
+        o = self.esi_client.Contracts.get_contracts_public_region_id(region_id=1)
+        o.request_config.also_return_response = True
+        # when
+        result, response = o.results()
+        # then
+        self.assertEqual(mock_future_result.call_count, 10)  # we got 10 pages of data
+        self.assertEqual(len(result), 10)  # we got 10 lots of data
+        self.assertEqual(response.headers, {"X-Pages": 10})  # we got header of data
+
+    def test_pages_on_non_paged_endpoint(self, mock_future_result):
+        class MockResultHeaders:
+            def __init__(self):
+                self.headers = {"header_test": "ok"}
+                self.status_code = 200
+                self.text = "dummy"
+
+        # given
+        mock_future_result.return_value = ({"status_test": 1}, MockResultHeaders())
+        # when
+        self.esi_client.Status.get_status().results()
+        # then
+        self.assertEqual(mock_future_result.call_count, 1)  # we got no pages of data
+
+
+@patch.object(CachingHttpFuture, "_result_with_retries", autospec=True)
+class TestClientResultParallelPages(NoSocketsTestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        spec = _load_json_file(SWAGGER_SPEC_PATH_FULL)
+        with requests_mock.Mocker() as requests_mocker:
+            requests_mocker.register_uri(
+                "GET", url="https://esi.evetech.net/_latest/swagger.json", json=spec
+            )
+            cls.esi_client = esi_client_factory(spec_file=SWAGGER_SPEC_PATH_FULL)
+
+    def setUp(self) -> None:
+        self.threads = set()
+
+    def my_result(self, future, **kwargs):
+        self.threads.add(threading.current_thread().name)
+        page = future.future.request.params["page"]
+        return [page], BravadoResponseStub(200, headers={"X-Pages": 5})
+
+    def test_should_fetch_pages_concurrently_in_order(self, mock_result):
+        # given
+        mock_result.side_effect = self.my_result
+        # when
+        results = self.esi_client.Contracts.get_contracts_public_region_id(
+            region_id=1
+        ).results(parallel_pages=True)
+        # then
+        self.assertEqual(results, [1, 2, 3, 4, 5])
+        self.assertEqual(mock_result.call_count, 5)
+        self.assertIn(threading.current_thread().name, self.threads)
+        self.assertGreater(len(self.threads), 1)
+
+    @patch(MODULE_PATH + ".app_settings.ESI_CONNECTION_POOL_MAXSIZE", 2)
+    @patch(MODULE_PATH + ".app_settings.ESI_PARALLEL_PAGES", True)
+    def test_should_limit_threads_to_connection_pool_size(self, mock_result):
+        # given
+        mock_result.side_effect = self.my_result
+        # when
+        results = self.esi_client.Contracts.get_contracts_public_region_id(
+            region_id=1
+        ).results()
+        # then
+        self.assertEqual(results, [1, 2, 3, 4, 5])
+        self.assertLessEqual(len(self.threads), 3)
+
+    @patch(MODULE_PATH + ".app_settings.ESI_CONNECTION_POOL_MAXSIZE", 2)
+    def test_should_fetch_pages_through_sliding_window(self, mock_result):
+        # given
+        mock_result.side_effect = self.my_result
+        operation = self.esi_client.Contracts.get_contracts_public_region_id(
+            region_id=1
+        )
+        # when
+        pages = operation.results_iter(by_page=True, parallel_pages=True)
+        first_pages = [next(pages), next(pages)]
+        sleep(0.1)
+        # then
+        self.assertEqual(first_pages, [[1], [2]])
+        self.assertEqual(mock_result.call_count, 3)
+        self.assertEqual(list(pages), [[3], [4], [5]])
+        self.assertEqual(mock_result.call_count, 5)
+
+    def test_should_fetch_pages_one_by_one_by_default(self, mock_result):
+        # given
+        mock_result.side_effect = self.my_result
+        # when
+        results = self.esi_client.Contracts.get_contracts_public_region_id(
+            region_id=1
+        ).results()
+        # then
+        self.assertEqual(results, [1, 2, 3, 4, 5])
+        self.assertEqual(self.threads, {threading.current_thread().name})
+
+    def test_should_raise_error_from_page(self, mock_result):
+        # given
+        def my_result(future, **kwargs):
+            if future.future.request.params["page"] == 3:
+                raise create_http_error(404)
+            return self.my_result(future, **kwargs)
+
+        mock_result.side_effect = my_result
+        # when/then
+        with self.assertRaises(bravado.exception.HTTPNotFound):
+            self.esi_client.Contracts.get_contracts_public_region_id(
+                region_id=1
+            ).results(parallel_pages=True)
+
+
+@patch.object(CachingHttpFuture, "_result_with_retries", autospec=True)
+class TestClientResultsIter(NoSocketsTestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        spec = _load_json_file(SWAGGER_SPEC_PATH_FULL)
+        with requests_mock.Mocker() as requests_mocker:
+            requests_mocker.register_uri(
+                "GET", url="https://esi.evetech.net/_latest/swagger.json", json=spec
+            )
+            cls.esi_client = esi_client_factory(spec_file=SWAGGER_SPEC_PATH_FULL)
+
+    @staticmethod
+    def my_result(future, **kwargs):
+        if "page" not in future.future.request.params:
+            return {"players": 500}, BravadoResponseStub(200)
+        page = future.future.request.params["page"]
+        return [page * 10, page * 10 + 1], BravadoResponseStub(
+            200, headers={"X-Pages": 3}
+        )
+
+    def test_should_yield_items_while_fetching_pages(self, mock_result):
+        # given
+        mock_result.side_effect = self.my_result
+        operation = self.esi_client.Contracts.get_contracts_public_region_id(
+            region_id=1
+        )
+        # when
+        items = operation.results_iter()
+        first_item = next(items)
+        # then
+        self.assertEqual(first_item, 10)
+        self.assertEqual(mock_result.call_count, 1)
+        self.assertEqual(list(items), [11, 20, 21, 30, 31])
+        self.assertEqual(mock_result.call_count, 3)
+
+    def test_should_yield_pages(self, mock_result):
+        # given
+        mock_result.side_effect = self.my_result
+        operation = self.esi_client.Contracts.get_contracts_public_region_id(
+            region_id=1
+        )
+        # when
+        pages = list(operation.results_iter(by_page=True))
+        # then
+        self.assertEqual(pages, [[10, 11], [20, 21], [30, 31]])
+
+    def test_should_yield_items_from_parallel_pages(self, mock_result):
+        # given
+        mock_result.side_effect = self.my_result
+        operation = self.esi_client.Contracts.get_contracts_public_region_id(
+            region_id=1
+        )
+        # when
+        items = list(operation.results_iter(parallel_pages=True))
+        # then
+        self.assertEqual(items, [10, 11, 20, 21, 30, 31])
+
+    def test_should_yield_result_of_non_paged_endpoint(self, mock_result):
+        # given
+        mock_result.side_effect = self.my_result
+        # when
+        items = list(self.esi_client.Status.get_status().results_iter())
+        # then
+        self.assertEqual(items, [{"players": 500}])
+
+    def test_should_restore_also_return_response_when_closed(self, mock_result):
+        # given
+        mock_result.side_effect = self.my_result
+        operation = self.esi_client.Contracts.get_contracts_public_region_id(
+            region_id=1
+        )
+        items = operation.results_iter()
+        next(items)
+        # when
+        items.close()
+        # then
+        self.assertFalse(operation.request_config.also_return_response)
+
+
+@patch.object(CachingHttpFuture, "_result_with_retries", autospec=True)
+class TestClientResultsCachedPages(NoSocketsTestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        spec = _load_json_file(SWAGGER_SPEC_PATH_FULL)
+        with requests_mock.Mocker() as requests_mocker:
+            requests_mocker.register_uri(
+                "GET", url="https://esi.evetech.net/_latest/swagger.json", json=spec
+            )
+            cls.esi_client = esi_client_factory(spec_file=SWAGGER_SPEC_PATH_FULL)
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    @staticmethod
+    def my_result(future, **kwargs):
+        page = future.future.request.params["page"]
+        response = BravadoResponseStub(
+            200,
+            headers={
+                "Content-Type": "application/json; charset=UTF-8",
+                "X-Pages": "4",
+                **MockResultFuture().headers,
+            },
+            raw_bytes=json.dumps([{"contract_id": page}]).encode("utf-8"),
+        )
+        return [{"contract_id": page}], response
+
+    def _operation(self):
+        return self.esi_client.Contracts.get_contracts_public_region_id(region_id=1)
+
+    @staticmethod
+    def _contract_ids(results) -> list:
+        return [obj["contract_id"] for obj in results]
+
+    def test_should_read_all_cached_pages_at_once(self, mock_result):
+        # given
+        mock_result.side_effect = self.my_result
+        self._operation().results()
+        mock_result.reset_mock()
+        cache_get = CachingHttpFuture._cache_get
+        # when
+        with patch.object(
+            CachingHttpFuture, "_cache_get", autospec=True, side_effect=cache_get
+        ) as mock_cache_get, patch.object(
+            django.core.cache.cache, "get_many", wraps=cache.get_many
+        ) as mock_cache_get_many:
+            results = self._operation().results()
+        # then
+        self.assertEqual(self._contract_ids(results), [1, 2, 3, 4])
+        self.assertFalse(mock_result.called)
+        self.assertEqual(mock_cache_get.call_count, 1)
+        page_lookups = [
+            keys
+            for (keys,), _ in mock_cache_get_many.call_args_list
+            if not keys[0].startswith("esi_generation_")
+        ]
+        self.assertEqual(len(page_lookups), 1)
+        self.assertEqual(len(page_lookups[0]), 3)
+
+    @patch(MODULE_PATH + ".PAGES_CACHE_BATCH_SIZE", 2)
+    def test_should_read_cached_pages_in_batches(self, mock_result):
+        # given
+        mock_result.side_effect = self.my_result
+        self._operation().results()
+        mock_result.reset_mock()
+        # when
+        with patch.object(
+            CachingHttpFuture,
+            "_cache_get_many",
+            autospec=True,
+            side_effect=CachingHttpFuture._cache_get_many,
+        ) as spy_cache_get_many:
+            pages = self._operation().results_iter(by_page=True)
+            first_pages = [next(pages), next(pages)]
+            lookups_before = spy_cache_get_many.call_count
+            results = first_pages + list(pages)
+        # then
+        self.assertEqual([self._contract_ids(r) for r in results], [[1], [2], [3], [4]])
+        self.assertFalse(mock_result.called)
+        self.assertEqual(lookups_before, 1)
+        self.assertEqual(
+            [len(keys) for (_, keys), _ in spy_cache_get_many.call_args_list], [2, 1]
+        )
+
+    def test_should_fetch_pages_missing_from_cache(self, mock_result):
+        # given
+        mock_result.side_effect = self.my_result
+        self._operation().results()
+        mock_result.reset_mock()
+        page_future = self._operation()
+        page_future.future.request.params["page"] = 3
+        cache.delete(page_future._cache_key())
+        # when
+        results = self._operation().results()
+        # then
+        self.assertEqual(self._contract_ids(results), [1, 2, 3, 4])
+        self.assertEqual(mock_result.call_count, 1)
+
+    def test_should_fetch_pages_missing_from_cache_in_parallel(self, mock_result):
+        # given
+        mock_result.side_effect = self.my_result
+        self._operation().results()
+        mock_result.reset_mock()
+        for page in (2, 4):
+            page_future = self._operation()
+            page_future.future.request.params["page"] = page
+            cache.delete(page_future._cache_key())
+        # when
+        results = self._operation().results(parallel_pages=True)
+        # then
+        self.assertEqual(self._contract_ids(results), [1, 2, 3, 4])
+        self.assertEqual(mock_result.call_count, 2)
+
+    def test_should_not_read_cache_when_ignored(self, mock_result):
+        # given
+        mock_result.side_effect = self.my_result
+        self._operation().results()
+        mock_result.reset_mock()
+        # when
+        results = self._operation().results(ignore_cache=True)
+        # then
+        self.assertEqual(self._contract_ids(results), [1, 2, 3, 4])
+        self.assertEqual(mock_result.call_count, 4)
+
+
+def _spec_with_cursor_route() -> dict:
+    """Minimal spec plus a route with cursor based pagination."""
+    spec = _load_json_file(SWAGGER_SPEC_PATH_MINIMAL)
+    cursor_param = {"in": "query", "required": False, "type": "string"}
+    spec["paths"]["/v1/characters/{character_id}/freelance_jobs/"] = {
+        "get": {
+            "operationId": "get_characters_character_id_freelance_jobs",
+            "tags": ["Character"],
+            "parameters": [
+                {"$ref": "#/parameters/character_id"},
+                {"$ref": "#/parameters/datasource"},
+                {"name": "after", **cursor_param},
+                {"name": "before", **cursor_param},
+            ],
+            "responses": {
+                "200": {
+                    "description": "Freelance jobs",
+                    "schema": {
+                        "type": "object",
+                        "properties": {
+                            "cursor": {
+                                "type": "object",
+                                "properties": {
+                                    "after": {"type": "string"},
+                                    "before": {"type": "string"},
+                                },
+                            },
+                            "jobs": {"type": "array", "items": {"type": "integer"}},
+                        },
+                    },
+                }
+            },
+        }
+    }
+    return spec
 
 
-@patch(MODULE_PATH + ".HttpFuture.result")
-class TestClientResultAllPages(NoSocketsTestCase):
+@patch.object(CachingHttpFuture, "_result_with_retries", autospec=True)
+class TestClientResultsCursor(NoSocketsTestCase):
     @classmethod
     def setUpClass(cls) -> None:
         super().setUpClass()
-        spec = _load_json_file(SWAGGER_SPEC_PATH_FULL)
+        spec = _spec_with_cursor_route()
         with requests_mock.Mocker() as requests_mocker:
             requests_mocker.register_uri(
                 "GET", url="https://esi.evetech.net/_latest/swagger.json", json=spec
             )
-            cls.esi_client = esi_client_factory(spec_file=SWAGGER_SPEC_PATH_FULL)
+            cls.esi_client = SwaggerClient.from_spec(
+                spec, http_client=RequestsClientPlus(), config={"use_models": False}
+            )
 
-    def test_pages(self, mock_future_result):
-        class MockResultHeaders:
-            def __init__(self):
-                self.headers = {"X-Pages": 10}
-                self.status_code = 200
-                self.text = "dummy"
+    def setUp(self) -> None:
+        self.jobs = list(range(1, 8))
+
+    def my_result(self, future, **kwargs):
+        """Return up to 3 jobs per page, where higher IDs are newer."""
+        params = future.future.request.params
+        if "after" in params:
+            after = int(params["after"][1:])
+            jobs = [job for job in self.jobs if job > after][:3]
+        else:
+            before = int(params["before"][1:]) if "before" in params else 10 ** 6
+            jobs = sorted((job for job in self.jobs if job < before), reverse=True)
+            jobs = jobs[:3]
+        cursor = {"after": f"a{max(jobs)}", "before": f"b{min(jobs)}"} if jobs else {}
+        return {"cursor": cursor, "jobs": jobs}, BravadoResponseStub(200)
+
+    def _operation(self):
+        return self.esi_client.Character.get_characters_character_id_freelance_jobs(
+            character_id=1001
+        )
 
+    def test_should_return_all_records(self, mock_result):
         # given
-        mock_future_result.return_value = ({"contract_test": 1}, MockResultHeaders())
-        self.esi_client.Contracts.get_contracts_public_region_id(region_id=1).results()
+        mock_result.side_effect = self.my_result
+        # when
+        jobs, cursor = self._operation().results_cursor()
         # then
-        self.assertEqual(mock_future_result.call_count, 10)  # we got 10 pages of data
+        self.assertEqual(jobs, [7, 6, 5, 4, 3, 2, 1])
+        self.assertEqual(cursor, "a7")
+        self.assertEqual(mock_result.call_count, 4)
 
-    def test_pages_response(self, mock_future_result):
-        class MockResultHeaders:
-            def __init__(self):
-                self.headers = {"X-Pages": 10}
-                self.status_code = 200
-                self.text = "dummy"
+    def test_should_return_new_records_only(self, mock_result):
+        # given
+        mock_result.side_effect = self.my_result
+        self.jobs = list(range(1, 12))
+        # when
+        jobs, cursor = self._operation().results_cursor(after="a7")
+        # then
+        self.assertEqual(jobs, [8, 9, 10, 11])
+        self.assertEqual(cursor, "a11")
 
+    def test_should_return_same_cursor_when_no_new_records(self, mock_result):
         # given
-        mock_future_result.return_value = ({"contract_test": 1}, MockResultHeaders())
-        o = self.esi_client.Contracts.get_contracts_public_region_id(region_id=1)
-        o.request_config.also_return_response = True
+        mock_result.side_effect = self.my_result
         # when
-        result, response = o.results()
+        jobs, cursor = self._operation().results_cursor(after="a7")
         # then
-        self.assertEqual(mock_future_result.call_count, 10)  # we got 10 pages of data
-        self.assertEqual(len(result), 10)  # we got 10 lots of data
-        self.assertEqual(response.headers, {"X-Pages": 10})  # we got header of data
+        self.assertEqual(jobs, [])
+        self.assertEqual(cursor, "a7")
 
-    def test_pages_on_non_paged_endpoint(self, mock_future_result):
-        class MockResultHeaders:
-            def __init__(self):
-                self.headers = {"header_test": "ok"}
-                self.status_code = 200
-                self.text = "dummy"
+    def test_should_yield_pages_with_cursor(self, mock_result):
+        # given
+        mock_result.side_effect = self.my_result
+        self.jobs = list(range(1, 12))
+        # when
+        pages = list(self._operation().results_cursor_iter(after="a4"))
+        # then
+        self.assertEqual(pages, [([5, 6, 7], "a7"), ([8, 9, 10], "a10"), ([11], "a11")])
 
+    def test_should_restore_request_params(self, mock_result):
         # given
-        mock_future_result.return_value = ({"status_test": 1}, MockResultHeaders())
+        mock_result.side_effect = self.my_result
+        operation = self._operation()
         # when
-        self.esi_client.Status.get_status().results()
+        operation.results_cursor(after="a4")
+        operation.results_cursor()
         # then
-        self.assertEqual(mock_future_result.call_count, 1)  # we got no pages of data
+        params = operation.future.request.params
+        self.assertNotIn("after", params)
+        self.assertNotIn("before", params)
+
+    def test_should_restore_request_params_when_interrupted(self, mock_result):
+        # given
+        mock_result.side_effect = self.my_result
+        operation = self._operation()
+        operation.future.request.params["before"] = "b6"
+        # when
+        pages = operation.results_cursor_iter()
+        next(pages)
+        next(pages)
+        pages.close()
+        # then
+        params = operation.future.request.params
+        self.assertNotIn("after", params)
+        self.assertEqual(params["before"], "b6")
+
+    def test_should_raise_error_for_route_without_cursor(self, mock_result):
+        with self.assertRaises(ValueError):
+            self.esi_client.Status.get_status().results_cursor()
 
 
 @patch(MODULE_PATH + ".app_settings.ESI_LANGUAGES", ["lang1", "lang2", "lang3"])
@@ -597,6 +2827,14 @@ class TestClientResultsLocalized(NoSocketsTestCase):
     def setUpClass(cls) -> None:
         super().setUpClass()
         cls.spec = _load_json_file(SWAGGER_SPEC_PATH_MINIMAL)
+        cls.spec["paths"]["/v1/status/"]["get"]["parameters"].append(
+            {"$ref": "#/parameters/language"}
+        )
+
+    def _client(self):
+        return SwaggerClient.from_spec(
+            self.spec, http_client=RequestsClientPlus(), config={"use_models": False}
+        )
 
     @staticmethod
     def my_results(**kwargs):
@@ -610,7 +2848,7 @@ class TestClientResultsLocalized(NoSocketsTestCase):
         requests_mocker.register_uri(
             "GET", url="https://esi.evetech.net/_latest/swagger.json", json=self.spec
         )
-        client = esi_client_factory(spec_file=SWAGGER_SPEC_PATH_MINIMAL)
+        client = self._client()
         # when
         result = client.Status.get_status().results_localized()
         # then
@@ -627,7 +2865,7 @@ class TestClientResultsLocalized(NoSocketsTestCase):
         requests_mocker.register_uri(
             "GET", url="https://esi.evetech.net/_latest/swagger.json", json=self.spec
         )
-        client = esi_client_factory(spec_file=SWAGGER_SPEC_PATH_MINIMAL)
+        client = self._client()
         # when
         result = client.Status.get_status().results_localized(
             languages=["lang2", "lang3"]
@@ -645,11 +2883,350 @@ class TestClientResultsLocalized(NoSocketsTestCase):
         requests_mocker.register_uri(
             "GET", url="https://esi.evetech.net/_latest/swagger.json", json=self.spec
         )
-        client = esi_client_factory(spec_file=SWAGGER_SPEC_PATH_MINIMAL)
+        client = self._client()
         # when/then
         with self.assertRaises(ValueError):
             client.Status.get_status().results_localized(languages=["lang2", "xxx"])
 
+    def test_should_fetch_languages_concurrently(
+        self, mock_future_results, requests_mocker
+    ):
+        # given
+        threads = set()
+        all_started = threading.Barrier(3, timeout=5)
+
+        def my_results(**kwargs):
+            threads.add(threading.current_thread().name)
+            all_started.wait()
+            return self.my_results(**kwargs)
+
+        mock_future_results.side_effect = my_results
+        requests_mocker.register_uri(
+            "GET", url="https://esi.evetech.net/_latest/swagger.json", json=self.spec
+        )
+        client = self._client()
+        # when
+        result = client.Status.get_status().results_localized()
+        # then
+        self.assertEqual(len(threads), 3)
+        self.assertEqual(result["lang3"], "response_lang3")
+
+    def test_should_fetch_only_once_when_not_localized(
+        self, mock_future_results, requests_mocker
+    ):
+        # given
+        mock_future_results.side_effect = self.my_results
+        requests_mocker.register_uri(
+            "GET",
+            url="https://esi.evetech.net/_latest/swagger.json",
+            json=_load_json_file(SWAGGER_SPEC_PATH_MINIMAL),
+        )
+        client = esi_client_factory(spec_file=SWAGGER_SPEC_PATH_MINIMAL)
+        # when
+        result = client.Status.get_status().results_localized()
+        # then
+        self.assertEqual(mock_future_results.call_count, 1)
+        self.assertDictEqual(result, {"lang1": "", "lang2": "", "lang3": ""})
+
+
+@patch(MODULE_PATH + ".app_settings.ESI_LANGUAGES", ["lang1", "lang2", "lang3"])
+@patch.object(CachingHttpFuture, "results", autospec=True)
+@patch.object(CachingHttpFuture, "result", autospec=True)
+class TestClientAsync(NoSocketsTestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        # the event loop needs a local socket pair, so create it before the guard
+        cls.loop = asyncio.new_event_loop()
+        super().setUpClass()
+        spec = _load_json_file(SWAGGER_SPEC_PATH_MINIMAL)
+        with requests_mock.Mocker() as requests_mocker:
+            requests_mocker.register_uri(
+                "GET", url="https://esi.evetech.net/_latest/swagger.json", json=spec
+            )
+            cls.unlocalized_client = SwaggerClient.from_spec(
+                copy.deepcopy(spec),
+                http_client=RequestsClientPlus(),
+                config={"use_models": False},
+            )
+            spec["paths"]["/v1/status/"]["get"]["parameters"].append(
+                {"$ref": "#/parameters/language"}
+            )
+            cls.esi_client = SwaggerClient.from_spec(
+                spec, http_client=RequestsClientPlus(), config={"use_models": False}
+            )
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        super().tearDownClass()
+        cls.loop.close()
+
+    @staticmethod
+    def my_result(future, **kwargs):
+        return threading.current_thread().name, kwargs
+
+    @staticmethod
+    def my_results(future, **kwargs):
+        return "response_" + kwargs.get("language", "")
+
+    def test_should_await_result_in_thread_pool(self, mock_result, mock_results):
+        # given
+        mock_result.side_effect = self.my_result
+        client = self.esi_client
+        # when
+        thread_name, kwargs = self.loop.run_until_complete(
+            client.Status.get_status().aresult(ignore_cache=True)
+        )
+        # then
+        self.assertTrue(thread_name.startswith("esi_async"))
+        self.assertDictEqual(kwargs, {"ignore_cache": True})
+
+    def test_should_await_many_results_concurrently(self, mock_result, mock_results):
+        # given
+        all_started = threading.Barrier(3, timeout=5)
+
+        def my_result(future, **kwargs):
+            all_started.wait()
+            return "ok"
+
+        mock_result.side_effect = my_result
+        client = self.esi_client
+
+        async def fetch_all():
+            return await asyncio.gather(
+                *(client.Status.get_status().aresult() for _ in range(3))
+            )
+
+        # when
+        with patch(MODULE_PATH + ".app_settings.ESI_CONNECTION_POOL_MAXSIZE", 3), \
+                patch(MODULE_PATH + "._async_executor", None):
+            result = self.loop.run_until_complete(fetch_all())
+        # then
+        self.assertEqual(result, ["ok", "ok", "ok"])
+
+    def test_should_await_results(self, mock_result, mock_results):
+        # given
+        mock_results.side_effect = self.my_results
+        client = self.esi_client
+        # when
+        result = self.loop.run_until_complete(
+            client.Status.get_status().aresults(language="lang2")
+        )
+        # then
+        self.assertEqual(result, "response_lang2")
+
+    def test_should_await_results_localized(self, mock_result, mock_results):
+        # given
+        mock_results.side_effect = self.my_results
+        client = self.esi_client
+        # when
+        result = self.loop.run_until_complete(
+            client.Status.get_status().aresults_localized(languages=["lang1", "lang3"])
+        )
+        # then
+        self.assertDictEqual(
+            result, {"lang1": "response_lang1", "lang3": "response_lang3"}
+        )
+
+    def test_should_await_once_when_not_localized(self, mock_result, mock_results):
+        # given
+        mock_results.side_effect = self.my_results
+        client = self.unlocalized_client
+        # when
+        result = self.loop.run_until_complete(
+            client.Status.get_status().aresults_localized()
+        )
+        # then
+        self.assertEqual(mock_results.call_count, 1)
+        self.assertDictEqual(
+            result, {"lang1": "response_", "lang2": "response_", "lang3": "response_"}
+        )
+
+    def test_should_raise_on_invalid_language(self, mock_result, mock_results):
+        client = self.esi_client
+        with self.assertRaises(ValueError):
+            self.loop.run_until_complete(
+                client.Status.get_status().aresults_localized(languages=["xxx"])
+            )
+
+
+@patch.object(CachingHttpFuture, "results", autospec=True)
+class TestCallableOperationMap(NoSocketsTestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        spec = _load_json_file(SWAGGER_SPEC_PATH_FULL)
+        with requests_mock.Mocker() as requests_mocker:
+            requests_mocker.register_uri(
+                "GET", url="https://esi.evetech.net/_latest/swagger.json", json=spec
+            )
+            cls.esi_client = esi_client_factory(spec_file=SWAGGER_SPEC_PATH_FULL)
+
+    @staticmethod
+    def my_results(future, **kwargs):
+        type_id = int(future._path_params()["type_id"])
+        if type_id == 666:
+            raise create_http_error(404)
+        return {"type_id": type_id, **kwargs}
+
+    def test_should_return_result_for_each_value(self, mock_results):
+        # given
+        mock_results.side_effect = self.my_results
+        # when
+        result = self.esi_client.Universe.get_universe_types_type_id.map(
+            type_id=[587, 603, 608, 603]
+        )
+        # then
+        self.assertDictEqual(
+            result,
+            {
+                587: {"type_id": 587},
+                603: {"type_id": 603},
+                608: {"type_id": 608},
+            },
+        )
+        self.assertEqual(mock_results.call_count, 3)
+
+    def test_should_return_errors_without_aborting(self, mock_results):
+        # given
+        mock_results.side_effect = self.my_results
+        # when
+        result = self.esi_client.Universe.get_universe_types_type_id.map(
+            type_id=range(665, 668)
+        )
+        # then
+        self.assertEqual(result[665], {"type_id": 665})
+        self.assertIsInstance(result[666], bravado.exception.HTTPNotFound)
+        self.assertEqual(result[667], {"type_id": 667})
+
+    def test_should_yield_results_as_completed(self, mock_results):
+        # given
+        mock_results.side_effect = self.my_results
+        # when
+        result = list(
+            self.esi_client.Universe.get_universe_types_type_id.map_iter(
+                type_id={587, 603}, max_workers=1, language="de"
+            )
+        )
+        # then
+        self.assertCountEqual(
+            result,
+            [(587, {"type_id": 587}), (603, {"type_id": 603})],
+        )
+        future = mock_results.call_args[0][0]
+        self.assertEqual(future.future.request.params["language"], "de")
+
+    def test_should_pass_result_kwargs(self, mock_results):
+        # given
+        mock_results.side_effect = self.my_results
+        # when
+        result = self.esi_client.Universe.get_universe_types_type_id.map(
+            type_id=[587], result_kwargs={"ignore_cache": True}
+        )
+        # then
+        self.assertDictEqual(result, {587: {"type_id": 587, "ignore_cache": True}})
+
+    def test_should_require_exactly_one_list_of_values(self, mock_results):
+        with self.assertRaises(ValueError):
+            self.esi_client.Universe.get_universe_types_type_id.map(type_id=587)
+        with self.assertRaises(ValueError):
+            self.esi_client.Universe.get_universe_types_type_id.map(
+                type_id=[587], language=["de", "en"]
+            )
+
+    def test_should_not_map_over_array_parameters(self, mock_results):
+        with self.assertRaises(ValueError):
+            self.esi_client.Universe.post_universe_names.map(ids=[587, 603])
+
+
+@patch.object(CachingHttpFuture, "result", autospec=True)
+class TestCallableOperationChunked(NoSocketsTestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        spec = _load_json_file(SWAGGER_SPEC_PATH_FULL)
+        with requests_mock.Mocker() as requests_mocker:
+            requests_mocker.register_uri(
+                "GET", url="https://esi.evetech.net/_latest/swagger.json", json=spec
+            )
+            cls.esi_client = esi_client_factory(spec_file=SWAGGER_SPEC_PATH_FULL)
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.chunks = []
+
+    def my_result(self, future, **kwargs):
+        self.assertTrue(future.request_config.also_return_response)
+        body = json.loads(future.future.request.data)
+        self.chunks.append(body)
+        response = BravadoResponseStub(200, headers=MockResultFuture().headers)
+        if future.operation.operation_id == "post_universe_ids":
+            return {"characters": [{"id": 1, "name": name} for name in body]}, response
+        return [
+            {"id": obj_id, "name": f"name_{obj_id}", "category": "character"}
+            for obj_id in reversed(body)
+        ], response
+
+    def test_should_fetch_chunks_and_merge_results(self, mock_result):
+        # given
+        mock_result.side_effect = self.my_result
+        ids = list(range(1, 2501))
+        # when
+        result = self.esi_client.Universe.post_universe_names.results_chunked(ids=ids)
+        # then
+        self.assertEqual([obj["id"] for obj in result], ids)
+        self.assertEqual(sorted(len(chunk) for chunk in self.chunks), [500, 1000, 1000])
+
+    def test_should_cache_result_for_each_item(self, mock_result):
+        # given
+        mock_result.side_effect = self.my_result
+        self.esi_client.Universe.post_universe_names.results_chunked(ids=[1, 2, 3])
+        self.chunks.clear()
+        # when
+        result = self.esi_client.Universe.post_universe_names.results_chunked(
+            ids=[3, 4, 1]
+        )
+        # then
+        self.assertEqual(self.chunks, [[4]])
+        self.assertEqual(
+            result,
+            [
+                {"id": 3, "name": "name_3", "category": "character"},
+                {"id": 4, "name": "name_4", "category": "character"},
+                {"id": 1, "name": "name_1", "category": "character"},
+            ],
+        )
+
+    def test_should_not_use_cache_when_ignored(self, mock_result):
+        # given
+        mock_result.side_effect = self.my_result
+        self.esi_client.Universe.post_universe_names.results_chunked(ids=[1, 2])
+        self.chunks.clear()
+        # when
+        self.esi_client.Universe.post_universe_names.results_chunked(
+            ids=[1, 2], result_kwargs={"ignore_cache": True}
+        )
+        # then
+        self.assertEqual(self.chunks, [[1, 2]])
+
+    def test_should_merge_object_results(self, mock_result):
+        # given
+        mock_result.side_effect = self.my_result
+        names = [f"name_{num}" for num in range(600)]
+        # when
+        result = self.esi_client.Universe.post_universe_ids.results_chunked(
+            names=names
+        )
+        # then
+        self.assertEqual([obj["name"] for obj in result["characters"]], names)
+        self.assertEqual(len(self.chunks), 2)
+
+    def test_should_raise_error_for_operation_without_array(self, mock_result):
+        with self.assertRaises(ValueError):
+            self.esi_client.Universe.get_universe_types_type_id.results_chunked(
+                type_id=587
+            )
+
 
 @requests_mock.Mocker()
 class TestEsiClientProvider(NoSocketsTestCase):
@@ -709,6 +3286,55 @@ class TestEsiClientProvider(NoSocketsTestCase):
         # then
         self.assertIsInstance(esi_client, SwaggerClient)
 
+    @patch(MODULE_PATH + ".esi_client_factory")
+    def test_should_build_client_once_when_accessed_concurrently(
+        self, requests_mocker, mock_esi_client_factory
+    ):
+        # given
+        def my_esi_client_factory(**kwargs):
+            sleep(0.05)
+            return Mock()
+
+        mock_esi_client_factory.side_effect = my_esi_client_factory
+        my_provider = EsiClientProvider()
+        all_started = threading.Barrier(5, timeout=5)
+
+        def get_client():
+            all_started.wait()
+            return my_provider.client
+
+        # when
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            clients = list(executor.map(lambda _: get_client(), range(5)))
+        # then
+        self.assertEqual(mock_esi_client_factory.call_count, 1)
+        self.assertTrue(all(client is clients[0] for client in clients))
+
+    @patch(MODULE_PATH + ".esi_client_factory")
+    def test_warm_should_build_client(self, requests_mocker, mock_esi_client_factory):
+        # given
+        my_provider = EsiClientProvider(app_info_text="my-app v1.0.0")
+        # when
+        esi_client = my_provider.warm()
+        # then
+        self.assertEqual(mock_esi_client_factory.call_count, 1)
+        self.assertIs(my_provider.client, esi_client)
+        self.assertEqual(mock_esi_client_factory.call_count, 1)
+
+    @patch(MODULE_PATH + ".esi_client_factory")
+    def test_should_rebuild_client_after_fork(
+        self, requests_mocker, mock_esi_client_factory
+    ):
+        # given
+        mock_esi_client_factory.side_effect = lambda **kwargs: Mock()
+        my_provider = EsiClientProvider()
+        esi_client = my_provider.warm()
+        # when
+        _reset_after_fork()
+        # then
+        self.assertIsNot(my_provider.client, esi_client)
+        self.assertEqual(mock_esi_client_factory.call_count, 2)
+
 
 @requests_mock.Mocker()
 class TestClientResult2(NoSocketsTestCase):
@@ -745,6 +3371,31 @@ class TestClientResult2(NoSocketsTestCase):
         request = requests_mocker.last_request
         self.assertEqual(request._request.headers["User-Agent"], "django-esi v1.0.0")
 
+    def test_should_return_same_result_from_cache(self, requests_mocker):
+        # given
+        cache.clear()
+        expires = datetime.utcnow() + timedelta(seconds=60)
+        requests_mocker.register_uri(
+            "GET",
+            url="https://esi.evetech.net/v1/status/",
+            json={
+                "players": 12345,
+                "server_version": "1132976",
+                "start_time": "2017-01-02T12:34:56Z",
+            },
+            headers={
+                "Content-Type": "application/json; charset=UTF-8",
+                "Expires": expires.strftime("%a, %d %b %Y %H:%M:%S GMT"),
+            },
+        )
+        first = self.esi_client.Status.get_status().result()
+        # when
+        second = self.esi_client.Status.get_status().result()
+        # then
+        self.assertEqual(requests_mocker.call_count, 1)
+        self.assertEqual(first, second)
+        self.assertIsInstance(second["start_time"], datetime)
+
 
 class TestRequestsClientPlus(NoSocketsTestCase):
     def test_single_header(self):
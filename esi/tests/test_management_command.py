@@ -1,11 +1,19 @@
 from unittest.mock import patch
 from io import StringIO
+import json
+import os
+import tempfile
 
 from django.contrib.auth.models import User
 from django.test import TestCase
 from django.core.management import call_command as base_call_command
+from django.core.management.base import CommandError
+import requests_mock
 
 from . import _generate_token, _store_as_Token
+from .test_clients import SWAGGER_SPEC_PATH_MINIMAL
+
+from esi.clients import read_spec_snapshot
 
 from esi.errors import (
     TokenInvalidError,
@@ -305,3 +313,66 @@ class TestSSOMigrations(TestCase):
         self.assertEqual(mock_v2_refresh.call_count, 1)
         self.assertEqual(mock_v1_refresh.call_count, 1)
         self.assertEqual(mock_delete.call_count, 0)
+
+
+@requests_mock.Mocker()
+class TestEsiSpecSnapshot(TestCase):
+    """tests for the spec snapshot command"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        with open(SWAGGER_SPEC_PATH_MINIMAL, encoding="utf-8") as f:
+            cls.spec = json.load(f)
+
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.snapshot_dir = temp_dir.name
+
+    def call_command(self, *args, **kwargs):
+        std_out = StringIO()
+        base_call_command("esi_spec_snapshot", *args, stdout=std_out, **kwargs)
+        return std_out.getvalue()
+
+    def test_should_write_snapshot_of_default_version(self, requests_mocker):
+        # given
+        requests_mocker.register_uri(
+            "GET", url="https://esi.evetech.net/_latest/swagger.json", json=self.spec
+        )
+        requests_mocker.register_uri(
+            "GET", url="https://esi.evetech.net/latest/swagger.json", json=self.spec
+        )
+        # when
+        with patch("esi.app_settings.ESI_SPEC_SNAPSHOT_DIR", self.snapshot_dir):
+            out = self.call_command()
+            spec_dict, age = read_spec_snapshot("latest")
+        # then
+        self.assertIn("latest", out)
+        self.assertDictEqual(spec_dict, self.spec)
+        self.assertLess(age, 60)
+
+    def test_should_write_snapshots_of_versions(self, requests_mocker):
+        # given
+        requests_mocker.register_uri(
+            "GET", url="https://esi.evetech.net/_latest/swagger.json", json=self.spec
+        )
+        requests_mocker.register_uri(
+            "GET", url="https://esi.evetech.net/latest/swagger.json", json=self.spec
+        )
+        requests_mocker.register_uri(
+            "GET", url="https://esi.evetech.net/v1/swagger.json", json=self.spec
+        )
+        # when
+        with patch("esi.app_settings.ESI_SPEC_SNAPSHOT_DIR", self.snapshot_dir):
+            self.call_command("latest", "v1")
+        # then
+        self.assertCountEqual(
+            os.listdir(self.snapshot_dir),
+            ["esi_swaggerspec_latest.json", "esi_swaggerspec_v1.json"],
+        )
+
+    def test_should_raise_error_without_snapshot_dir(self, requests_mocker):
+        with patch("esi.app_settings.ESI_SPEC_SNAPSHOT_DIR", None):
+            with self.assertRaises(CommandError):
+                self.call_command()
@@ -33,7 +33,6 @@ import django
 django.setup()
 
 # normal imports
-import concurrent.futures
 import logging
 
 from django.core.cache import cache
@@ -49,19 +48,19 @@ logger.level = logging.DEBUG
 logger.propagate = True
 
 
-def thread_func(type_id):
-    logger.info('Fetching type with ID %d from ESI', type_id)
-    esi.client.Universe.get_universe_types_type_id(type_id=type_id).result()
-
 def main():
     print('Script started...')
     entity_ids = esi.client.Universe.get_universe_types().results()[1000:2000]
     logger.info('Start fetching %d types' , len(entity_ids))
 
-    with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKER) as executor:
-        executor.map(thread_func, entity_ids)
+    results = esi.client.Universe.get_universe_types_type_id.map(
+        type_id=entity_ids, max_workers=MAX_WORKER
+    )
+    errors = [result for result in results.values() if isinstance(result, Exception)]
 
-    logger.info('Finished fetching %d types', len(entity_ids))
+    logger.info(
+        'Finished fetching %d types with %d errors', len(entity_ids), len(errors)
+    )
     print('DONE')
 
 